@@ -0,0 +1,32 @@
+"""
+Shared helpers for the bulk create endpoints.
+
+Each item of a bulk request is validated on its own; invalid items are
+reported by index and the valid ones go ahead. Valid items are written in one
+Turso batch, so they are created together or, if the write fails, all
+reported as failed.
+
+Per-item results are plain dicts, validated once into the route's
+BulkResponse[...] model.
+"""
+from typing import TypeVar
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def validate_items(model: type[M], items: list[dict]) -> tuple[list[tuple[int, M]], dict[int, dict]]:
+    """Split raw items into (index, parsed) pairs and per-index results for the invalid ones."""
+    valid: list[tuple[int, M]] = []
+    invalid: dict[int, dict] = {}
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(raw)))
+        except ValidationError as exc:
+            errors = "; ".join(f"{'.'.join(map(str, e['loc'])) or 'item'}: {e['msg']}" for e in exc.errors())
+            invalid[index] = {"index": index, "status": "invalid", "error": errors}
+    return valid, invalid
+
+
+def failed(indices: list[int], error: str) -> dict[int, dict]:
+    return {index: {"index": index, "status": "failed", "error": error} for index in indices}
@@ -11,7 +11,7 @@ _cached_key: str | None = None
 async def _get_key() -> str:
     global _cached_key
     if _cached_key is None:
-        result = await turso.execute("SELECT key FROM api_keys LIMIT 1")
+        result = await turso.read("SELECT key FROM api_keys LIMIT 1")
         _cached_key = result.rows[0][0] if result.rows else ""
     return _cached_key
 
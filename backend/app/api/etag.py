@@ -0,0 +1,42 @@
+"""
+Conditional GET support for the read endpoints.
+
+The ETag of a response is derived from the table's change counter and the
+request URL (path and query string), so it changes whenever a write bumps the
+table and differs between pages, filters and items. A matching If-None-Match
+is answered with 304 before the route runs, so revalidating an unchanged
+resource costs one primary-key lookup in table_versions and no serialization.
+That lookup is what makes the 304 safe with several workers: the in-process
+counts only learn of other processes' writes on the next periodic refresh.
+"""
+import hashlib
+from fastapi import HTTPException, Request, Response
+from app.db import table_versions
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so a W/ prefix added by a proxy still matches.
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def conditional(*tables: str):
+    """Dependency that tags a GET with an ETag over `tables`, answering 304 when it still matches."""
+
+    async def dependency(request: Request, response: Response) -> None:
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match:
+            await table_versions.refresh(*tables)
+        # Read the version before the route queries: a write landing in between
+        # can only make the tag older than the data, which forces a refetch, never a stale 304.
+        versions = "|".join(table_versions.version(table) for table in tables)
+        digest = hashlib.sha256(f"{versions}|{request.url.path}?{request.url.query}".encode()).hexdigest()[:32]
+        etag = f'"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
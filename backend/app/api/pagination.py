@@ -0,0 +1,68 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+
+Lists are ordered by (sort_column DESC, id DESC). A cursor is an opaque token
+holding the (sort value, id) of the last row served; the next page starts
+strictly after it, so every page is a bounded index range scan no matter how
+deep the client pages. The body stays a plain list — the cursor for the next
+page, if any, is returned in the X-Next-Cursor header.
+"""
+import base64
+import json
+from fastapi import HTTPException, Response
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: str, row_id: str) -> str:
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if not isinstance(sort_value, str) or not isinstance(row_id, str):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, row_id
+
+
+def page_query(
+    select: str,
+    sort_column: str,
+    limit: int,
+    cursor: str | None = None,
+    where: list[str] | None = None,
+    args: list | None = None,
+) -> tuple[str, list]:
+    """Build `select` + WHERE + keyset predicate + ORDER BY + LIMIT.
+
+    Fetches one row more than `limit` so `finish_page` can tell whether a next
+    page exists without a COUNT query.
+    """
+    clauses = list(where or [])
+    params = list(args or [])
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        # Row-value comparison lets SQLite seek straight into the (sort_column, id) index.
+        clauses.append(f"({sort_column}, id) < (?, ?)")
+        params.extend([sort_value, row_id])
+    sql = select
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {sort_column} DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    return sql, params
+
+
+def finish_page(rows: list, limit: int, response: Response, sort_index: int, id_index: int = 0) -> list:
+    """Trim the look-ahead row and set the next-page cursor header."""
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last[sort_index], last[id_index])
+    return rows[:limit]
@@ -1,22 +1,83 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.services.rag_service import chat
+import json
+import logging
+from collections.abc import AsyncIterator
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from app.services import conversation_service
+from app.services.rag_service import chat, chat_stream
+from app.services.retrieval import Filters
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
+class ChatFilters(BaseModel):
+    """Search only chunks matching every given list (any value within a list)."""
+    categories: list[str] = Field(default_factory=list, max_length=50)
+    source_types: list[str] = Field(default_factory=list, max_length=50)
+    # Note or document ids.
+    source_ids: list[str] = Field(default_factory=list, max_length=200)
+
+    def to_filters(self) -> Filters:
+        return Filters(tuple(self.categories), tuple(self.source_types), tuple(self.source_ids))
+
+
 class ChatRequest(BaseModel):
     query: str
+    # Any client-chosen id; the session is created on its first turn. Omit for a stateless chat.
+    session_id: Optional[str] = Field(default=None, min_length=1, max_length=128)
+    filters: Optional[ChatFilters] = None
 
 
 class ChatResponse(BaseModel):
     answer: str
     sources: list[str]
+    session_id: Optional[str] = None
+
+
+def _filters(body: ChatRequest) -> Optional[Filters]:
+    return body.filters.to_filters() if body.filters else None
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @router.post("", response_model=ChatResponse)
-async def chat_endpoint(body: ChatRequest) -> ChatResponse:
+async def chat_endpoint(body: ChatRequest, background_tasks: BackgroundTasks) -> ChatResponse:
     if not body.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
-    result = await chat(body.query)
-    return ChatResponse(answer=result["answer"], sources=result["sources"])
+    result = await chat(body.query, session_id=body.session_id, filters=_filters(body))
+    if body.session_id is not None:
+        background_tasks.add_task(conversation_service.maybe_summarize, body.session_id)
+    return ChatResponse(answer=result["answer"], sources=result["sources"], session_id=body.session_id)
+
+
+@router.post("/stream")
+async def chat_stream_endpoint(body: ChatRequest) -> StreamingResponse:
+    """Server-Sent Events: one `sources` event, then `token` events, then `done`."""
+    if not body.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    sources, tokens = await chat_stream(body.query, session_id=body.session_id, filters=_filters(body))
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("sources", sources)
+        try:
+            async for token in tokens:
+                yield _sse("token", token)
+        except Exception:
+            logger.exception("Chat stream failed")
+            yield _sse("error", {"detail": "Generation failed"})
+            return
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(conversation_service.maybe_summarize, body.session_id) if body.session_id else None,
+    )
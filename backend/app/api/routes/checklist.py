@@ -1,34 +1,47 @@
+import logging
 import uuid
 from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import Optional
+from app.api import bulk
+from app.models.bulk import BulkCreate, BulkResponse
 from app.models.checklist import ChecklistItemCreate, ChecklistItemUpdate, ChecklistItemResponse
-from app.db import turso
+from app.db import turso, table_versions
+from app.api.etag import conditional
+from app.api.pagination import DEFAULT_LIMIT, MAX_LIMIT, page_query, finish_page
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/checklist", tags=["checklist"])
 
+# Rows per multi-row INSERT; stays well below SQLite's bound-parameter limit.
+_INSERT_BATCH = 100
+
 
 def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-@router.get("", response_model=list[ChecklistItemResponse])
-async def list_items(category: Optional[str] = None) -> list[ChecklistItemResponse]:
-    if category:
-        result = await turso.execute(
-            "SELECT id, title, description, category, status, due_date, created_at, updated_at FROM checklist_items WHERE category = ? ORDER BY created_at DESC",
-            [category],
-        )
-    else:
-        result = await turso.execute(
-            "SELECT id, title, description, category, status, due_date, created_at, updated_at FROM checklist_items ORDER BY created_at DESC"
-        )
+@router.get("", response_model=list[ChecklistItemResponse], dependencies=[Depends(conditional("checklist_items"))])
+async def list_items(
+    response: Response,
+    category: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+) -> list[ChecklistItemResponse]:
+    sql, args = page_query(
+        "SELECT id, title, description, category, status, due_date, created_at, updated_at FROM checklist_items",
+        sort_column="created_at", limit=limit, cursor=cursor,
+        where=["category = ?"] if category else None,
+        args=[category] if category else None,
+    )
+    result = await turso.read(sql, args)
     return [
         ChecklistItemResponse(
             id=row[0], title=row[1], description=row[2], category=row[3],
             status=row[4], due_date=row[5], created_at=row[6], updated_at=row[7],
         )
-        for row in result.rows
+        for row in finish_page(result.rows, limit, response, sort_index=6)
     ]
 
 
@@ -40,6 +53,7 @@ async def create_item(body: ChecklistItemCreate) -> ChecklistItemResponse:
         "INSERT INTO checklist_items (id, title, description, category, status, due_date, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
         [item_id, body.title, body.description, body.category, body.status.value, body.due_date, now, now],
     )
+    table_versions.bump("checklist_items")
     return ChecklistItemResponse(
         id=item_id, title=body.title, description=body.description,
         category=body.category, status=body.status.value,
@@ -47,29 +61,64 @@ async def create_item(body: ChecklistItemCreate) -> ChecklistItemResponse:
     )
 
 
+@router.post("/bulk", response_model=BulkResponse[ChecklistItemResponse])
+async def create_items_bulk(body: BulkCreate) -> BulkResponse[ChecklistItemResponse]:
+    """Create many checklist items in one Turso transaction."""
+    valid, results = bulk.validate_items(ChecklistItemCreate, body.items)
+    now = _now()
+    items = [(index, str(uuid.uuid4()), item) for index, item in valid]
+
+    statements = []
+    for start in range(0, len(items), _INSERT_BATCH):
+        batch = items[start: start + _INSERT_BATCH]
+        args: list = []
+        for _, item_id, item in batch:
+            args.extend([item_id, item.title, item.description, item.category, item.status.value, item.due_date, now, now])
+        placeholders = ", ".join("(?, ?, ?, ?, ?, ?, ?, ?)" for _ in batch)
+        statements.append((
+            "INSERT INTO checklist_items (id, title, description, category, status, due_date, created_at, updated_at) "
+            f"VALUES {placeholders}",
+            args,
+        ))
+    try:
+        await turso.batch(statements)
+    except Exception:
+        logger.exception("Bulk checklist insert failed")
+        results.update(bulk.failed([index for index, _, _ in items], "Database write failed"))
+        items = []
+
+    for index, item_id, item in items:
+        created = ChecklistItemResponse(
+            id=item_id, title=item.title, description=item.description,
+            category=item.category, status=item.status.value,
+            due_date=item.due_date, created_at=now, updated_at=now,
+        )
+        results[index] = {"index": index, "status": "created", "item": created}
+    if items:
+        table_versions.bump("checklist_items")
+    return BulkResponse[ChecklistItemResponse](created=len(items), results=[results[i] for i in sorted(results)])
+
+
 @router.patch("/{item_id}", response_model=ChecklistItemResponse)
 async def update_item_status(item_id: str, body: ChecklistItemUpdate) -> ChecklistItemResponse:
     result = await turso.execute(
-        "SELECT id, title, description, category, status, due_date, created_at, updated_at FROM checklist_items WHERE id = ?",
-        [item_id],
+        "UPDATE checklist_items SET status = ?, updated_at = ? WHERE id = ? "
+        "RETURNING id, title, description, category, status, due_date, created_at, updated_at",
+        [body.status.value, _now(), item_id],
     )
     if not result.rows:
         raise HTTPException(status_code=404, detail="Item not found")
-    now = _now()
-    await turso.execute(
-        "UPDATE checklist_items SET status = ?, updated_at = ? WHERE id = ?",
-        [body.status.value, now, item_id],
-    )
+    table_versions.bump("checklist_items")
     row = result.rows[0]
     return ChecklistItemResponse(
         id=row[0], title=row[1], description=row[2], category=row[3],
-        status=body.status.value, due_date=row[5], created_at=row[6], updated_at=now,
+        status=row[4], due_date=row[5], created_at=row[6], updated_at=row[7],
     )
 
 
 @router.delete("/{item_id}", status_code=204)
 async def delete_item(item_id: str) -> None:
-    result = await turso.execute("SELECT id FROM checklist_items WHERE id = ?", [item_id])
+    result = await turso.execute("DELETE FROM checklist_items WHERE id = ? RETURNING id", [item_id])
     if not result.rows:
         raise HTTPException(status_code=404, detail="Item not found")
-    await turso.execute("DELETE FROM checklist_items WHERE id = ?", [item_id])
+    table_versions.bump("checklist_items")
@@ -1,13 +1,26 @@
+import asyncio
+import logging
 import uuid
+from typing import Optional
 from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from app.api import bulk
+from app.api.etag import conditional
+from app.api.pagination import DEFAULT_LIMIT, MAX_LIMIT, page_query, finish_page
+from app.models.bulk import BulkCreate, BulkResponse
 from app.models.note import NoteCreate, NoteResponse
-from app.db import turso
+from app.db import turso, table_versions, pending_sources
 from app.db.vector_store import upsert_chunks, delete_by_source
-from app.services.embedding_service import embed
+from app.services.embedding_service import embed_many
+from app.services.chunking import chunk_text
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/notes", tags=["notes"])
 
+# Rows per multi-row INSERT; stays well below SQLite's bound-parameter limit.
+_INSERT_BATCH = 200
+
 
 def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -18,34 +31,113 @@ async def create_note(body: NoteCreate) -> NoteResponse:
     note_id = str(uuid.uuid4())
     now = _now()
 
-    await turso.execute(
-        "INSERT INTO notes (id, title, category, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-        [note_id, body.title, body.category, now, now],
-    )
+    # Long notes are split like documents; short ones come back as a single chunk.
+    chunks = chunk_text(body.content)
+    # Registered with the row, so a sweep does not rebuild the vectors this request is about to write.
+    await turso.batch([
+        (
+            "INSERT INTO notes (id, title, category, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [note_id, body.title, body.category, body.content, now, now],
+        ),
+        *([pending_sources.register_statement([note_id])] if chunks else []),
+    ])
+    # Bumped now, not after embedding: if that fails the row still exists and lists must show it.
+    table_versions.bump("notes")
 
-    embedding = await embed(body.content)
-    upsert_chunks(
-        ids=[f"{note_id}_0"],
-        documents=[body.content],
-        embeddings=[embedding],
-        metadatas=[{"source_id": note_id, "source_type": "note", "title": body.title, "category": body.category or ""}],
-    )
+    if chunks:
+        try:
+            texts = [chunk.text for chunk in chunks]
+            embeddings = await embed_many(texts)
+            meta = {"source_id": note_id, "source_type": "note", "title": body.title, "category": body.category or ""}
+            await upsert_chunks(
+                ids=[f"{note_id}_{chunk.index}" for chunk in chunks],
+                documents=texts,
+                embeddings=embeddings,
+                metadatas=[{**meta, **chunk.metadata()} for chunk in chunks],
+            )
+        finally:
+            await pending_sources.release([note_id])
 
     return NoteResponse(id=note_id, title=body.title, category=body.category, created_at=now, updated_at=now)
 
 
-@router.get("", response_model=list[NoteResponse])
-async def list_notes() -> list[NoteResponse]:
-    result = await turso.execute("SELECT id, title, category, created_at, updated_at FROM notes ORDER BY created_at DESC")
+@router.post("/bulk", response_model=BulkResponse[NoteResponse])
+async def create_notes_bulk(body: BulkCreate) -> BulkResponse[NoteResponse]:
+    """Create many notes: one embed_many pass, one Chroma upsert and one Turso transaction."""
+    valid, results = bulk.validate_items(NoteCreate, body.items)
+    now = _now()
+    notes = [(index, str(uuid.uuid4()), note) for index, note in valid]
+
+    ids, texts, metadatas = [], [], []
+    for _, note_id, note in notes:
+        meta = {"source_id": note_id, "source_type": "note", "title": note.title, "category": note.category or ""}
+        for chunk in chunk_text(note.content):
+            ids.append(f"{note_id}_{chunk.index}")
+            texts.append(chunk.text)
+            metadatas.append({**meta, **chunk.metadata()})
+
+    # Index first: if embedding fails nothing has been written, and a failed
+    # Turso write only has to take the vectors back out. Until the rows exist
+    # the notes are registered as pending, so a sweep does not take the new
+    # vectors for orphans; the INSERT batch releases them atomically.
+    note_ids = [note_id for _, note_id, _ in notes]
+    try:
+        if ids:
+            await pending_sources.register(note_ids)
+            await upsert_chunks(ids=ids, documents=texts, embeddings=await embed_many(texts), metadatas=metadatas)
+    except Exception:
+        logger.exception("Bulk note indexing failed")
+        await pending_sources.release(note_ids)
+        results.update(bulk.failed([index for index, _, _ in notes], "Indexing failed"))
+        notes = []
+
+    statements = []
+    for start in range(0, len(notes), _INSERT_BATCH):
+        batch = notes[start: start + _INSERT_BATCH]
+        args: list = []
+        for _, note_id, note in batch:
+            args.extend([note_id, note.title, note.category, note.content, now, now])
+        placeholders = ", ".join("(?, ?, ?, ?, ?, ?)" for _ in batch)
+        statements.append((f"INSERT INTO notes (id, title, category, content, created_at, updated_at) VALUES {placeholders}", args))
+    if ids and notes:
+        statements.append(pending_sources.release_statement(note_ids))
+    try:
+        await turso.batch(statements)
+    except Exception:
+        logger.exception("Bulk note insert failed")
+        await asyncio.gather(*(delete_by_source(note_id) for _, note_id, _ in notes))
+        await pending_sources.release(note_ids)
+        results.update(bulk.failed([index for index, _, _ in notes], "Database write failed"))
+        notes = []
+
+    for index, note_id, note in notes:
+        item = NoteResponse(id=note_id, title=note.title, category=note.category, created_at=now, updated_at=now)
+        results[index] = {"index": index, "status": "created", "item": item}
+    if notes:
+        table_versions.bump("notes")
+    return BulkResponse[NoteResponse](created=len(notes), results=[results[i] for i in sorted(results)])
+
+
+@router.get("", response_model=list[NoteResponse], dependencies=[Depends(conditional("notes"))])
+async def list_notes(
+    response: Response,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+) -> list[NoteResponse]:
+    sql, args = page_query(
+        "SELECT id, title, category, created_at, updated_at FROM notes",
+        sort_column="created_at", limit=limit, cursor=cursor,
+    )
+    result = await turso.read(sql, args)
     return [
         NoteResponse(id=row[0], title=row[1], category=row[2], created_at=row[3], updated_at=row[4])
-        for row in result.rows
+        for row in finish_page(result.rows, limit, response, sort_index=3)
     ]
 
 
-@router.get("/{note_id}", response_model=NoteResponse)
+@router.get("/{note_id}", response_model=NoteResponse, dependencies=[Depends(conditional("notes"))])
 async def get_note(note_id: str) -> NoteResponse:
-    result = await turso.execute(
+    result = await turso.read(
         "SELECT id, title, category, created_at, updated_at FROM notes WHERE id = ?",
         [note_id],
     )
@@ -57,8 +149,8 @@ async def get_note(note_id: str) -> NoteResponse:
 
 @router.delete("/{note_id}", status_code=204)
 async def delete_note(note_id: str) -> None:
-    result = await turso.execute("SELECT id FROM notes WHERE id = ?", [note_id])
+    result = await turso.execute("DELETE FROM notes WHERE id = ? RETURNING id", [note_id])
     if not result.rows:
         raise HTTPException(status_code=404, detail="Note not found")
-    await turso.execute("DELETE FROM notes WHERE id = ?", [note_id])
-    delete_by_source(note_id)
+    table_versions.bump("notes")
+    await delete_by_source(note_id)
@@ -5,8 +5,42 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     turso_database_url: str = ""
     turso_auth_token: str = ""
+    turso_replica_path: str = ""
+    turso_replica_sync_seconds: int = 60
     chroma_persist_dir: str = "./chroma_db"
     allowed_origins: str = "http://localhost:5173"
+    vector_backend: str = "chroma"
+    vector_index_dir: str = "./vector_index"
+    vector_index_dtype: str = "float32"
+    vector_index_rescore: int = 4
+    chroma_workers: int = 4
+    upload_dir: str = "./uploads"
+    ingestion_workers: int = 2
+    pdf_workers: int = 2
+    pdf_pages_per_task: int = 25
+    chunk_max_tokens: int = 512
+    chunk_overlap_tokens: int = 64
+    embedding_provider: str = "openai"
+    local_embedding_dim: int = 512
+    embedding_dimensions: int = 0
+    embedding_batch_size: int = 256
+    embedding_batch_tokens: int = 100_000
+    embedding_concurrency: int = 4
+    embedding_cache_size: int = 10_000
+    embedding_cache_persist: bool = True
+    context_candidates: int = 20
+    context_max_distance: float = 0.8
+    context_mmr_lambda: float = 0.7
+    context_max_tokens: int = 3000
+    chat_history_window: int = 6
+    chat_summarize_every: int = 4
+    metrics_enabled: bool = True
+    sweep_interval_minutes: int = 0
+    warmup_enabled: bool = True
+    table_versions_refresh_seconds: int = 5
+    hybrid_search: bool = True
+    retrieval_candidates: int = 10
+    rrf_k: int = 60
 
     @property
     def allowed_origins_list(self) -> list[str]:
@@ -0,0 +1,80 @@
+"""
+FTS5 (BM25) index over chunk text, stored in Turso.
+
+Dense retrieval misses exact terms such as "UGE" or "apostilled", so every chunk
+written to the vector store is mirrored into an external-content FTS5 table.
+vector_store.upsert_chunks / delete_by_source keep the two in sync, and the
+triggers created in turso.init_db keep chunks_fts in step with the chunks table.
+"""
+import json
+import re
+from app.db import turso
+
+_INSERT_BATCH = 100
+# Metadata fields search() can filter on; each is also a column of chunks.
+FILTER_COLUMNS = ("source_id", "source_type", "category")
+
+
+def match_expression(query: str) -> str:
+    """Turn free text into a safe FTS5 query: every word quoted, OR-ed together."""
+    terms = dict.fromkeys(t.lower() for t in re.findall(r"\w+", query))
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+async def upsert(ids: list[str], documents: list[str], metadatas: list[dict]) -> None:
+    statements = []
+    rows = list(zip(ids, documents, metadatas))
+    for start in range(0, len(rows), _INSERT_BATCH):
+        batch = rows[start: start + _INSERT_BATCH]
+        args: list = []
+        for chunk_id, text, meta in batch:
+            args.extend([
+                chunk_id, meta.get("source_id", ""), meta.get("source_type"), meta.get("category"),
+                json.dumps(meta), text,
+            ])
+        placeholders = ", ".join("(?, ?, ?, ?, ?, ?)" for _ in batch)
+        statements.append((
+            f"INSERT INTO chunks (chunk_id, source_id, source_type, category, metadata, text) VALUES {placeholders} "
+            "ON CONFLICT (chunk_id) DO UPDATE SET source_id = excluded.source_id, source_type = excluded.source_type, "
+            "category = excluded.category, metadata = excluded.metadata, text = excluded.text",
+            args,
+        ))
+    await turso.batch(statements)
+
+
+async def delete_by_source(source_id: str) -> None:
+    await turso.execute("DELETE FROM chunks WHERE source_id = ?", [source_id])
+
+
+async def delete_ids(ids: list[str]) -> None:
+    statements = []
+    for start in range(0, len(ids), _INSERT_BATCH):
+        batch = ids[start: start + _INSERT_BATCH]
+        statements.append((f"DELETE FROM chunks WHERE chunk_id IN ({', '.join('?' for _ in batch)})", batch))
+    await turso.batch(statements)
+
+
+async def search(query: str, n_results: int = 10, filters: dict[str, list[str]] | None = None) -> list[dict]:
+    """Best BM25 matches first, as {"id", "document", "metadata", "score"} dicts.
+
+    `filters` maps FILTER_COLUMNS to allowed values; a chunk must match all of them.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    conditions, args = "", [expression]
+    for column, values in (filters or {}).items():
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot filter chunks on {column!r}")
+        conditions += f" AND c.{column} IN ({', '.join('?' for _ in values)})"
+        args.extend(values)
+    result = await turso.execute(
+        "SELECT c.chunk_id, c.text, c.metadata, bm25(chunks_fts) AS score "
+        "FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid "
+        f"WHERE chunks_fts MATCH ?{conditions} ORDER BY score LIMIT ?",
+        [*args, n_results],
+    )
+    return [
+        {"id": row[0], "document": row[1], "metadata": json.loads(row[2]), "score": row[3]}
+        for row in result.rows
+    ]
@@ -0,0 +1,50 @@
+"""
+Sources whose index writes are in flight.
+
+A bulk note create writes its vectors before its notes rows, so between the two
+the vectors look orphaned to the sweeper, which would delete them. Writers
+therefore register their source ids in the pending_sources table before
+touching the indexes and release them in the same Turso batch that makes the
+rows visible. `sweep` leaves the chunks of pending sources alone and does not
+rebuild them, just as it holds orphan removal back while ingestion jobs run.
+
+A marker older than STALE_AFTER is from a writer that died mid-way; the
+sweeper ignores it and removes it.
+"""
+from datetime import datetime, timedelta, timezone
+from app.db import turso
+
+STALE_AFTER = timedelta(minutes=10)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def register_statement(source_ids: list[str]) -> tuple[str, list]:
+    placeholders = ", ".join("(?, ?)" for _ in source_ids)
+    now = _now().isoformat()
+    return (
+        f"INSERT INTO pending_sources (source_id, started_at) VALUES {placeholders} "
+        "ON CONFLICT (source_id) DO UPDATE SET started_at = excluded.started_at",
+        [value for source_id in source_ids for value in (source_id, now)],
+    )
+
+
+def release_statement(source_ids: list[str]) -> tuple[str, list]:
+    return f"DELETE FROM pending_sources WHERE source_id IN ({', '.join('?' for _ in source_ids)})", list(source_ids)
+
+
+async def register(source_ids: list[str]) -> None:
+    if source_ids:
+        await turso.execute(*register_statement(source_ids))
+
+
+async def release(source_ids: list[str]) -> None:
+    if source_ids:
+        await turso.execute(*release_statement(source_ids))
+
+
+def cutoff() -> str:
+    """Markers started before this are stale."""
+    return (_now() - STALE_AFTER).isoformat()
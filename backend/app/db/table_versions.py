@@ -0,0 +1,73 @@
+"""
+Change counters for the tables the read endpoints serve.
+
+A version has two parts. Every code path that writes one of these tables calls
+`bump()` after the write commits, so this process's own writes change the
+version at once. Triggers (see turso.init_db) also count every write in the
+table_versions table, whoever makes it. `start()` re-reads those counts every
+TABLE_VERSIONS_REFRESH_SECONDS for the ETags sent on plain GETs; a request
+carrying If-None-Match calls `refresh()` for its tables first, so a 304 is
+never based on counts that miss a write by the seed scripts or another worker.
+
+The in-memory part starts from a random epoch, so a restart changes every version.
+"""
+import asyncio
+import logging
+import secrets
+from app.config import settings
+from app.db import turso
+
+logger = logging.getLogger(__name__)
+
+EPOCH = secrets.token_hex(4)
+_versions: dict[str, int] = {}
+# Last counts read from the table_versions table.
+_stored: dict[str, int] = {}
+_task: asyncio.Task | None = None
+
+
+def version(table: str) -> str:
+    return f"{EPOCH}.{_versions.get(table, 0)}.{_stored.get(table, 0)}"
+
+
+def bump(*tables: str) -> None:
+    for table in tables:
+        _versions[table] = _versions.get(table, 0) + 1
+
+
+async def refresh(*tables: str) -> None:
+    """Re-read the counts kept in Turso, for `tables` only when given.
+
+    Always from the primary: the read replica may be behind.
+    """
+    if tables:
+        result = await turso.execute(
+            f"SELECT name, version FROM table_versions WHERE name IN ({', '.join('?' for _ in tables)})", list(tables),
+        )
+    else:
+        result = await turso.execute("SELECT name, version FROM table_versions")
+    _stored.update({row[0]: row[1] for row in result.rows})
+
+
+async def _loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh()
+        except Exception:
+            logger.exception("Reading table versions failed")
+
+
+async def start() -> None:
+    global _task
+    await refresh()
+    if settings.table_versions_refresh_seconds > 0:
+        _task = asyncio.create_task(_loop(settings.table_versions_refresh_seconds))
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
@@ -1,9 +1,60 @@
+"""
+Turso access.
+
+Every statement goes to the primary at TURSO_DATABASE_URL. With
+TURSO_REPLICA_PATH set, reads of the small REPLICATED_TABLES that go through
+`read` are served from a local SQLite copy of them instead.
+
+The copy starts as a snapshot taken from the primary in one batch. After
+that, each write this process makes to those tables is applied to the
+primary and then replayed on the copy before the call returns, so reads see
+it at once without copying anything. These writes are serialized per
+process, which keeps the replay order equal to the commit order.
+Every TURSO_REPLICA_SYNC_SECONDS the table_versions counts (bumped by
+triggers on both sides) are compared, and only tables that other processes
+have written are copied again. notes.content is left out of the copy, since
+no replica read selects it. If a replay fails, `read` goes to the primary
+until a full snapshot has been taken again.
+
+Which writes to replay is told from each statement's leading verb and target
+table. A statement that cannot be classified that way (a CTE, DDL) or that
+writes a table whose triggers write replicated tables marks the replica stale
+instead, so nothing is ever left out silently. Replica queries run on worker
+threads, each with its own read connection.
+"""
+import asyncio
+import logging
+import re
 import secrets
+import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timezone
 import libsql_client
 from app.config import settings
+from app.metrics import track
+
+logger = logging.getLogger(__name__)
+
+# Tables copied into the read replica: the ones behind the list and detail endpoints and the API-key lookup.
+REPLICATED_TABLES = ("notes", "checklist_items", "documents", "api_keys")
+# Columns copied per table when not all of them; notes.content is large and only the primary reads it.
+_SNAPSHOT_COLUMNS = {"notes": "id, title, category, created_at, updated_at"}
+_MENTIONS_REPLICATED = re.compile(r"\b(" + "|".join(REPLICATED_TABLES) + r")\b", re.IGNORECASE)
+_READ_ONLY = re.compile(r"\s*(SELECT|PRAGMA)\b", re.IGNORECASE)
+_WRITE_TARGET = re.compile(r"\s*(?:INSERT|REPLACE|UPDATE|DELETE)\b(?:\s+OR\s+\w+)?\s+(?:INTO\s+|FROM\s+)?(\w+)", re.IGNORECASE)
 
 _client: libsql_client.Client | None = None
+_replica: "_Replica | None" = None
+# Tables with triggers that write replicated tables, read from the primary's schema at each sync.
+_feeds_replica: frozenset[str] = frozenset()
+_TRIGGERS = ("SELECT tbl_name, sql FROM sqlite_master WHERE type = 'trigger'", [])
+# True until the first snapshot, and after a replay failed: reads go to the primary.
+_stale = True
+# Held by snapshots and by this process's writes to replicated tables.
+_sync_lock: asyncio.Lock | None = None
+_resync_task: asyncio.Task | None = None
+_sync_task: asyncio.Task | None = None
 
 
 def get_client() -> libsql_client.Client:
@@ -18,7 +69,294 @@ def get_client() -> libsql_client.Client:
 
 async def execute(sql: str, args: list | None = None) -> libsql_client.ResultSet:
     client = get_client()
-    return await client.execute(libsql_client.Statement(sql, args or []))
+    async with _replicating([(sql, args)]):
+        async with track("turso", "execute"):
+            return await client.execute(libsql_client.Statement(sql, args or []))
+
+
+async def batch(statements: list[tuple[str, list | None]]) -> list[libsql_client.ResultSet]:
+    """Run several statements in one round-trip.
+
+    libsql executes a batch as a single transaction: either every statement
+    applies or none does. Results come back in statement order.
+    """
+    if not statements:
+        return []
+    client = get_client()
+    async with _replicating(statements):
+        async with track("turso", "batch"):
+            return await client.batch([libsql_client.Statement(sql, args or []) for sql, args in statements])
+
+
+async def read(sql: str, args: list | None = None) -> libsql_client.ResultSet:
+    """Run a SELECT over REPLICATED_TABLES, on the replica when it is in use."""
+    if _replica is None or _stale:
+        return await execute(sql, args)
+    async with track("turso_replica", "read"):
+        return await asyncio.to_thread(_replica.query, sql, args or [])
+
+
+class _Replica:
+    """The local SQLite copy. Queries and writes run on threads: one write connection, one read connection per thread."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._writer = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # WAL lets queries keep reading while a snapshot or replay is written.
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        # The primary is the durable copy; a crash only costs a fresh snapshot.
+        self._writer.execute("PRAGMA synchronous=OFF")
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        # Counts queries in progress; closing waits until there are none.
+        self._idle = threading.Condition()
+        self._active = 0
+        self._closed = False
+        # A write outlives a cancelled task; closing waits for it.
+        self._writing = threading.Lock()
+
+    @property
+    def _reader(self) -> sqlite3.Connection:
+        reader = getattr(self._local, "reader", None)
+        if reader is None:
+            reader = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+            with self._idle:
+                self._readers.append(reader)
+            self._local.reader = reader
+        return reader
+
+    def query(self, sql: str, args: list) -> libsql_client.ResultSet:
+        with self._idle:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Turso replica is closed")
+            self._active += 1
+        try:
+            cursor = self._reader.execute(sql, args)
+            columns = tuple(column[0] for column in cursor.description or ())
+            rows = cursor.fetchall()
+        finally:
+            with self._idle:
+                self._active -= 1
+                self._idle.notify_all()
+        indexes = {name: i for i, name in enumerate(columns)}
+        return libsql_client.ResultSet(columns, [libsql_client.Row(indexes, tuple(row)) for row in rows], 0, None)
+
+    def versions(self) -> dict[str, int]:
+        try:
+            return dict(self._reader.execute("SELECT name, version FROM table_versions").fetchall())
+        except sqlite3.OperationalError:
+            # No snapshot taken yet.
+            return {}
+
+    @contextmanager
+    def _transaction(self):
+        with self._writing:
+            db = self._writer
+            db.execute("BEGIN")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def apply(self, statements: list[tuple[str, list]]) -> None:
+        """Replay writes already committed on the primary."""
+        with self._transaction() as db:
+            for sql, args in statements:
+                # Stepping through RETURNING rows finishes the statement before COMMIT.
+                db.execute(sql, args).fetchall()
+
+    def load(self, schema: list, tables: dict[str, libsql_client.ResultSet], versions: dict[str, int]) -> None:
+        """Replace `tables` with a snapshot, in one transaction."""
+        with self._transaction() as db:
+            for name in tables:
+                db.execute(f"DROP TABLE IF EXISTS {name}")
+            # Tables and indexes first; triggers after the rows, so loading does not count as writes.
+            for kind, sql in schema:
+                if kind != "trigger":
+                    db.execute(sql)
+            for name, result in tables.items():
+                if result.rows:
+                    columns = ", ".join(result.columns)
+                    placeholders = ", ".join("?" for _ in result.columns)
+                    db.executemany(
+                        f"INSERT INTO {name} ({columns}) VALUES ({placeholders})",
+                        [tuple(row) for row in result.rows],
+                    )
+            for kind, sql in schema:
+                if kind == "trigger":
+                    db.execute(sql)
+            db.executemany(
+                "INSERT INTO table_versions (name, version) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET version = excluded.version",
+                list(versions.items()),
+            )
+
+    def close(self) -> None:
+        with self._idle:
+            self._closed = True
+            self._idle.wait_for(lambda: self._active == 0)
+            for reader in self._readers:
+                reader.close()
+            self._readers.clear()
+        with self._writing:
+            self._writer.close()
+
+
+def _replicated_writes(statements: list[tuple[str, list | None]]) -> list[tuple[str, list]] | None:
+    """The writes to REPLICATED_TABLES among `statements`.
+
+    None when a statement's effect on them cannot be told from its text: it is
+    not a plain INSERT/REPLACE/UPDATE/DELETE (a CTE, DDL), or it writes a table
+    whose triggers write replicated tables.
+    """
+    writes = []
+    for sql, args in statements:
+        if _READ_ONLY.match(sql):
+            continue
+        target = _WRITE_TARGET.match(sql)
+        if target is None:
+            return None
+        table = target.group(1).lower()
+        if table in REPLICATED_TABLES:
+            writes.append((sql, args or []))
+        elif table in _feeds_replica:
+            return None
+        # Otherwise a replicated table named only in a subquery is read, not written.
+    return writes
+
+
+def _tables_feeding_replica(triggers: list) -> frozenset[str]:
+    """Tables outside the replica with a trigger whose body names a replicated table."""
+    return frozenset(
+        table.lower() for table, sql in triggers
+        if table.lower() not in REPLICATED_TABLES and _MENTIONS_REPLICATED.search(sql)
+    )
+
+
+@asynccontextmanager
+async def _replicating(statements: list[tuple[str, list | None]]):
+    """Run a primary write and, when it changes replicated tables, replay it on the replica afterwards."""
+    writes = _replicated_writes(statements) if _replica is not None else []
+    if writes == []:
+        yield
+        return
+    async with _sync_lock:
+        yield
+        replica = _replica
+        try:
+            if writes is None or replica is None:
+                raise RuntimeError("write cannot be replayed")
+            await asyncio.to_thread(replica.apply, writes)
+        except Exception:
+            logger.warning("Turso replica out of date; reading from the primary until it is re-synced", exc_info=True)
+            _invalidate()
+
+
+def _invalidate() -> None:
+    global _stale, _resync_task
+    _stale = True
+    if _resync_task is None or _resync_task.done():
+        _resync_task = asyncio.create_task(_resync())
+
+
+async def _resync() -> None:
+    try:
+        await sync_replica()
+    except Exception:
+        # The periodic sync tries again.
+        logger.exception("Turso replica sync failed")
+
+
+async def sync_replica() -> None:
+    """Bring the replica up to date with writes made outside this process.
+
+    Copies the tables whose table_versions count differs from the replica's
+    (all of them while the replica is stale), as one consistent snapshot.
+    """
+    global _stale, _feeds_replica
+    if _replica is None:
+        return
+    async with _sync_lock:
+        replica, full = _replica, _stale
+        if full:
+            names = [*REPLICATED_TABLES, "table_versions"]
+        else:
+            result, triggers = await batch([
+                ("SELECT name, version FROM table_versions", []),
+                _TRIGGERS,
+            ])
+            _feeds_replica = _tables_feeding_replica(triggers.rows)
+            local = replica.versions()
+            names = [name for name, version in result.rows if name in REPLICATED_TABLES and local.get(name) != version]
+            if not names:
+                return
+        placeholders = ", ".join("?" for _ in names)
+        # One batch is one transaction, so the snapshot is consistent across tables.
+        versions, triggers, schema, *tables = await batch([
+            ("SELECT name, version FROM table_versions", []),
+            _TRIGGERS,
+            (
+                f"SELECT type, sql FROM sqlite_master WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL "
+                "AND type IN ('table', 'index', 'trigger') ORDER BY type != 'table'",
+                names,
+            ),
+            *((f"SELECT {_SNAPSHOT_COLUMNS.get(name, '*')} FROM {name}", []) for name in names),
+        ])
+        counts = {name: version for name, version in versions.rows if name in names}
+        _feeds_replica = _tables_feeding_replica(triggers.rows)
+        await asyncio.to_thread(replica.load, schema.rows, dict(zip(names, tables)), counts)
+        if replica is _replica:
+            _stale = False
+
+
+async def _sync_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sync_replica()
+        except Exception:
+            logger.exception("Turso replica sync failed")
+
+
+async def start_replica() -> None:
+    """Open the replica at TURSO_REPLICA_PATH and keep it synced (no-op when unset)."""
+    global _replica, _stale, _sync_lock, _sync_task
+    if not settings.turso_replica_path:
+        return
+    _replica, _stale = _Replica(settings.turso_replica_path), True
+    _sync_lock = asyncio.Lock()
+    try:
+        await sync_replica()
+    except Exception:
+        logger.exception("Initial Turso replica sync failed; reading from the primary until one succeeds")
+    if settings.turso_replica_sync_seconds > 0:
+        _sync_task = asyncio.create_task(_sync_periodically(settings.turso_replica_sync_seconds))
+
+
+async def stop_replica() -> None:
+    global _replica, _stale, _resync_task, _sync_task
+    tasks = [task for task in (_resync_task, _sync_task) if task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _resync_task = _sync_task = None
+    if _replica is not None:
+        replica, _replica = _replica, None
+        await asyncio.to_thread(replica.close)
+    _stale = True
+
+
+# Tables whose writes are counted in table_versions (see app.db.table_versions and the replica sync).
+VERSIONED_TABLES = ("notes", "checklist_items", "documents", "ingestion_jobs", "api_keys")
+
+
+async def _ensure_column(table: str, column: str, definition: str) -> None:
+    """Add a column to a table created by an older version of init_db."""
+    result = await execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in result.rows}:
+        await execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 
 async def init_db() -> None:
@@ -31,6 +369,8 @@ async def init_db() -> None:
             updated_at TEXT NOT NULL
         )
     """)
+    # The note body as written, so its chunks can be rebuilt (NULL for notes created before it was kept).
+    await _ensure_column("notes", "content", "TEXT")
     await execute("""
         CREATE TABLE IF NOT EXISTS checklist_items (
             id TEXT PRIMARY KEY,
@@ -49,7 +389,63 @@ async def init_db() -> None:
             filename TEXT NOT NULL,
             file_type TEXT NOT NULL,
             uploaded_at TEXT NOT NULL,
-            chunk_count INTEGER
+            chunk_count INTEGER,
+            content_hash TEXT
+        )
+    """)
+    await _ensure_column("documents", "content_hash", "TEXT")
+    await execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash)")
+    # Which documents use which content-addressed chunk vector (see document_service).
+    await execute("""
+        CREATE TABLE IF NOT EXISTS document_chunks (
+            doc_id TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (doc_id, chunk_id)
+        )
+    """)
+    await execute("CREATE INDEX IF NOT EXISTS idx_document_chunks_chunk_id ON document_chunks (chunk_id)")
+    # Extracted text per page (numbered from 1), so documents can be re-chunked without the PDF.
+    await execute("""
+        CREATE TABLE IF NOT EXISTS document_pages (
+            doc_id TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (doc_id, page)
+        )
+    """)
+    # Sources a reindex run has finished, so an interrupted run resumes (see services/reindex).
+    await execute("""
+        CREATE TABLE IF NOT EXISTS reindex_checkpoints (
+            run_id TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            source_type TEXT NOT NULL,
+            finished_at TEXT NOT NULL,
+            PRIMARY KEY (run_id, source_id)
+        )
+    """)
+    await execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_jobs (
+            id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            chunks_total INTEGER,
+            chunks_embedded INTEGER NOT NULL DEFAULT 0,
+            document_id TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            content_hash TEXT NOT NULL
+        )
+    """)
+    await execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, created_at)")
+    await execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_content_hash ON ingestion_jobs (content_hash)")
+    # Sources whose index writes are in flight; the sweeper leaves their chunks alone (see app.db.pending_sources).
+    await execute("""
+        CREATE TABLE IF NOT EXISTS pending_sources (
+            source_id TEXT PRIMARY KEY,
+            started_at TEXT NOT NULL
         )
     """)
     await execute("""
@@ -61,6 +457,67 @@ async def init_db() -> None:
             created_at TEXT NOT NULL
         )
     """)
+    await _ensure_column("chat_history", "session_id", "TEXT")
+    await _ensure_column("chat_history", "turn", "INTEGER")
+    await execute("CREATE INDEX IF NOT EXISTS idx_chat_history_session_turn ON chat_history (session_id, turn)")
+    await execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            summarized_turn INTEGER NOT NULL DEFAULT 0,
+            turn_count INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    # Keyset pagination orders by (sort column, id); these cover it without a sort step.
+    await execute("CREATE INDEX IF NOT EXISTS idx_notes_created_at ON notes (created_at, id)")
+    await execute("CREATE INDEX IF NOT EXISTS idx_checklist_created_at ON checklist_items (created_at, id)")
+    await execute("CREATE INDEX IF NOT EXISTS idx_checklist_category_created_at ON checklist_items (category, created_at, id)")
+    await execute("CREATE INDEX IF NOT EXISTS idx_documents_uploaded_at ON documents (uploaded_at, id)")
+    await execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (model, text_hash)
+        )
+    """)
+    # Chunk text mirrored from the vector store for BM25 search (see lexical_index).
+    await execute("""
+        CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY,
+            chunk_id TEXT NOT NULL UNIQUE,
+            source_id TEXT NOT NULL,
+            source_type TEXT,
+            category TEXT,
+            metadata TEXT NOT NULL,
+            text TEXT NOT NULL
+        )
+    """)
+    await execute("CREATE INDEX IF NOT EXISTS idx_chunks_source_id ON chunks (source_id)")
+    await execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+            text, content='chunks', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    await execute("""
+        CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+            INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
+    await execute("""
+        CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+            INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """)
+    await execute("""
+        CREATE TRIGGER IF NOT EXISTS chunks_au AFTER UPDATE ON chunks BEGIN
+            INSERT INTO chunks_fts (chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+        END
+    """)
     await execute("""
         CREATE TABLE IF NOT EXISTS api_keys (
             id INTEGER PRIMARY KEY,
@@ -68,6 +525,22 @@ async def init_db() -> None:
             created_at TEXT NOT NULL
         )
     """)
+    # A change counter per table, bumped by triggers so that writes from every
+    # process (seed scripts, other workers) count, inside the writing transaction.
+    await execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    for table in VERSIONED_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            await execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    INSERT INTO table_versions (name, version) VALUES ('{table}', 1)
+                    ON CONFLICT (name) DO UPDATE SET version = version + 1;
+                END
+            """)
 
 
 async def get_or_create_api_key() -> tuple[str, bool]:
@@ -0,0 +1,50 @@
+"""
+Vector store backends, selected with VECTOR_BACKEND.
+
+* ``chroma`` — Chroma's persistent HNSW collection (the default).
+* ``numpy`` — an exact in-process index: normalized vectors in one
+  memory-mapped matrix (float32, or float16/int8 with exact rescoring),
+  searched with a single matrix-vector product. Better suited to corpora of
+  thousands to a few hundred thousand chunks.
+
+Backends are synchronous; app.db.vector_store runs them on its thread pool.
+Query results use Chroma's shape ({"ids", "documents", "metadatas",
+"distances"}, one inner list per query) with cosine distances, and `where`
+filters use the Chroma operator subset both backends understand: equality,
+``$eq``, ``$ne``, ``$in``, ``$nin``, ``$and`` and ``$or``.
+"""
+from typing import Protocol
+
+
+class VectorBackend(Protocol):
+    name: str
+
+    def upsert(self, ids: list[str], documents: list[str], embeddings: list[list[float]], metadatas: list[dict]) -> None: ...
+
+    def query(self, embedding: list[float], n_results: int, where: dict | None = None) -> dict: ...
+
+    def delete_source(self, source_id: str) -> None: ...
+
+    def delete_ids(self, ids: list[str]) -> None: ...
+
+    def inventory(self) -> dict[str, str]:
+        """Every stored chunk id, mapped to its source_id."""
+        ...
+
+    def compact(self) -> int | None:
+        """Reclaim space left by deleted vectors. Returns the bytes freed on disk, or None if unsupported."""
+        ...
+
+    def count(self) -> int: ...
+
+    def close(self) -> None: ...
+
+
+def create(name: str) -> VectorBackend:
+    if name == "chroma":
+        from app.db.vector_backends.chroma import ChromaBackend
+        return ChromaBackend()
+    if name == "numpy":
+        from app.db.vector_backends.numpy_index import NumpyBackend
+        return NumpyBackend()
+    raise ValueError(f"Unknown VECTOR_BACKEND {name!r}; expected 'chroma' or 'numpy'")
@@ -0,0 +1,86 @@
+"""
+Chroma backend. The collection handle is resolved once and reused, and writes
+are serialized behind a lock so concurrent uploads cannot interleave inside
+Chroma's persistence layer. Reads run concurrently.
+"""
+import threading
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from app.config import settings
+
+COLLECTION_NAME = "project_spain"
+# Ids fetched per page when listing the collection.
+_PAGE = 5_000
+
+
+class ChromaBackend:
+    name = "chroma"
+
+    def __init__(self, persist_dir: str | None = None):
+        self.persist_dir = persist_dir or settings.chroma_persist_dir
+        self._client: chromadb.ClientAPI | None = None
+        self._collection: chromadb.Collection | None = None
+        self._init_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def collection(self) -> chromadb.Collection:
+        if self._collection is None:
+            with self._init_lock:
+                if self._collection is None:
+                    self._client = chromadb.PersistentClient(
+                        path=self.persist_dir,
+                        settings=ChromaSettings(anonymized_telemetry=False),
+                    )
+                    self._collection = self._client.get_or_create_collection(
+                        name=COLLECTION_NAME,
+                        metadata={"hnsw:space": "cosine"},
+                    )
+        return self._collection
+
+    def upsert(self, ids: list[str], documents: list[str], embeddings: list[list[float]], metadatas: list[dict]) -> None:
+        collection = self.collection
+        with self._write_lock:
+            collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def query(self, embedding: list[float], n_results: int, where: dict | None = None) -> dict:
+        return self.collection.query(
+            query_embeddings=[embedding],
+            n_results=n_results,
+            where=where or None,
+            include=["documents", "metadatas", "distances"],
+        )
+
+    def delete_source(self, source_id: str) -> None:
+        collection = self.collection
+        with self._write_lock:
+            collection.delete(where={"source_id": source_id})
+
+    def delete_ids(self, ids: list[str]) -> None:
+        if not ids:
+            return
+        collection = self.collection
+        with self._write_lock:
+            collection.delete(ids=ids)
+
+    def inventory(self) -> dict[str, str]:
+        collection = self.collection
+        sources: dict[str, str] = {}
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=_PAGE, offset=offset)
+            for chunk_id, meta in zip(page["ids"], page["metadatas"]):
+                sources[chunk_id] = (meta or {}).get("source_id", "")
+            if len(page["ids"]) < _PAGE:
+                return sources
+            offset += _PAGE
+
+    def compact(self) -> None:
+        # Chroma exposes no compaction; its HNSW index reuses deleted slots on its own.
+        return None
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def close(self) -> None:
+        pass
@@ -1,53 +1,111 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+"""
+Async access to the vector store.
+
+The backend (Chroma or the in-process NumPy index, see app.db.vector_backends)
+is chosen with VECTOR_BACKEND and created once. Backends are synchronous, so
+every call runs on a dedicated thread pool instead of the event loop.
+
+Writes are mirrored into the FTS5 lexical index so hybrid retrieval sees the
+same chunks.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
+from app.db import lexical_index, vector_backends
+from app.db.vector_backends import VectorBackend
+from app.metrics import track
+
+_backend: VectorBackend | None = None
+_executor: ThreadPoolExecutor | None = None
+_init_lock = threading.Lock()
 
-_client: chromadb.Client | None = None
-COLLECTION_NAME = "project_spain"
 
+def get_backend() -> VectorBackend:
+    global _backend
+    if _backend is None:
+        with _init_lock:
+            if _backend is None:
+                _backend = vector_backends.create(settings.vector_backend)
+    return _backend
 
-def get_client() -> chromadb.Client:
-    global _client
-    if _client is None:
-        _client = chromadb.PersistentClient(
-            path=settings.chroma_persist_dir,
-            settings=ChromaSettings(anonymized_telemetry=False),
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.chroma_workers),
+            thread_name_prefix="vector-store",
         )
-    return _client
+    return _executor
 
 
-def get_collection() -> chromadb.Collection:
-    client = get_client()
-    return client.get_or_create_collection(
-        name=COLLECTION_NAME,
-        metadata={"hnsw:space": "cosine"},
-    )
+def _call(operation: str, args: tuple):
+    # Resolving the backend may open a Chroma client or map the index, so it happens on the pool too.
+    return getattr(get_backend(), operation)(*args)
+
+
+async def _run(operation: str, *args):
+    loop = asyncio.get_running_loop()
+    # Timed from submission, so time queued behind busy workers counts too.
+    async with track(settings.vector_backend, operation):
+        return await loop.run_in_executor(_get_executor(), _call, operation, args)
+
+
+async def warm_up() -> None:
+    """Create the backend now rather than on the first request."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_get_executor(), get_backend)
 
 
-def upsert_chunks(
+def shutdown() -> None:
+    global _executor, _backend
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _backend is not None:
+        _backend.close()
+        _backend = None
+
+
+async def upsert_chunks(
     ids: list[str],
     documents: list[str],
     embeddings: list[list[float]],
     metadatas: list[dict],
 ) -> None:
-    collection = get_collection()
-    collection.upsert(
-        ids=ids,
-        documents=documents,
-        embeddings=embeddings,
-        metadatas=metadatas,
+    await asyncio.gather(
+        _run("upsert", ids, documents, embeddings, metadatas),
+        lexical_index.upsert(ids, documents, metadatas),
     )
 
 
-def query_chunks(embedding: list[float], n_results: int = 5) -> dict:
-    collection = get_collection()
-    return collection.query(
-        query_embeddings=[embedding],
-        n_results=n_results,
-        include=["documents", "metadatas", "distances"],
+async def query_chunks(embedding: list[float], n_results: int = 5, where: dict | None = None) -> dict:
+    """Nearest chunks to `embedding`, optionally restricted by a metadata `where` filter."""
+    return await _run("query", embedding, n_results, where)
+
+
+async def delete_by_source(source_id: str) -> None:
+    await asyncio.gather(
+        _run("delete_source", source_id),
+        lexical_index.delete_by_source(source_id),
     )
 
 
-def delete_by_source(source_id: str) -> None:
-    collection = get_collection()
-    collection.delete(where={"source_id": source_id})
+async def delete_chunks(ids: list[str]) -> None:
+    if not ids:
+        return
+    await asyncio.gather(
+        _run("delete_ids", ids),
+        lexical_index.delete_ids(ids),
+    )
+
+
+async def inventory() -> dict[str, str]:
+    """Every chunk id in the vector store, mapped to its source_id."""
+    return await _run("inventory")
+
+
+async def compact() -> int | None:
+    """Compact the vector index. Returns the bytes reclaimed on disk, or None when the backend cannot compact."""
+    return await _run("compact")
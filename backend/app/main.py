@@ -1,14 +1,22 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app import metrics
 from app.config import settings
+from app.db import table_versions, vector_store
+from app.db import turso
 from app.db.turso import init_db, get_or_create_api_key
 from app.api.routes import notes, chat, checklist, documents
 from app.api.deps import verify_api_key
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.services import pdf_service, embedding_cache, ingestion_jobs, sweeper, warmup
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Runs in the background, alongside init_db and the rest of startup.
+    await warmup.start()
     await init_db()
     key, created = await get_or_create_api_key()
     if created:
@@ -16,7 +24,18 @@ async def lifespan(app: FastAPI):
         print("  API key generated — save this, it won't be shown again:")
         print(f"  {key}")
         print("=" * 60 + "\n")
+    await turso.start_replica()
+    await table_versions.start()
+    await ingestion_jobs.start()
+    await sweeper.start()
     yield
+    await sweeper.stop()
+    await ingestion_jobs.stop()
+    await warmup.stop()
+    await table_versions.stop()
+    await turso.stop_replica()
+    pdf_service.shutdown()
+    vector_store.shutdown()
 
 
 app = FastAPI(title="Project Spain API", lifespan=lifespan)
@@ -27,7 +46,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(notes.router, dependencies=[Depends(verify_api_key)])
 app.include_router(chat.router, dependencies=[Depends(verify_api_key)])
@@ -38,3 +59,22 @@ app.include_router(documents.router, dependencies=[Depends(verify_api_key)])
 @app.get("/health")
 async def health() -> dict:
     return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready() -> dict:
+    if not warmup.is_ready():
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> PlainTextResponse:
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/stats", dependencies=[Depends(verify_api_key)])
+async def stats() -> dict:
+    return {"embedding_cache": embedding_cache.stats()}
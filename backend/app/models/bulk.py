@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Any, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+BULK_MAX_ITEMS = 500
+
+
+class BulkCreate(BaseModel):
+    # Items are validated one by one so a bad item is reported instead of rejecting the batch.
+    items: list[dict[str, Any]] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkItemResult(BaseModel, Generic[T]):
+    index: int
+    status: str  # created | invalid | failed
+    item: Optional[T] = None
+    error: Optional[str] = None
+
+
+class BulkResponse(BaseModel, Generic[T]):
+    created: int
+    results: list[BulkItemResult[T]]
@@ -8,3 +8,16 @@ class DocumentResponse(BaseModel):
     file_type: str
     uploaded_at: str
     chunk_count: Optional[int] = None
+
+
+class IngestionJobResponse(BaseModel):
+    id: str
+    filename: str
+    status: str  # queued | running | done | failed
+    stage: str  # queued | extracting | embedding | indexing | done
+    chunks_total: Optional[int] = None
+    chunks_embedded: int = 0
+    document_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
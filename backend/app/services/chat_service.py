@@ -1,7 +1,12 @@
-from openai import AsyncOpenAI
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
 from app.config import settings
+from app.metrics import track
 
-_client: AsyncOpenAI | None = None
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+_client: "AsyncOpenAI | None" = None
 CHAT_MODEL = "gpt-4o"
 
 SYSTEM_PROMPT_TEMPLATE = """You are a personal assistant helping Kiko track his Spain Digital Nomad Visa journey. You have access to his notes, decisions, and uploaded documents.
@@ -14,20 +19,44 @@ Context:
 {retrieved_chunks}"""
 
 
-def get_client() -> AsyncOpenAI:
+def get_client() -> "AsyncOpenAI":
     global _client
     if _client is None:
+        # Imported here: openai is the heaviest import in the API.
+        from openai import AsyncOpenAI
         _client = AsyncOpenAI(api_key=settings.openai_api_key)
     return _client
 
 
-async def complete(system_prompt: str, user_message: str) -> str:
+def _messages(system_prompt: str, user_message: str, history: list[dict] | None = None) -> list[dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        *(history or []),
+        {"role": "user", "content": user_message},
+    ]
+
+
+async def complete(system_prompt: str, user_message: str, history: list[dict] | None = None) -> str:
     client = get_client()
-    response = await client.chat.completions.create(
-        model=CHAT_MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
-        ],
-    )
+    async with track("openai", "chat"):
+        response = await client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=_messages(system_prompt, user_message, history),
+        )
     return response.choices[0].message.content or ""
+
+
+async def complete_stream(system_prompt: str, user_message: str, history: list[dict] | None = None) -> AsyncIterator[str]:
+    """Yield the answer as content deltas arrive from the model."""
+    client = get_client()
+    # Timed separately: time to first token, then the whole stream.
+    async with track("openai", "chat_stream_first_token"):
+        stream = await client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=_messages(system_prompt, user_message, history),
+            stream=True,
+        )
+    async with track("openai", "chat_stream"):
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
@@ -0,0 +1,158 @@
+"""
+Structure-aware, token-budgeted chunking.
+
+Text is split into paragraphs (blank-line separated), paragraphs into
+sentences, and any sentence longer than the budget into word runs. Those units
+are packed greedily into chunks of at most `max_tokens` without ever cutting a
+unit in half, and each chunk opens with up to `overlap_tokens` worth of the
+previous chunk's trailing sentences. Every chunk records the pages it spans.
+
+`Chunker` is incremental: feed it one page at a time and it hands back the
+chunks that page completed, so chunks stream out while later pages are still
+being extracted.
+"""
+import re
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+from dataclasses import dataclass
+from app.config import settings
+from app.services.tokenizer import count_tokens
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[¿¡]?[A-Z0-9])")
+
+
+@dataclass
+class Chunk:
+    text: str
+    index: int
+    token_count: int
+    page_start: int | None = None
+    page_end: int | None = None
+
+    def metadata(self) -> dict:
+        """Vector-store metadata for this chunk (Chroma rejects None values)."""
+        meta = {"chunk_index": self.index}
+        if self.page_start is not None:
+            meta["page_start"] = self.page_start
+            meta["page_end"] = self.page_end
+        return meta
+
+
+@dataclass
+class _Unit:
+    text: str
+    tokens: int
+    page: int | None
+    starts_paragraph: bool
+
+
+class Chunker:
+    def __init__(self, max_tokens: int | None = None, overlap_tokens: int | None = None):
+        self.max_tokens = max(1, max_tokens or settings.chunk_max_tokens)
+        self.overlap_tokens = settings.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+        self._units: list[_Unit] = []
+        self._tokens = 0
+        self._fresh = 0  # units not carried over from the previous chunk
+        self._index = 0
+
+    def feed(self, text: str, page: int | None = None) -> list[Chunk]:
+        """Add text and return every chunk it completed."""
+        chunks = []
+        for unit in self._units_of(text, page):
+            if self._fresh and self._tokens + unit.tokens > self.max_tokens:
+                chunks.append(self._emit(next_tokens=unit.tokens))
+            self._units.append(unit)
+            self._tokens += unit.tokens
+            self._fresh += 1
+        return chunks
+
+    def flush(self) -> list[Chunk]:
+        """Return the final, partially filled chunk, if any."""
+        if not self._fresh:
+            return []
+        return [self._emit(next_tokens=None)]
+
+    def _emit(self, next_tokens: int | None) -> Chunk:
+        units = self._units
+        parts = []
+        for i, unit in enumerate(units):
+            if i:
+                parts.append("\n\n" if unit.starts_paragraph else " ")
+            parts.append(unit.text)
+        pages = [u.page for u in units if u.page is not None]
+        chunk = Chunk(
+            text="".join(parts),
+            index=self._index,
+            token_count=self._tokens,
+            page_start=min(pages) if pages else None,
+            page_end=max(pages) if pages else None,
+        )
+        self._index += 1
+
+        # Carry trailing units into the next chunk, leaving room for the unit that triggered the emit.
+        carried: list[_Unit] = []
+        if next_tokens is not None:
+            budget = min(self.overlap_tokens, self.max_tokens - next_tokens)
+            for unit in reversed(units):
+                if unit.tokens > budget:
+                    break
+                carried.insert(0, unit)
+                budget -= unit.tokens
+        self._units = carried
+        self._tokens = sum(u.tokens for u in carried)
+        self._fresh = 0
+        return chunk
+
+    def _units_of(self, text: str, page: int | None) -> Iterator[_Unit]:
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            paragraph = " ".join(paragraph.split())
+            if not paragraph:
+                continue
+            starts_paragraph = True
+            for sentence in _SENTENCE_END.split(paragraph):
+                for piece, tokens in self._fit(sentence):
+                    yield _Unit(piece, tokens, page, starts_paragraph)
+                    starts_paragraph = False
+
+    def _fit(self, sentence: str) -> Iterator[tuple[str, int]]:
+        """Yield the sentence whole, or as word runs of at most max_tokens."""
+        tokens = count_tokens(sentence)
+        if tokens <= self.max_tokens:
+            yield sentence, tokens
+            return
+        words: list[str] = []
+        run_tokens = 0
+        for word in sentence.split(" "):
+            word_tokens = count_tokens(" " + word)
+            if words and run_tokens + word_tokens > self.max_tokens:
+                yield " ".join(words), run_tokens
+                words, run_tokens = [], 0
+            words.append(word)
+            run_tokens += word_tokens
+        if words:
+            yield " ".join(words), run_tokens
+
+
+def chunk_text(text: str, max_tokens: int | None = None, overlap_tokens: int | None = None) -> list[Chunk]:
+    chunker = Chunker(max_tokens, overlap_tokens)
+    return chunker.feed(text) + chunker.flush()
+
+
+def chunk_pages(pages: Iterable[str], max_tokens: int | None = None, overlap_tokens: int | None = None) -> Iterator[Chunk]:
+    """Chunk page texts (page numbers start at 1), yielding chunks as they complete."""
+    chunker = Chunker(max_tokens, overlap_tokens)
+    for page_number, text in enumerate(pages, start=1):
+        yield from chunker.feed(text, page=page_number)
+    yield from chunker.flush()
+
+
+async def achunk_pages(pages: AsyncIterable[str], max_tokens: int | None = None, overlap_tokens: int | None = None) -> AsyncIterator[Chunk]:
+    """Async variant of chunk_pages for page streams such as pdf_service.iter_pages."""
+    chunker = Chunker(max_tokens, overlap_tokens)
+    page_number = 0
+    async for text in pages:
+        page_number += 1
+        for chunk in chunker.feed(text, page=page_number):
+            yield chunk
+    for chunk in chunker.flush():
+        yield chunk
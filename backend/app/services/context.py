@@ -0,0 +1,127 @@
+"""
+Context assembly for the RAG prompt.
+
+Retrieval over-fetches candidates; this module decides which of them reach the
+model:
+
+1. Dense hits whose cosine distance exceeds CONTEXT_MAX_DISTANCE are dropped.
+   Lexical-only hits carry no distance and are kept — they matched query terms.
+2. The rest are reranked with maximal marginal relevance, trading retrieval
+   rank against word overlap with what is already selected, so the overlap
+   the chunker carries between neighbouring chunks does not fill the prompt
+   with near-duplicates.
+3. Chunks are taken in MMR order until CONTEXT_MAX_TOKENS is spent.
+4. Selected chunks that are neighbours in the same source are merged back into
+   one passage, with the shared overlap written once.
+"""
+import re
+from app.config import settings
+from app.services.tokenizer import count_tokens
+
+_WORD = re.compile(r"\w+")
+
+
+def _relevance(hits: list[dict]) -> list[float]:
+    """Retrieval score per hit, scaled to [0, 1]. Falls back to rank when no scores exist."""
+    scores = []
+    for rank, hit in enumerate(hits):
+        if hit.get("rrf_score") is not None:
+            scores.append(hit["rrf_score"])
+        elif hit.get("distance") is not None:
+            scores.append(1.0 - hit["distance"])
+        else:
+            scores.append(1.0 / (rank + 1))
+    top = max(scores, default=0.0)
+    return [s / top if top > 0 else 0.0 for s in scores]
+
+
+def _similarity(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def mmr(hits: list[dict], lambda_: float) -> list[dict]:
+    """Reorder hits by maximal marginal relevance: lambda·relevance − (1−lambda)·max similarity."""
+    relevance = _relevance(hits)
+    words = [set(_WORD.findall(hit["document"].lower())) for hit in hits]
+    remaining = list(range(len(hits)))
+    selected: list[int] = []
+    while remaining:
+        def score(i: int) -> float:
+            redundancy = max((_similarity(words[i], words[j]) for j in selected), default=0.0)
+            return lambda_ * relevance[i] - (1 - lambda_) * redundancy
+        best = max(remaining, key=score)
+        selected.append(best)
+        remaining.remove(best)
+    return [hits[i] for i in selected]
+
+
+def join_chunks(left: str, right: str) -> str:
+    """Concatenate neighbouring chunks, writing the text `right` repeats from `left` once."""
+    # Overlap is whole sentences, so anything shorter than the probe is not worth detecting.
+    probe = right[:8]
+    start = left.find(probe) if probe else -1
+    while start != -1:
+        if right.startswith(left[start:]):
+            return left + right[len(left) - start:]
+        start = left.find(probe, start + 1)
+    return left + "\n\n" + right
+
+
+def _merge_neighbours(hits: list[dict]) -> list[dict]:
+    """Merge hits from one source with consecutive chunk_index into passages.
+
+    Passages keep the position of their best-ranked chunk.
+    """
+    groups: dict[str, list[tuple[int, dict]]] = {}
+    passages: list[dict] = []
+    for rank, hit in enumerate(hits):
+        meta = hit["metadata"]
+        index = meta.get("chunk_index")
+        if index is None:
+            passages.append({"rank": rank, "metadata": meta, "text": hit["document"], "ids": [hit["id"]]})
+        else:
+            groups.setdefault(meta.get("source_id", ""), []).append((rank, hit))
+
+    for members in groups.values():
+        members.sort(key=lambda m: m[1]["metadata"]["chunk_index"])
+        current = None
+        for rank, hit in members:
+            index = hit["metadata"]["chunk_index"]
+            if current and index == current["last_index"] + 1:
+                current["text"] = join_chunks(current["text"], hit["document"])
+                current["rank"] = min(current["rank"], rank)
+                current["ids"].append(hit["id"])
+            else:
+                current = {"rank": rank, "metadata": hit["metadata"], "text": hit["document"], "ids": [hit["id"]]}
+                passages.append(current)
+            current["last_index"] = index
+
+    passages.sort(key=lambda p: p["rank"])
+    return [
+        {"source_id": p["metadata"].get("source_id", ""), "title": p["metadata"].get("title", ""), "text": p["text"], "ids": p["ids"]}
+        for p in passages
+    ]
+
+
+def pack(
+    hits: list[dict],
+    max_tokens: int | None = None,
+    max_distance: float | None = None,
+    lambda_: float | None = None,
+) -> list[dict]:
+    """Select, order and merge retrieved hits into {"source_id", "title", "text", "ids"} passages."""
+    max_tokens = settings.context_max_tokens if max_tokens is None else max_tokens
+    max_distance = settings.context_max_distance if max_distance is None else max_distance
+    lambda_ = settings.context_mmr_lambda if lambda_ is None else lambda_
+
+    kept = [h for h in hits if h.get("distance") is None or h["distance"] <= max_distance]
+    chosen = []
+    budget = max_tokens
+    for hit in mmr(kept, lambda_):
+        tokens = count_tokens(hit["document"])
+        if tokens <= budget:
+            chosen.append(hit)
+            budget -= tokens
+    return _merge_neighbours(chosen)
@@ -0,0 +1,115 @@
+"""
+Conversation memory for chat sessions.
+
+Turns are stored in chat_history, numbered per session. A session's prompt
+carries a rolling summary, kept in the conversations table, plus every turn the
+summary does not cover yet. Once CHAT_SUMMARIZE_EVERY turns have slid out of the
+last CHAT_HISTORY_WINDOW, `maybe_summarize` folds just those turns into the
+existing summary — one bounded model call, run after the response is sent. So a
+prompt carries at most CHAT_HISTORY_WINDOW + CHAT_SUMMARIZE_EVERY turns
+verbatim (one more when that is odd, to keep exchanges whole), however long
+the conversation runs.
+"""
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from app.config import settings
+from app.db import turso
+from app.services.chat_service import complete
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant about the user's Spain Digital Nomad Visa journey.
+
+You are given the current summary and the turns that followed it. Return an updated summary that keeps every fact, decision, open question and preference that may matter later, and drops small talk. Write plain prose, at most 200 words. Return only the summary."""
+
+
+@dataclass
+class Conversation:
+    summary: str = ""
+    history: list[dict] = field(default_factory=list)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _max_unsummarized() -> int:
+    """Most turns a prompt carries verbatim: the window plus what may await summarizing.
+
+    Rounded up to whole exchanges, so the oldest turn loaded is always a question, never an orphaned answer.
+    """
+    limit = max(0, settings.chat_history_window) + max(1, settings.chat_summarize_every)
+    return limit + limit % 2
+
+
+async def load(session_id: str) -> Conversation:
+    """The session's summary and its recent unsummarized turns, oldest first."""
+    conversation, turns = await turso.batch([
+        ("SELECT summary FROM conversations WHERE id = ?", [session_id]),
+        (
+            "SELECT role, content FROM chat_history WHERE session_id = ? "
+            "AND turn > COALESCE((SELECT summarized_turn FROM conversations WHERE id = ?), 0) "
+            "ORDER BY turn DESC LIMIT ?",
+            [session_id, session_id, _max_unsummarized()],
+        ),
+    ])
+    summary = conversation.rows[0][0] if conversation.rows else ""
+    history = [{"role": row[0], "content": row[1]} for row in reversed(turns.rows)]
+    return Conversation(summary=summary, history=history)
+
+
+async def record(session_id: str, query: str, answer: str, sources: list[str]) -> None:
+    """Append a user/assistant exchange to the session, creating it on first use."""
+    now = _now()
+    turn = "(SELECT turn_count FROM conversations WHERE id = ?)"
+    await turso.batch([
+        (
+            "INSERT INTO conversations (id, summary, summarized_turn, turn_count, created_at, updated_at) "
+            "VALUES (?, '', 0, 2, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET turn_count = turn_count + 2, updated_at = excluded.updated_at",
+            [session_id, now, now],
+        ),
+        (
+            "INSERT INTO chat_history (id, session_id, turn, role, content, sources, created_at) "
+            f"VALUES (?, ?, {turn} - 1, 'user', ?, NULL, ?), (?, ?, {turn}, 'assistant', ?, ?, ?)",
+            [
+                str(uuid.uuid4()), session_id, session_id, query, now,
+                str(uuid.uuid4()), session_id, session_id, answer, json.dumps(sources), now,
+            ],
+        ),
+    ])
+
+
+async def maybe_summarize(session_id: str) -> None:
+    """Fold turns that have left the window into the summary, once enough have piled up."""
+    try:
+        result = await turso.execute(
+            "SELECT summary, summarized_turn, turn_count FROM conversations WHERE id = ?", [session_id],
+        )
+        if not result.rows:
+            return
+        summary, summarized, total = result.rows[0]
+        # Fold whole exchanges only, so a question is never summarized apart from its answer.
+        upto = total - max(0, settings.chat_history_window)
+        upto -= upto % 2
+        if upto - summarized < max(1, settings.chat_summarize_every):
+            return
+
+        turns = await turso.execute(
+            "SELECT role, content FROM chat_history WHERE session_id = ? AND turn > ? AND turn <= ? ORDER BY turn",
+            [session_id, summarized, upto],
+        )
+        transcript = "\n".join(f"{role}: {content}" for role, content in turns.rows)
+        updated = await complete(SUMMARY_PROMPT, f"Current summary:\n{summary or '(none yet)'}\n\nNew turns:\n{transcript}")
+
+        # The summarized_turn guard makes a concurrent summarizer's stale write a no-op.
+        await turso.execute(
+            "UPDATE conversations SET summary = ?, summarized_turn = ?, updated_at = ? WHERE id = ? AND summarized_turn = ?",
+            [updated.strip(), upto, _now(), session_id, summarized],
+        )
+    except Exception:
+        # The turns stay unsummarized and are retried after the next exchange.
+        logger.exception("Summarizing conversation %s failed", session_id)
@@ -0,0 +1,166 @@
+"""
+Document ingestion and deletion with content-hash deduplication.
+
+* Whole files — the SHA-256 of the upload is stored in documents.content_hash,
+  so a re-upload is answered from Turso before any parsing happens and adds
+  nothing to the index.
+* Chunks within a document — a chunk's vector id is the document id plus a
+  hash of its text, so text repeated inside one document (running headers,
+  boilerplate) is indexed once.
+
+Identical chunks in different documents are not shared: each document stores
+its own copy of the vector, because a vector's metadata (source, title, pages,
+position) drives retrieval filters and citations, and deleting a document must
+delete exactly its vectors. Such text is only not embedded again: embed_many
+answers it from the embedding cache.
+
+document_chunks lists each document's chunk ids in order. The extracted text
+of every page is kept in document_pages, so a document can be re-chunked and
+re-embedded (services/reindex) without its PDF.
+"""
+import hashlib
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import datetime, timezone
+from app.config import settings
+from app.db import turso, table_versions
+from app.db.vector_store import upsert_chunks, delete_by_source
+from app.models.document import DocumentResponse
+from app.services.chunking import Chunk, achunk_pages
+from app.services.embedding_service import embed_many
+from app.services.pdf_service import iter_pages
+
+# Stay well below SQLite's bound-parameter limit.
+_INSERT_BATCH = 200
+# Page rows per INSERT; page text is large, so far fewer than chunk rows.
+_PAGE_BATCH = 50
+
+# Called with stage= / chunks_total= / chunks_embedded= keyword updates as ingestion advances.
+Progress = Callable[..., Awaitable[None]]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def chunk_id(doc_id: str, text: str) -> str:
+    return f"{doc_id}_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+
+async def find_by_hash(digest: str) -> DocumentResponse | None:
+    result = await turso.execute(
+        "SELECT id, filename, file_type, uploaded_at, chunk_count FROM documents WHERE content_hash = ?",
+        [digest],
+    )
+    if not result.rows:
+        return None
+    row = result.rows[0]
+    return DocumentResponse(id=row[0], filename=row[1], file_type=row[2], uploaded_at=row[3], chunk_count=row[4])
+
+
+async def _noop_progress(**fields) -> None:
+    pass
+
+
+async def _recording(pages: AsyncIterator[str], into: list[str]) -> AsyncIterator[str]:
+    """Pass pages through, keeping a copy of each."""
+    async for text in pages:
+        into.append(text)
+        yield text
+
+
+def page_statements(doc_id: str, pages: list[str]) -> list[tuple[str, list]]:
+    """INSERTs storing a document's page texts, numbered from 1."""
+    statements = []
+    for start in range(0, len(pages), _PAGE_BATCH):
+        batch = pages[start: start + _PAGE_BATCH]
+        args: list = []
+        for page, text in enumerate(batch, start=start + 1):
+            args.extend([doc_id, page, text])
+        placeholders = ", ".join("(?, ?, ?)" for _ in batch)
+        statements.append((f"INSERT INTO document_pages (doc_id, page, text) VALUES {placeholders}", args))
+    return statements
+
+
+def chunk_statements(doc_id: str, ids: list[str]) -> list[tuple[str, list]]:
+    """INSERTs recording which chunks a document uses, in document order."""
+    statements = []
+    for start in range(0, len(ids), _INSERT_BATCH):
+        batch = ids[start: start + _INSERT_BATCH]
+        args: list = []
+        for position, cid in enumerate(batch, start=start):
+            args.extend([doc_id, cid, position])
+        placeholders = ", ".join("(?, ?, ?)" for _ in batch)
+        statements.append((f"INSERT INTO document_chunks (doc_id, chunk_id, position) VALUES {placeholders}", args))
+    return statements
+
+
+def metadata(doc_id: str, filename: str, chunk: Chunk) -> dict:
+    return {"source_id": doc_id, "source_type": "document", "title": filename, "category": "document", **chunk.metadata()}
+
+
+async def ingest(filename: str, content: bytes, digest: str, progress: Progress = _noop_progress) -> DocumentResponse:
+    doc_id = str(uuid.uuid4())
+    now = _now()
+
+    await progress(stage="extracting")
+    pages: list[str] = []
+    unique: dict[str, Chunk] = {}
+    async for chunk in achunk_pages(_recording(iter_pages(content), pages)):
+        unique.setdefault(chunk_id(doc_id, chunk.text), chunk)
+    ids = list(unique)
+    await progress(stage="embedding", chunks_total=len(ids), chunks_embedded=0)
+
+    # Embed and index in windows that keep every concurrent embedding request busy,
+    # so progress can be reported (and the index filled) as the document goes.
+    window = max(1, settings.embedding_batch_size * settings.embedding_concurrency)
+    try:
+        for start in range(0, len(ids), window):
+            window_ids = ids[start: start + window]
+            texts = [unique[cid].text for cid in window_ids]
+            embeddings = await embed_many(texts)
+            metadatas = [metadata(doc_id, filename, unique[cid]) for cid in window_ids]
+            await upsert_chunks(window_ids, texts, embeddings, metadatas)
+            await progress(chunks_embedded=start + len(window_ids))
+    except Exception:
+        await delete_by_source(doc_id)
+        raise
+
+    await progress(stage="indexing")
+
+    statements = [(
+        "INSERT INTO documents (id, filename, file_type, uploaded_at, chunk_count, content_hash) VALUES (?, ?, ?, ?, ?, ?)",
+        [doc_id, filename, "pdf", now, len(ids), digest],
+    )]
+    statements += chunk_statements(doc_id, ids) + page_statements(doc_id, pages)
+
+    try:
+        await turso.batch(statements)
+    except Exception:
+        # The usual cause is a concurrent upload of the same file winning the unique content_hash index.
+        await delete_by_source(doc_id)
+        existing = await find_by_hash(digest)
+        if existing is None:
+            raise
+        return existing
+
+    table_versions.bump("documents")
+    return DocumentResponse(id=doc_id, filename=filename, file_type="pdf", uploaded_at=now, chunk_count=len(ids))
+
+
+async def delete(doc_id: str) -> bool:
+    """Delete a document and its chunks. False if it does not exist."""
+    document, _, _ = await turso.batch([
+        ("DELETE FROM documents WHERE id = ? RETURNING id", [doc_id]),
+        ("DELETE FROM document_chunks WHERE doc_id = ?", [doc_id]),
+        ("DELETE FROM document_pages WHERE doc_id = ?", [doc_id]),
+    ])
+    if not document.rows:
+        return False
+    table_versions.bump("documents")
+    await delete_by_source(doc_id)
+    return True
@@ -0,0 +1,133 @@
+"""
+Content-addressed embedding cache.
+
+Entries are keyed by (model, sha256(text)). A bounded in-memory LRU sits in
+front of the embedding_cache table in Turso, so texts we have embedded before —
+re-uploaded PDFs, re-seeded notes, repeated chat queries — never reach the
+provider again. Vectors are stored as packed float32 blobs.
+"""
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from app.config import settings
+from app.db import turso
+
+logger = logging.getLogger(__name__)
+
+# Stay well below SQLite's bound-parameter limit.
+_LOOKUP_BATCH = 500
+_INSERT_BATCH = 200
+
+_memory: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+_stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _encode(embedding: list[float]) -> bytes:
+    return array("f", embedding).tobytes()
+
+
+def _decode(blob: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+def _remember(key: tuple[str, str], embedding: list[float]) -> None:
+    _memory[key] = embedding
+    _memory.move_to_end(key)
+    while len(_memory) > settings.embedding_cache_size:
+        _memory.popitem(last=False)
+
+
+async def _load(model: str, hashes: list[str]) -> dict[str, list[float]]:
+    found: dict[str, list[float]] = {}
+    for start in range(0, len(hashes), _LOOKUP_BATCH):
+        batch = hashes[start: start + _LOOKUP_BATCH]
+        placeholders = ", ".join("?" for _ in batch)
+        result = await turso.execute(
+            f"SELECT text_hash, embedding FROM embedding_cache WHERE model = ? AND text_hash IN ({placeholders})",
+            [model, *batch],
+        )
+        for row in result.rows:
+            found[row[0]] = _decode(row[1])
+    return found
+
+
+async def get_many(model: str, texts: list[str]) -> list[list[float] | None]:
+    """Return the cached embedding for each text, or None where there is none."""
+    hashes = [text_hash(t) for t in texts]
+    results: list[list[float] | None] = [None] * len(texts)
+    pending: dict[str, list[int]] = {}
+    for i, h in enumerate(hashes):
+        key = (model, h)
+        if key in _memory:
+            _memory.move_to_end(key)
+            results[i] = _memory[key]
+            _stats["memory_hits"] += 1
+        else:
+            pending.setdefault(h, []).append(i)
+
+    if pending and settings.embedding_cache_persist:
+        try:
+            found = await _load(model, list(pending))
+        except Exception:
+            logger.warning("Embedding cache lookup failed; treating as misses", exc_info=True)
+            found = {}
+        for h, embedding in found.items():
+            _remember((model, h), embedding)
+            for i in pending.pop(h):
+                results[i] = embedding
+                _stats["persistent_hits"] += 1
+
+    _stats["misses"] += sum(len(positions) for positions in pending.values())
+    return results
+
+
+async def put_many(model: str, texts: list[str], embeddings: list[list[float]]) -> None:
+    rows: dict[str, list[float]] = {}
+    for text, embedding in zip(texts, embeddings):
+        h = text_hash(text)
+        _remember((model, h), embedding)
+        rows[h] = embedding
+
+    if not rows or not settings.embedding_cache_persist:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    items = list(rows.items())
+    try:
+        for start in range(0, len(items), _INSERT_BATCH):
+            batch = items[start: start + _INSERT_BATCH]
+            args: list = []
+            for h, embedding in batch:
+                args.extend([model, h, _encode(embedding), now])
+            placeholders = ", ".join("(?, ?, ?, ?)" for _ in batch)
+            await turso.execute(
+                f"INSERT OR IGNORE INTO embedding_cache (model, text_hash, embedding, created_at) VALUES {placeholders}",
+                args,
+            )
+    except Exception:
+        logger.warning("Embedding cache write failed", exc_info=True)
+
+
+def stats() -> dict:
+    hits = _stats["memory_hits"] + _stats["persistent_hits"]
+    lookups = hits + _stats["misses"]
+    return {
+        **_stats,
+        "hits": hits,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "memory_entries": len(_memory),
+    }
+
+
+def clear() -> None:
+    """Drop the in-memory tier and reset counters. The persistent tier is kept."""
+    _memory.clear()
+    for key in _stats:
+        _stats[key] = 0
@@ -0,0 +1,151 @@
+"""
+Embedding backends, selected with EMBEDDING_PROVIDER.
+
+* ``openai`` — text-embedding-3-small over the API.
+* ``local`` — a signed feature-hashing vectorizer over words and word bigrams,
+  computed in batches with NumPy. It needs no network and no fitted vocabulary,
+  so a text embeds to the same vector in every process, which is what lets
+  stored chunks and later queries meet in the same space. It captures lexical
+  overlap only; use it for offline environments and benchmarks, not for
+  semantic quality.
+
+EMBEDDING_DIMENSIONS shortens the vectors both produce: OpenAI returns
+shortened embeddings itself (the ``dimensions`` parameter), and local vectors
+are truncated to their first components and renormalized. 0 keeps the full
+size.
+
+A provider's ``name`` keys the embedding cache, and vectors from different
+providers or dimensions are not comparable: switching either requires
+re-indexing.
+
+numpy and openai are imported on first use, so importing this module (and the
+API) stays cheap.
+"""
+import asyncio
+import hashlib
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Protocol
+from app.config import settings
+from app.metrics import track
+
+if TYPE_CHECKING:
+    import numpy as np
+    from openai import AsyncOpenAI
+
+_client: "AsyncOpenAI | None" = None
+_WORD = re.compile(r"\w+")
+
+
+class EmbeddingProvider(Protocol):
+    name: str
+    # Token budget per request, or None when batches are bounded by input count only.
+    max_batch_tokens: int | None
+
+    async def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+
+def get_client() -> "AsyncOpenAI":
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        _client = AsyncOpenAI(api_key=settings.openai_api_key)
+    return _client
+
+
+def truncate(matrix: "np.ndarray", dim: int) -> "np.ndarray":
+    """Keep the first `dim` components of each row and scale rows back to unit length."""
+    import numpy as np
+    if dim <= 0 or dim >= matrix.shape[1]:
+        return matrix
+    matrix = matrix[:, :dim]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class OpenAIProvider:
+    model = "text-embedding-3-small"
+
+    def __init__(self, dimensions: int | None = None):
+        self.dimensions = max(0, settings.embedding_dimensions if dimensions is None else dimensions)
+        # Cache rows written before providers existed are keyed by the bare model name.
+        self.name = f"{self.model}-{self.dimensions}" if self.dimensions else self.model
+
+    @property
+    def max_batch_tokens(self) -> int:
+        return settings.embedding_batch_tokens
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        options = {"dimensions": self.dimensions} if self.dimensions else {}
+        async with track("openai", "embeddings"):
+            response = await get_client().embeddings.create(input=texts, model=self.model, **options)
+        results: list[list[float] | None] = [None] * len(texts)
+        for item in response.data:
+            results[item.index] = item.embedding
+        return results
+
+
+@lru_cache(maxsize=100_000)
+def _feature(token: str, dim: int) -> int:
+    """Stable signed bucket for a feature: bucket + 1, negated for half of all features."""
+    value = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    bucket = (value >> 1) % dim + 1
+    return -bucket if value & 1 else bucket
+
+
+class HashingProvider:
+    max_batch_tokens = None
+
+    def __init__(self, dim: int | None = None, dimensions: int | None = None):
+        self.dim = max(1, dim or settings.local_embedding_dim)
+        dimensions = settings.embedding_dimensions if dimensions is None else dimensions
+        # Vectors are hashed at full size, so a truncated space is a prefix of the full one.
+        self.dimensions = dimensions if 0 < dimensions < self.dim else 0
+        self.name = f"local-hashing-{self.dim}-{self.dimensions}" if self.dimensions else f"local-hashing-{self.dim}"
+
+    def _features(self, text: str) -> list[int]:
+        words = _WORD.findall(text.lower())
+        tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return [_feature(token, self.dim) for token in tokens]
+
+    def embed_sync(self, texts: list[str]) -> list[list[float]]:
+        import numpy as np
+        rows: list[int] = []
+        features: list[int] = []
+        for row, text in enumerate(texts):
+            found = self._features(text)
+            rows.extend([row] * len(found))
+            features.extend(found)
+
+        rows_arr = np.asarray(rows, dtype=np.int64)
+        signed = np.asarray(features, dtype=np.int64)
+        cols = np.abs(signed) - 1
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(counts, (rows_arr, cols), np.sign(signed).astype(np.float32))
+
+        # Sublinear term frequency keeps repeated words from dominating, then unit length for cosine.
+        matrix = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        # Text with no words (empty, whitespace, punctuation) would be the zero vector, whose
+        # cosine is NaN; give it a fixed unit vector instead. Component 0 survives truncation.
+        matrix[norms[:, 0] == 0, 0] = 1.0
+        return truncate(matrix, self.dimensions).tolist()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        # Tokenizing is pure Python; keep it off the event loop.
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+
+_PROVIDERS = {"openai": OpenAIProvider, "local": HashingProvider}
+_instances: dict[tuple, EmbeddingProvider] = {}
+
+
+def get_provider() -> EmbeddingProvider:
+    name = settings.embedding_provider.lower()
+    if name not in _PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER {settings.embedding_provider!r}; expected one of {sorted(_PROVIDERS)}")
+    key = (name, settings.local_embedding_dim, settings.embedding_dimensions)
+    if key not in _instances:
+        _instances[key] = _PROVIDERS[name]()
+    return _instances[key]
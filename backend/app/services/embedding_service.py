@@ -1,30 +1,62 @@
-from openai import AsyncOpenAI
+import asyncio
 from app.config import settings
+from app.services import embedding_cache
+from app.services.embedding_providers import EmbeddingProvider, get_provider
+from app.services.tokenizer import count_tokens
 
-_client: AsyncOpenAI | None = None
-EMBEDDING_MODEL = "text-embedding-3-small"
 
+def _batch_indices(texts: list[str], max_tokens: int | None) -> list[list[int]]:
+    """Group input positions into batches bounded by input count and, if given, total tokens."""
+    max_inputs = max(1, settings.embedding_batch_size)
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        if max_tokens is None:
+            if len(current) >= max_inputs:
+                batches.append(current)
+                current = []
+            current.append(i)
+            continue
+        tokens = count_tokens(text)
+        if current and (len(current) >= max_inputs or current_tokens + tokens > max(1, max_tokens)):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
 
-def get_client() -> AsyncOpenAI:
-    global _client
-    if _client is None:
-        _client = AsyncOpenAI(api_key=settings.openai_api_key)
-    return _client
+
+async def _embed_uncached(provider: EmbeddingProvider, texts: list[str]) -> list[list[float]]:
+    semaphore = asyncio.Semaphore(max(1, settings.embedding_concurrency))
+    results: list[list[float] | None] = [None] * len(texts)
+
+    async def run(batch: list[int]) -> None:
+        async with semaphore:
+            embeddings = await provider.embed([texts[i] for i in batch])
+        for i, embedding in zip(batch, embeddings):
+            results[i] = embedding
+
+    await asyncio.gather(*(run(batch) for batch in _batch_indices(texts, provider.max_batch_tokens)))
+    return results
 
 
 async def embed(text: str) -> list[float]:
-    client = get_client()
-    response = await client.embeddings.create(
-        input=text,
-        model=EMBEDDING_MODEL,
-    )
-    return response.data[0].embedding
+    return (await embed_many([text]))[0]
 
 
 async def embed_many(texts: list[str]) -> list[list[float]]:
-    client = get_client()
-    response = await client.embeddings.create(
-        input=texts,
-        model=EMBEDDING_MODEL,
-    )
-    return [item.embedding for item in response.data]
+    if not texts:
+        return []
+    provider = get_provider()
+    results = await embedding_cache.get_many(provider.name, texts)
+    # Embed each distinct missing text once, then fan the result back out.
+    misses = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+    if misses:
+        fresh = await _embed_uncached(provider, misses)
+        await embedding_cache.put_many(provider.name, misses, fresh)
+        by_text = dict(zip(misses, fresh))
+        results = [r if r is not None else by_text[t] for t, r in zip(texts, results)]
+    return results
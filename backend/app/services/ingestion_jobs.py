@@ -0,0 +1,162 @@
+"""
+Background ingestion jobs for document uploads.
+
+An upload is written to UPLOAD_DIR, recorded in the ingestion_jobs table and
+queued; the HTTP request returns straight away. A fixed pool of asyncio workers
+(INGESTION_WORKERS) runs document_service.ingest and writes the stage and
+chunk progress back to the job row. Because both the job row and the upload
+file are persisted, jobs that were queued or running when the process stopped
+are picked up again by `start()`.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from app.config import settings
+from app.db import turso, table_versions
+from app.models.document import IngestionJobResponse
+from app.services import document_service
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = "id, filename, status, stage, chunks_total, chunks_embedded, document_id, error, created_at, updated_at, content_hash"
+_ACTIVE = ("queued", "running")
+
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _upload_path(job_id: str) -> Path:
+    return Path(settings.upload_dir) / f"{job_id}.pdf"
+
+
+def _from_row(row) -> tuple[IngestionJobResponse, str]:
+    job = IngestionJobResponse(
+        id=row[0], filename=row[1], status=row[2], stage=row[3], chunks_total=row[4],
+        chunks_embedded=row[5] or 0, document_id=row[6], error=row[7], created_at=row[8], updated_at=row[9],
+    )
+    return job, row[10]
+
+
+async def get(job_id: str) -> IngestionJobResponse | None:
+    result = await turso.execute(f"SELECT {_COLUMNS} FROM ingestion_jobs WHERE id = ?", [job_id])
+    return _from_row(result.rows[0])[0] if result.rows else None
+
+
+async def _update(job_id: str, **fields) -> None:
+    fields["updated_at"] = _now()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    await turso.execute(f"UPDATE ingestion_jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+    table_versions.bump("ingestion_jobs")
+
+
+async def _insert(job: IngestionJobResponse, digest: str) -> None:
+    await turso.execute(
+        f"INSERT INTO ingestion_jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [job.id, job.filename, job.status, job.stage, job.chunks_total, job.chunks_embedded,
+         job.document_id, job.error, job.created_at, job.updated_at, digest],
+    )
+    table_versions.bump("ingestion_jobs")
+
+
+async def submit(filename: str, content: bytes, digest: str) -> tuple[IngestionJobResponse, bool]:
+    """Record and queue an upload. Returns (job, queued) — queued is False when
+    the file was already ingested; the returned job then describes the existing
+    document, is already done and is not stored, so there is nothing to poll."""
+    now = _now()
+    existing = await document_service.find_by_hash(digest)
+    if existing:
+        job = IngestionJobResponse(
+            id=existing.id, filename=existing.filename, status="done", stage="done",
+            chunks_total=existing.chunk_count, chunks_embedded=existing.chunk_count or 0,
+            document_id=existing.id, created_at=existing.uploaded_at, updated_at=existing.uploaded_at,
+        )
+        return job, False
+
+    result = await turso.execute(
+        f"SELECT {_COLUMNS} FROM ingestion_jobs WHERE content_hash = ? AND status IN (?, ?) LIMIT 1",
+        [digest, *_ACTIVE],
+    )
+    if result.rows:
+        return _from_row(result.rows[0])[0], True
+
+    job = IngestionJobResponse(
+        id=str(uuid.uuid4()), filename=filename, status="queued", stage="queued",
+        created_at=now, updated_at=now,
+    )
+    path = _upload_path(job.id)
+    await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+    await asyncio.to_thread(path.write_bytes, content)
+    await _insert(job, digest)
+    await enqueue(job.id, job.filename, digest)
+    return job, True
+
+
+async def enqueue(job_id: str, filename: str, digest: str) -> None:
+    if _queue is None:
+        raise RuntimeError("Ingestion workers are not running")
+    await _queue.put((job_id, filename, digest))
+
+
+async def run_job(job_id: str, filename: str, digest: str) -> None:
+    path = _upload_path(job_id)
+    try:
+        await _update(job_id, status="running", stage="extracting")
+        content = await asyncio.to_thread(path.read_bytes)
+        document = await document_service.find_by_hash(digest) or await document_service.ingest(
+            filename, content, digest,
+            progress=lambda **fields: _update(job_id, **fields),
+        )
+    except Exception as exc:
+        logger.exception("Ingestion job %s failed", job_id)
+        await _update(job_id, status="failed", error=str(exc) or type(exc).__name__)
+    else:
+        await _update(
+            job_id, status="done", stage="done", document_id=document.id,
+            chunks_total=document.chunk_count, chunks_embedded=document.chunk_count or 0,
+        )
+    await asyncio.to_thread(path.unlink, missing_ok=True)
+
+
+async def _worker() -> None:
+    while True:
+        job = await _queue.get()
+        try:
+            await run_job(*job)
+        except Exception:
+            logger.exception("Ingestion worker error")
+        finally:
+            _queue.task_done()
+
+
+async def start() -> None:
+    """Start the worker pool and re-queue jobs interrupted by a restart."""
+    global _queue
+    _queue = asyncio.Queue()
+    _workers[:] = [asyncio.create_task(_worker()) for _ in range(max(1, settings.ingestion_workers))]
+
+    result = await turso.execute(
+        f"SELECT {_COLUMNS} FROM ingestion_jobs WHERE status IN (?, ?) ORDER BY created_at",
+        list(_ACTIVE),
+    )
+    for row in result.rows:
+        job, digest = _from_row(row)
+        if _upload_path(job.id).exists():
+            await _update(job.id, status="queued", stage="queued")
+            await enqueue(job.id, job.filename, digest)
+        else:
+            await _update(job.id, status="failed", error="Upload file missing after restart")
+
+
+async def stop() -> None:
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
@@ -0,0 +1,90 @@
+"""
+PDF text extraction on a bounded process pool.
+
+PyMuPDF parsing is CPU-bound, so it must never run on the event loop. Pages are
+extracted in fixed-size ranges; the first range also reports the page count so
+small PDFs cost a single pool round-trip and large ones fan out across workers.
+Each page's text blocks are separated by blank lines so the chunker can see
+paragraph boundaries.
+
+fitz is only imported by the worker processes that parse, not by the API
+process itself.
+"""
+import asyncio
+import multiprocessing
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+from app.config import settings
+
+if TYPE_CHECKING:
+    import fitz
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, settings.pdf_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _page_text(page: "fitz.Page") -> str:
+    # Block type 0 is text; 1 is an image.
+    return "\n\n".join(block[4].strip() for block in page.get_text("blocks") if block[6] == 0)
+
+
+def _extract_range(content: bytes, start: int, stop: int) -> tuple[int, list[str]]:
+    """Runs in a worker process. Returns (page_count, texts of pages [start, stop))."""
+    import fitz
+    with fitz.open(stream=content, filetype="pdf") as pdf:
+        page_count = pdf.page_count
+        return page_count, [_page_text(pdf[i]) for i in range(start, min(stop, page_count))]
+
+
+async def iter_pages(content: bytes) -> AsyncIterator[str]:
+    """Yield page texts in order as soon as each range is extracted."""
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    step = max(1, settings.pdf_pages_per_task)
+
+    page_count, first = await loop.run_in_executor(executor, _extract_range, content, 0, step)
+    tasks = [
+        executor.submit(_extract_range, content, start, start + step)
+        for start in range(step, page_count, step)
+    ]
+    rest = [asyncio.wrap_future(task) for task in tasks]
+    try:
+        for text in first:
+            yield text
+        for future in rest:
+            _, pages = await future
+            for text in pages:
+                yield text
+    finally:
+        # On early exit or error, drop the ranges no worker has started, and wait
+        # for the ones already running (a worker cannot be interrupted mid-range),
+        # so no parsing outlives the caller and every exception is retrieved.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*rest, return_exceptions=True)
+
+
+async def extract_pages(content: bytes) -> list[str]:
+    """Return the text of every page, in page order."""
+    return [text async for text in iter_pages(content)]
+
+
+async def extract_text(content: bytes) -> str:
+    return "\n".join(await extract_pages(content))
@@ -1,26 +1,70 @@
-from app.services.embedding_service import embed
-from app.services.chat_service import complete, SYSTEM_PROMPT_TEMPLATE
-from app.db.vector_store import query_chunks
+import asyncio
+from collections.abc import AsyncIterator
+from app.config import settings
+from app.services import context, conversation_service
+from app.services.chat_service import complete, complete_stream, SYSTEM_PROMPT_TEMPLATE
+from app.services.conversation_service import Conversation
+from app.services.retrieval import Filters, retrieve
 
+SUMMARY_SECTION = "\n\nSummary of the earlier conversation:\n{summary}"
 
-async def chat(query: str) -> dict:
-    query_embedding = await embed(query)
-    results = query_chunks(query_embedding, n_results=5)
 
-    chunks = results.get("documents", [[]])[0]
-    metadatas = results.get("metadatas", [[]])[0]
+async def _build_prompt(query: str, filters: Filters | None = None) -> tuple[str, list[str]]:
+    """Retrieve and pack context for the query. Returns (system_prompt, source_ids)."""
+    hits = await retrieve(query, n_results=settings.context_candidates, filters=filters)
 
     context_parts = []
     sources = []
-    for chunk, meta in zip(chunks, metadatas):
-        source_id = meta.get("source_id", "")
-        title = meta.get("title", "")
-        context_parts.append(f"[{title}]: {chunk}")
+    for passage in context.pack(hits):
+        source_id = passage["source_id"]
+        context_parts.append(f"[{passage['title']}]: {passage['text']}")
         if source_id and source_id not in sources:
             sources.append(source_id)
 
     retrieved_chunks = "\n\n".join(context_parts) if context_parts else "No relevant context found."
-    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(retrieved_chunks=retrieved_chunks)
-    answer = await complete(system_prompt, query)
+    return SYSTEM_PROMPT_TEMPLATE.format(retrieved_chunks=retrieved_chunks), sources
 
+
+async def _prepare(query: str, session_id: str | None, filters: Filters | None) -> tuple[str, list[str], list[dict]]:
+    """Build the prompt and load the session's memory concurrently. Returns (system_prompt, sources, history)."""
+    if session_id is None:
+        system_prompt, sources = await _build_prompt(query, filters)
+        return system_prompt, sources, []
+    (system_prompt, sources), conversation = await asyncio.gather(
+        _build_prompt(query, filters), conversation_service.load(session_id),
+    )
+    return _with_summary(system_prompt, conversation), sources, conversation.history
+
+
+def _with_summary(system_prompt: str, conversation: Conversation) -> str:
+    if not conversation.summary:
+        return system_prompt
+    return system_prompt + SUMMARY_SECTION.format(summary=conversation.summary)
+
+
+async def chat(query: str, session_id: str | None = None, filters: Filters | None = None) -> dict:
+    system_prompt, sources, history = await _prepare(query, session_id, filters)
+    answer = await complete(system_prompt, query, history=history)
+    if session_id is not None:
+        await conversation_service.record(session_id, query, answer, sources)
     return {"answer": answer, "sources": sources}
+
+
+async def chat_stream(
+    query: str, session_id: str | None = None, filters: Filters | None = None,
+) -> tuple[list[str], AsyncIterator[str]]:
+    """Retrieve up front so sources can be sent before the first token.
+
+    With a session, the exchange is recorded once the answer has streamed in full.
+    """
+    system_prompt, sources, history = await _prepare(query, session_id, filters)
+
+    async def tokens() -> AsyncIterator[str]:
+        parts = []
+        async for token in complete_stream(system_prompt, query, history=history):
+            parts.append(token)
+            yield token
+        if session_id is not None:
+            await conversation_service.record(session_id, query, "".join(parts), sources)
+
+    return sources, tokens()
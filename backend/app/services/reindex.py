@@ -0,0 +1,192 @@
+"""
+Rebuild the vector store and lexical index from the text kept in Turso.
+
+Needed after changing the embedding provider or dimensions, the chunk size or
+the vector backend. Notes are re-chunked from notes.content and documents from
+document_pages, then re-embedded and written back under their existing ids.
+
+Sources are processed in batches with a bounded number in flight. Once a
+batch is done its sources are recorded in reindex_checkpoints under the run
+id, and a run skips every source it has already finished, so re-running an
+interrupted run picks up where it stopped. The default run id fingerprints
+the index configuration: the same command resumes, a changed setting starts
+over.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from app.config import settings
+from app.db import turso, table_versions
+from app.db.vector_store import upsert_chunks, delete_by_source
+from app.services import document_service
+from app.services.chunking import chunk_pages, chunk_text
+from app.services.context import join_chunks
+from app.services.embedding_providers import get_provider
+from app.services.embedding_service import embed_many
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the ids or metadata of indexed chunks change shape, so the default run starts over.
+_LAYOUT = 2
+# source_type -> table holding the sources
+_TABLES = {"note": "notes", "document": "documents"}
+# Checkpoint rows are written in one INSERT per batch; keep its parameters well under SQLite's limit.
+_MAX_BATCH = 500
+
+
+@dataclass
+class ReindexStats:
+    sources: int = 0
+    chunks: int = 0
+    # Sources with no stored text to rebuild from.
+    skipped: int = 0
+    failed: int = 0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def default_run_id() -> str:
+    """Fingerprint of every setting that changes what the index holds."""
+    config = [
+        _LAYOUT, get_provider().name, settings.chunk_max_tokens, settings.chunk_overlap_tokens,
+        settings.vector_backend, settings.vector_index_dtype,
+    ]
+    return hashlib.sha256(json.dumps(config).encode()).hexdigest()[:12]
+
+
+async def _note_content(note_id: str, content: str | None) -> str | None:
+    """The note's text; for notes saved before it was stored, rebuilt from its indexed chunks."""
+    if content is not None:
+        return content
+    result = await turso.execute(
+        "SELECT text FROM chunks WHERE source_id = ? ORDER BY json_extract(metadata, '$.chunk_index')",
+        [note_id],
+    )
+    if not result.rows:
+        return None
+    content = result.rows[0][0]
+    for (text,) in result.rows[1:]:
+        content = join_chunks(content, text)
+    await turso.execute("UPDATE notes SET content = ? WHERE id = ?", [content, note_id])
+    return content
+
+
+async def reindex_note(note_id: str) -> int | None:
+    """Re-chunk and re-embed one note. Returns its chunk count, or None if it has no text."""
+    result = await turso.execute("SELECT title, category, content FROM notes WHERE id = ?", [note_id])
+    if not result.rows:
+        return None
+    title, category, content = result.rows[0]
+    content = await _note_content(note_id, content)
+    if content is None:
+        return None
+
+    chunks = await asyncio.to_thread(chunk_text, content)
+    texts = [chunk.text for chunk in chunks]
+    embeddings = await embed_many(texts)
+    # Drop the old chunks first: with a larger chunk size there are fewer ids to overwrite.
+    await delete_by_source(note_id)
+    if chunks:
+        meta = {"source_id": note_id, "source_type": "note", "title": title, "category": category or ""}
+        await upsert_chunks(
+            ids=[f"{note_id}_{chunk.index}" for chunk in chunks],
+            documents=texts,
+            embeddings=embeddings,
+            metadatas=[{**meta, **chunk.metadata()} for chunk in chunks],
+        )
+    return len(chunks)
+
+
+async def reindex_document(doc_id: str) -> int | None:
+    """Re-chunk and re-embed one document from its stored pages. Returns its chunk count, or None without pages."""
+    document, pages = await turso.batch([
+        ("SELECT filename FROM documents WHERE id = ?", [doc_id]),
+        ("SELECT text FROM document_pages WHERE doc_id = ? ORDER BY page", [doc_id]),
+    ])
+    if not document.rows or not pages.rows:
+        return None
+    filename = document.rows[0][0]
+
+    chunks = await asyncio.to_thread(lambda: list(chunk_pages(row[0] for row in pages.rows)))
+    unique = {}
+    for chunk in chunks:
+        unique.setdefault(document_service.chunk_id(doc_id, chunk.text), chunk)
+    ids = list(unique)
+    texts = [unique[cid].text for cid in ids]
+    embeddings = await embed_many(texts)
+
+    await turso.batch([
+        ("DELETE FROM document_chunks WHERE doc_id = ?", [doc_id]),
+        *document_service.chunk_statements(doc_id, ids),
+        ("UPDATE documents SET chunk_count = ? WHERE id = ?", [len(ids), doc_id]),
+    ])
+    # Also drops vectors indexed under older id schemes (e.g. shared across documents).
+    await delete_by_source(doc_id)
+    await upsert_chunks(ids, texts, embeddings, [document_service.metadata(doc_id, filename, unique[cid]) for cid in ids])
+    return len(ids)
+
+
+_REINDEX = {"note": reindex_note, "document": reindex_document}
+
+
+async def _pending(run_id: str, source_type: str, after: str, limit: int) -> list[str]:
+    result = await turso.execute(
+        f"SELECT id FROM {_TABLES[source_type]} WHERE id > ? AND id NOT IN "
+        "(SELECT source_id FROM reindex_checkpoints WHERE run_id = ?) ORDER BY id LIMIT ?",
+        [after, run_id, limit],
+    )
+    return [row[0] for row in result.rows]
+
+
+async def run(
+    run_id: str | None = None,
+    batch_size: int = 20,
+    concurrency: int = 4,
+    source_types: tuple[str, ...] = ("note", "document"),
+    restart: bool = False,
+) -> ReindexStats:
+    """Reindex every source not yet finished by `run_id`. A source that fails is retried by the next run."""
+    run_id = run_id or default_run_id()
+    batch_size = min(max(1, batch_size), _MAX_BATCH)
+    if restart:
+        await turso.execute("DELETE FROM reindex_checkpoints WHERE run_id = ?", [run_id])
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    stats = ReindexStats()
+
+    async def one(source_type: str, source_id: str) -> bool:
+        async with semaphore:
+            try:
+                count = await _REINDEX[source_type](source_id)
+            except Exception:
+                logger.exception("Reindexing %s %s failed", source_type, source_id)
+                stats.failed += 1
+                return False
+        if count is None:
+            stats.skipped += 1
+        else:
+            stats.sources += 1
+            stats.chunks += count
+        return True
+
+    for source_type in source_types:
+        after = ""
+        while batch := await _pending(run_id, source_type, after, batch_size):
+            after = batch[-1]
+            done = await asyncio.gather(*(one(source_type, source_id) for source_id in batch))
+            finished = [source_id for source_id, ok in zip(batch, done) if ok]
+            if finished:
+                now = _now()
+                await turso.execute(
+                    "INSERT OR IGNORE INTO reindex_checkpoints (run_id, source_id, source_type, finished_at) VALUES "
+                    + ", ".join("(?, ?, ?, ?)" for _ in finished),
+                    [value for source_id in finished for value in (run_id, source_id, source_type, now)],
+                )
+            logger.info("Reindex %s: %d sources, %d chunks so far", run_id, stats.sources, stats.chunks)
+
+    table_versions.bump("documents")
+    return stats
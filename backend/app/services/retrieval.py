@@ -0,0 +1,90 @@
+"""
+Hybrid retrieval: dense vector search and BM25 lexical search, run concurrently
+and merged with reciprocal rank fusion.
+
+RRF only looks at ranks, so the two very different score scales (cosine
+distance vs. BM25) never need to be calibrated against each other.
+
+Metadata filters are applied inside both searches — the vector store's `where`
+and the lexical index's SQL — rather than to their results, so a scoped
+question gets a full set of candidates from the sources it is scoped to.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from app.config import settings
+from app.db import lexical_index
+from app.db.vector_store import query_chunks
+from app.services.embedding_service import embed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Filters:
+    """Restrict retrieval to chunks matching every non-empty field (any of its values)."""
+    categories: tuple[str, ...] = ()
+    source_types: tuple[str, ...] = ()
+    source_ids: tuple[str, ...] = ()
+
+    def fields(self) -> dict[str, list[str]]:
+        """Chunk metadata field -> allowed values, for the restricted fields only."""
+        fields = {"category": self.categories, "source_type": self.source_types, "source_id": self.source_ids}
+        return {field: list(values) for field, values in fields.items() if values}
+
+    def where(self) -> dict | None:
+        """The filters as a vector store `where` clause, or None when nothing is restricted."""
+        conditions = [{field: {"$in": values}} for field, values in self.fields().items()]
+        if len(conditions) > 1:
+            return {"$and": conditions}
+        return conditions[0] if conditions else None
+
+
+def _vector_hits(results: dict) -> list[dict]:
+    documents = results.get("documents", [[]])[0]
+    metadatas = results.get("metadatas", [[]])[0]
+    distances = (results.get("distances") or [[]])[0]
+    ids = (results.get("ids") or [[]])[0]
+    hits = []
+    for i, (document, metadata) in enumerate(zip(documents, metadatas)):
+        hits.append({
+            "id": ids[i] if i < len(ids) else f"{metadata.get('source_id', '')}#{i}",
+            "document": document,
+            "metadata": metadata,
+            "distance": distances[i] if i < len(distances) else None,
+        })
+    return hits
+
+
+def reciprocal_rank_fusion(rankings: list[list[dict]], k: int = 60) -> list[dict]:
+    """Merge ranked hit lists by sum(1 / (k + rank)). The first list's copy of a hit wins."""
+    scores: dict[str, float] = {}
+    hits: dict[str, dict] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit["id"]] = scores.get(hit["id"], 0.0) + 1.0 / (k + rank)
+            hits.setdefault(hit["id"], hit)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [{**hits[hit_id], "rrf_score": scores[hit_id]} for hit_id in ordered]
+
+
+async def _dense(query: str, n_results: int, filters: Filters) -> list[dict]:
+    return _vector_hits(await query_chunks(await embed(query), n_results=n_results, where=filters.where()))
+
+
+async def _lexical(query: str, n_results: int, filters: Filters) -> list[dict]:
+    try:
+        return await lexical_index.search(query, n_results, filters=filters.fields())
+    except Exception:
+        logger.warning("Lexical search failed; falling back to vector-only retrieval", exc_info=True)
+        return []
+
+
+async def retrieve(query: str, n_results: int = 5, filters: Filters | None = None) -> list[dict]:
+    """Top hits for the query as {"id", "document", "metadata", "distance"?} dicts."""
+    filters = filters or Filters()
+    candidates = max(n_results, settings.retrieval_candidates)
+    if not settings.hybrid_search:
+        return (await _dense(query, candidates, filters))[:n_results]
+    dense, lexical = await asyncio.gather(_dense(query, candidates, filters), _lexical(query, candidates, filters))
+    return reciprocal_rank_fusion([dense, lexical], k=settings.rrf_k)[:n_results]
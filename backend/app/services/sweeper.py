@@ -0,0 +1,147 @@
+"""
+Reconciliation between Turso and the search indexes.
+
+Turso and the vector store are written in separate steps — create_note inserts
+its row before embedding, deletes drop the row before the vectors — so a
+failure in between leaves orphan vectors, which keep taking top-k slots, or
+sources with no vectors at all. `sweep` diffs the two sides in bulk and
+repairs both:
+
+* chunks (vectors and lexical rows) whose source is gone from Turso are deleted;
+* notes without vectors, and documents missing any of their chunks, are
+  rebuilt from their stored text (services/reindex);
+* the vector index and the FTS index are compacted.
+
+It runs from seed/sweep.py, and every SWEEP_INTERVAL_MINUTES inside the API
+when that is set. An upload writes its vectors before its documents row, so
+orphan removal is held back while ingestion jobs are active. Note writes
+register their sources in pending_sources instead (app.db.pending_sources),
+and only those sources are skipped.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from app.config import settings
+from app.db import turso, vector_store, pending_sources
+from app.services import reindex
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task | None = None
+# Lexical rows of no note or document; bound to the pending-marker cutoff.
+_LEXICAL_ORPHAN = (
+    "source_id NOT IN (SELECT id FROM notes) AND source_id NOT IN (SELECT id FROM documents) "
+    "AND source_id NOT IN (SELECT source_id FROM pending_sources WHERE started_at > ?)"
+)
+
+
+@dataclass
+class SweepReport:
+    orphan_sources: int = 0
+    orphan_vectors: int = 0
+    orphan_lexical_rows: int = 0
+    reindexed_notes: int = 0
+    reindexed_documents: int = 0
+    # Sources missing from the index with no stored text to rebuild them from.
+    unrecoverable: list[str] = field(default_factory=list)
+    # None when the vector backend cannot compact (Chroma).
+    bytes_reclaimed: int | None = None
+    # Orphans were found but left alone because ingestion was running.
+    deferred: bool = False
+
+
+async def sweep(dry_run: bool = False) -> SweepReport:
+    """Find and repair differences between Turso and the indexes.
+
+    With `dry_run` nothing is changed, and the reindexed_* counts are what would be rebuilt.
+    """
+    report = SweepReport()
+    # Read the index before Turso: a source created in between then looks
+    # missing (and is harmlessly rebuilt) rather than orphaned.
+    chunk_sources = await vector_store.inventory()
+    cutoff = pending_sources.cutoff()
+    # One transaction, so a note is seen either as a row or as pending, never as neither.
+    notes, documents, document_chunks, lexical_orphans, active, pending = await turso.batch([
+        # Notes with an empty body have no chunks, so they are never missing.
+        ("SELECT id, content IS NULL OR trim(content) != '' FROM notes", []),
+        ("SELECT id FROM documents", []),
+        ("SELECT doc_id, chunk_id FROM document_chunks", []),
+        (
+            f"SELECT COUNT(*) FROM chunks WHERE {_LEXICAL_ORPHAN}",
+            [cutoff],
+        ),
+        ("SELECT COUNT(*) FROM ingestion_jobs WHERE status IN ('queued', 'running')", []),
+        ("SELECT source_id FROM pending_sources WHERE started_at > ?", [cutoff]),
+    ])
+
+    in_flight = {row[0] for row in pending.rows}
+    known = {row[0] for row in notes.rows} | {row[0] for row in documents.rows} | in_flight
+    orphans = [cid for cid, source in chunk_sources.items() if source not in known]
+    report.orphan_vectors = len(orphans)
+    report.orphan_sources = len({chunk_sources[cid] for cid in orphans})
+    report.orphan_lexical_rows = lexical_orphans.rows[0][0]
+
+    indexed_sources = set(chunk_sources.values())
+    missing_notes = [row[0] for row in notes.rows if row[1] and row[0] not in indexed_sources | in_flight]
+    missing_documents = sorted({doc_id for doc_id, cid in document_chunks.rows if cid not in chunk_sources})
+
+    if dry_run:
+        report.reindexed_notes, report.reindexed_documents = len(missing_notes), len(missing_documents)
+        return report
+
+    if active.rows[0][0]:
+        report.deferred = bool(orphans or report.orphan_lexical_rows)
+    else:
+        await vector_store.delete_chunks(orphans)
+        # Lexical rows can outlive their vectors too (e.g. after switching vector backends).
+        await turso.batch([
+            (f"DELETE FROM chunks WHERE {_LEXICAL_ORPHAN}", [cutoff]),
+            ("DELETE FROM pending_sources WHERE started_at <= ?", [cutoff]),
+        ])
+
+    rebuilt = {"note": 0, "document": 0}
+    for source_type, rebuild, source_ids in (
+        ("note", reindex.reindex_note, missing_notes),
+        ("document", reindex.reindex_document, missing_documents),
+    ):
+        for source_id in source_ids:
+            try:
+                count = await rebuild(source_id)
+            except Exception:
+                logger.exception("Re-embedding %s %s failed", source_type, source_id)
+                continue
+            if count is None:
+                report.unrecoverable.append(source_id)
+            else:
+                rebuilt[source_type] += 1
+    report.reindexed_notes, report.reindexed_documents = rebuilt["note"], rebuilt["document"]
+
+    report.bytes_reclaimed = await vector_store.compact()
+    await turso.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+    return report
+
+
+async def _loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await sweep()
+        except Exception:
+            logger.exception("Index sweep failed")
+            continue
+        logger.info("Index sweep: %s", report)
+
+
+async def start() -> None:
+    """Run `sweep` every SWEEP_INTERVAL_MINUTES in the background (0 leaves it off)."""
+    global _task
+    if settings.sweep_interval_minutes > 0:
+        _task = asyncio.create_task(_loop(settings.sweep_interval_minutes * 60))
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
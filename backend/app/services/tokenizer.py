@@ -0,0 +1,27 @@
+"""
+Token counting for the OpenAI models.
+
+Uses tiktoken's cl100k_base encoding when it can be loaded. tiktoken downloads
+the encoding on first use, so offline environments fall back to the usual
+~4 characters per token estimate instead of failing.
+"""
+from functools import lru_cache
+
+ENCODING_NAME = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,75 @@
+"""
+Start-up warm-up, so the first requests after a restart are not the slow ones.
+
+Everything heavy is opened lazily on first use: the vector backend (for Chroma,
+importing chromadb and opening the persistent client), the OpenAI clients and
+the tokenizer. With WARMUP_ENABLED the lifespan starts opening all of them in
+the background, concurrently with init_db and with each other, and `/ready`
+answers 503 until they are done. Point the platform's readiness check at
+`/ready` and traffic only arrives once it will be served fast; `/health` stays
+a plain liveness check.
+"""
+import asyncio
+import logging
+import time
+from app.config import settings
+from app.db import turso, vector_store
+from app.services import chat_service, embedding_providers
+from app.services.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task | None = None
+_ready = False
+
+
+def _open_clients() -> None:
+    # Runs on a thread: the first call imports openai and loads the tokenizer.
+    embedding_providers.get_client()
+    chat_service.get_client()
+    count_tokens("warm-up")
+
+
+async def warm_up() -> None:
+    """Open Turso, the vector store and the API clients concurrently."""
+    await asyncio.gather(
+        turso.execute("SELECT 1"),
+        vector_store.warm_up(),
+        asyncio.to_thread(_open_clients),
+    )
+
+
+async def _run() -> None:
+    global _ready
+    started = time.perf_counter()
+    try:
+        await warm_up()
+    except Exception:
+        # Everything warm-up opens is opened again on first use, so a failure only costs latency.
+        logger.exception("Warm-up failed")
+    else:
+        logger.info("Warm-up finished in %.2fs", time.perf_counter() - started)
+    _ready = True
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+async def start() -> None:
+    """Begin warming up in the background (with WARMUP_ENABLED off, report ready straight away)."""
+    global _task, _ready
+    if settings.warmup_enabled:
+        _ready = False
+        _task = asyncio.create_task(_run())
+    else:
+        _ready = True
+
+
+async def stop() -> None:
+    global _task, _ready
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    _ready = False
@@ -1,8 +1,13 @@
+import libsql_client
 import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 from httpx import AsyncClient, ASGITransport
 from app.main import app
+from app.db import turso
+
+# Real implementations, bound before the autouse fixtures below replace them.
+_REAL_TURSO = {"execute": turso.execute, "batch": turso.batch, "init_db": turso.init_db}
 
 
 # ---------------------------------------------------------------------------
@@ -56,12 +61,32 @@ def mock_turso(monkeypatch):
     return mock
 
 
+@pytest_asyncio.fixture
+async def local_turso(monkeypatch, tmp_path):
+    """A real libsql database in a temp file with the full schema, in place of the mocks."""
+    client = libsql_client.create_client(f"file:{tmp_path / 'test.db'}")
+    monkeypatch.setattr("app.db.turso._client", client)
+    for name, fn in _REAL_TURSO.items():
+        monkeypatch.setattr(f"app.db.turso.{name}", fn)
+    await turso.init_db()
+    yield client
+    await client.close()
+
+
+@pytest.fixture(autouse=True)
+def mock_turso_batch(monkeypatch):
+    """Replace turso.batch; by default every statement returns an empty result."""
+    mock = AsyncMock(side_effect=lambda statements: [make_turso_result([]) for _ in statements])
+    monkeypatch.setattr("app.db.turso.batch", mock)
+    return mock
+
+
 @pytest.fixture(autouse=True)
 def mock_vector_store(monkeypatch):
     mocks = {
-        "upsert": MagicMock(),
-        "delete": MagicMock(),
-        "query": MagicMock(return_value={"documents": [[]], "metadatas": [[]], "distances": [[]]}),
+        "upsert": AsyncMock(),
+        "delete": AsyncMock(),
+        "query": AsyncMock(return_value={"documents": [[]], "metadatas": [[]], "distances": [[]]}),
     }
     monkeypatch.setattr("app.db.vector_store.upsert_chunks", mocks["upsert"])
     monkeypatch.setattr("app.db.vector_store.delete_by_source", mocks["delete"])
@@ -69,9 +94,24 @@ def mock_vector_store(monkeypatch):
     # Also patch within routes/services that imported directly
     monkeypatch.setattr("app.api.routes.notes.upsert_chunks", mocks["upsert"])
     monkeypatch.setattr("app.api.routes.notes.delete_by_source", mocks["delete"])
-    monkeypatch.setattr("app.api.routes.documents.upsert_chunks", mocks["upsert"])
-    monkeypatch.setattr("app.api.routes.documents.delete_by_source", mocks["delete"])
-    monkeypatch.setattr("app.services.rag_service.query_chunks", mocks["query"])
+    monkeypatch.setattr("app.services.document_service.upsert_chunks", mocks["upsert"])
+    monkeypatch.setattr("app.services.document_service.delete_by_source", mocks["delete"])
+    monkeypatch.setattr("app.services.retrieval.query_chunks", mocks["query"])
+    monkeypatch.setattr("app.services.reindex.upsert_chunks", mocks["upsert"])
+    monkeypatch.setattr("app.services.reindex.delete_by_source", mocks["delete"])
+    return mocks
+
+
+@pytest.fixture(autouse=True)
+def mock_lexical_index(monkeypatch):
+    mocks = {
+        "upsert": AsyncMock(),
+        "delete": AsyncMock(),
+        "search": AsyncMock(return_value=[]),
+    }
+    monkeypatch.setattr("app.db.lexical_index.upsert", mocks["upsert"])
+    monkeypatch.setattr("app.db.lexical_index.delete_by_source", mocks["delete"])
+    monkeypatch.setattr("app.db.lexical_index.search", mocks["search"])
     return mocks
 
 
@@ -79,18 +119,44 @@ def mock_vector_store(monkeypatch):
 def mock_embedding(monkeypatch):
     embedding = [0.1] * 1536
     mock_embed = AsyncMock(return_value=embedding)
-    mock_embed_many = AsyncMock(return_value=[embedding])
+    mock_embed_many = AsyncMock(side_effect=lambda texts: [embedding for _ in texts])
     monkeypatch.setattr("app.services.embedding_service.embed", mock_embed)
     monkeypatch.setattr("app.services.embedding_service.embed_many", mock_embed_many)
-    monkeypatch.setattr("app.api.routes.notes.embed", mock_embed)
-    monkeypatch.setattr("app.api.routes.documents.embed_many", mock_embed_many)
-    monkeypatch.setattr("app.services.rag_service.embed", mock_embed)
+    monkeypatch.setattr("app.api.routes.notes.embed_many", mock_embed_many)
+    monkeypatch.setattr("app.services.document_service.embed_many", mock_embed_many)
+    monkeypatch.setattr("app.services.retrieval.embed", mock_embed)
+    monkeypatch.setattr("app.services.reindex.embed_many", mock_embed_many)
     return {"embed": mock_embed, "embed_many": mock_embed_many}
 
 
+@pytest.fixture(autouse=True)
+def inline_ingestion(monkeypatch, tmp_path):
+    """No worker pool runs under the test client, so queued jobs run inline."""
+    from app.services import ingestion_jobs
+    monkeypatch.setattr("app.services.ingestion_jobs.settings.upload_dir", str(tmp_path / "uploads"))
+    mock = AsyncMock(side_effect=ingestion_jobs.run_job)
+    monkeypatch.setattr("app.services.ingestion_jobs.enqueue", mock)
+    return mock
+
+
 @pytest.fixture(autouse=True)
 def mock_chat_complete(monkeypatch):
     mock = AsyncMock(return_value="This is a test answer.")
     monkeypatch.setattr("app.services.chat_service.complete", mock)
     monkeypatch.setattr("app.services.rag_service.complete", mock)
+    monkeypatch.setattr("app.services.conversation_service.complete", mock)
+    return mock
+
+
+@pytest.fixture(autouse=True)
+def mock_chat_stream(monkeypatch):
+    tokens = ["This ", "is ", "a ", "test ", "answer."]
+
+    async def fake_stream(system_prompt, user_message, history=None):
+        for token in tokens:
+            yield token
+
+    mock = MagicMock(side_effect=fake_stream)
+    monkeypatch.setattr("app.services.chat_service.complete_stream", mock)
+    monkeypatch.setattr("app.services.rag_service.complete_stream", mock)
     return mock
@@ -0,0 +1,16 @@
+from benchmarks.run import compare, synthetic_text
+
+
+def test_compare_flags_only_cases_beyond_threshold():
+    baseline = {"fast": {"median_s": 1.0}, "slow": {"median_s": 1.0}, "retired": {"median_s": 1.0}}
+    results = {"fast": {"median_s": 1.2}, "slow": {"median_s": 1.5}, "new": {"median_s": 9.0}}
+    regressions = compare(results, baseline, threshold=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("slow:")
+
+
+def test_synthetic_text_is_deterministic_and_paragraphed():
+    text = synthetic_text(500, seed=3)
+    assert text == synthetic_text(500, seed=3)
+    assert "\n\n" in text
+    assert len(text.split()) >= 500
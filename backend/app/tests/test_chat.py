@@ -1,3 +1,4 @@
+import json
 import pytest
 from .conftest import make_turso_result
 
@@ -58,3 +59,237 @@ async def test_chat_response_contains_answer_field(client):
 async def test_chat_response_contains_sources_field(client):
     resp = await client.post("/api/chat", json={"query": "test"})
     assert "sources" in resp.json()
+
+
+def parse_sse(body: str) -> list[tuple[str, object]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def test_chat_stream_sends_sources_then_tokens(client, mock_vector_store):
+    mock_vector_store["query"].return_value = CONTEXT_RESULT
+    resp = await client.post("/api/chat/stream", json={"query": "Why Alicante?"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(resp.text)
+    assert events[0] == ("sources", ["note-1"])
+    assert "".join(data for name, data in events if name == "token") == "This is a test answer."
+    assert events[-1][0] == "done"
+
+
+async def test_chat_stream_injects_context_into_prompt(client, mock_vector_store, mock_chat_stream):
+    mock_vector_store["query"].return_value = CONTEXT_RESULT
+    await client.post("/api/chat/stream", json={"query": "Why Alicante?"})
+    system_prompt = mock_chat_stream.call_args[0][0]
+    assert "Alicante has 320 sunny days" in system_prompt
+
+
+async def test_chat_stream_reports_generation_errors(client, mock_chat_stream):
+    async def failing_stream(system_prompt, user_message):
+        yield "partial "
+        raise RuntimeError("upstream closed")
+
+    mock_chat_stream.side_effect = failing_stream
+    resp = await client.post("/api/chat/stream", json={"query": "Why Alicante?"})
+    events = parse_sse(resp.text)
+    assert events[-1][0] == "error"
+
+
+async def test_chat_stream_empty_query_returns_400(client):
+    resp = await client.post("/api/chat/stream", json={"query": "  "})
+    assert resp.status_code == 400
+
+
+async def test_reciprocal_rank_fusion_rewards_agreement():
+    from app.services.retrieval import reciprocal_rank_fusion
+    dense = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    lexical = [{"id": "c"}, {"id": "d"}]
+    fused = reciprocal_rank_fusion([dense, lexical], k=60)
+    assert [h["id"] for h in fused] == ["c", "a", "b", "d"]
+
+
+async def test_chat_merges_lexical_hits_into_context(client, mock_vector_store, mock_lexical_index, mock_chat_complete):
+    mock_vector_store["query"].return_value = CONTEXT_RESULT
+    mock_lexical_index["search"].return_value = [{
+        "id": "visa_0",
+        "document": "Applying via UGE for fast-track processing.",
+        "metadata": {"source_id": "note-2", "source_type": "note", "title": "Visa Strategy", "category": "visa"},
+        "score": -3.2,
+    }]
+    resp = await client.post("/api/chat", json={"query": "What is UGE?"})
+    mock_lexical_index["search"].assert_called_once()
+    system_prompt = mock_chat_complete.call_args[0][0]
+    assert "Applying via UGE" in system_prompt
+    assert "Alicante has 320 sunny days" in system_prompt
+    assert set(resp.json()["sources"]) == {"note-1", "note-2"}
+
+
+async def test_chat_survives_lexical_search_failure(client, mock_vector_store, mock_lexical_index):
+    mock_vector_store["query"].return_value = CONTEXT_RESULT
+    mock_lexical_index["search"].side_effect = RuntimeError("no fts5")
+    resp = await client.post("/api/chat", json={"query": "Why Alicante?"})
+    assert resp.status_code == 200
+    assert resp.json()["sources"] == ["note-1"]
+
+
+async def test_chat_filters_are_pushed_into_both_searches(client, mock_vector_store, mock_lexical_index):
+    await client.post("/api/chat", json={
+        "query": "What is UGE?",
+        "filters": {"categories": ["visa"], "source_ids": ["note-2", "doc-1"]},
+    })
+    where = mock_vector_store["query"].call_args.kwargs["where"]
+    assert where == {"$and": [{"category": {"$in": ["visa"]}}, {"source_id": {"$in": ["note-2", "doc-1"]}}]}
+    assert mock_lexical_index["search"].call_args.kwargs["filters"] == {"category": ["visa"], "source_id": ["note-2", "doc-1"]}
+
+
+async def test_chat_without_filters_searches_everything(client, mock_vector_store):
+    await client.post("/api/chat/stream", json={"query": "Why Alicante?", "filters": {"source_types": []}})
+    assert mock_vector_store["query"].call_args.kwargs["where"] is None
+
+
+def hit(id, text, distance=None, source="doc-1", index=None, **extra):
+    meta = {"source_id": source, "title": source}
+    if index is not None:
+        meta["chunk_index"] = index
+    return {"id": id, "document": text, "metadata": meta, "distance": distance, **extra}
+
+
+async def test_pack_drops_distant_dense_hits_but_keeps_lexical_ones():
+    from app.services.context import pack
+    passages = pack([
+        hit("a", "close match", distance=0.2, source="n1"),
+        hit("b", "far away", distance=0.95, source="n2"),
+        hit("c", "keyword match", distance=None, source="n3"),
+    ], max_tokens=1000, max_distance=0.8)
+    assert [p["source_id"] for p in passages] == ["n1", "n3"]
+
+
+async def test_mmr_demotes_near_duplicates():
+    from app.services.context import mmr
+    hits = [
+        hit("a", "visa income requirement is 2760 euros per month", distance=0.10),
+        hit("b", "visa income requirement is 2760 euros per month net", distance=0.11),
+        hit("c", "health insurance must have no copayments", distance=0.15),
+    ]
+    assert [h["id"] for h in mmr(hits, lambda_=0.5)] == ["a", "c", "b"]
+
+
+async def test_pack_respects_token_budget(monkeypatch):
+    from app.services import context
+    monkeypatch.setattr(context, "count_tokens", lambda text: len(text.split()))
+    passages = context.pack([
+        hit("a", "one two three four", distance=0.1, source="n1"),
+        hit("b", "five six seven eight nine", distance=0.2, source="n2"),
+        hit("c", "ten eleven", distance=0.3, source="n3"),
+    ], max_tokens=6, lambda_=1.0)
+    assert [p["source_id"] for p in passages] == ["n1", "n3"]
+
+
+async def test_pack_merges_adjacent_chunks_and_writes_overlap_once():
+    from app.services.context import pack
+    passages = pack([
+        hit("b", "Second sentence. Third sentence.", distance=0.1, index=1),
+        hit("a", "First sentence. Second sentence.", distance=0.2, index=0),
+        hit("z", "Unrelated far chunk.", distance=0.3, index=7),
+    ], max_tokens=1000, lambda_=1.0)
+    assert passages[0]["text"] == "First sentence. Second sentence. Third sentence."
+    assert passages[0]["ids"] == ["a", "b"]
+    assert passages[1]["text"] == "Unrelated far chunk."
+
+
+async def test_chat_over_fetches_and_filters_context(client, mock_vector_store, mock_chat_complete, monkeypatch):
+    monkeypatch.setattr("app.services.rag_service.settings.context_candidates", 12)
+    mock_vector_store["query"].return_value = {
+        "ids": [["c1", "c2"]],
+        "documents": [["Alicante has 320 sunny days.", "Unrelated padel booking."]],
+        "metadatas": [[
+            {"source_id": "note-1", "title": "Why Alicante"},
+            {"source_id": "note-2", "title": "Padel"},
+        ]],
+        "distances": [[0.1, 0.99]],
+    }
+    resp = await client.post("/api/chat", json={"query": "Why Alicante?"})
+    assert resp.json()["sources"] == ["note-1"]
+    assert mock_vector_store["query"].call_args[1]["n_results"] == 12
+    assert "Padel" not in mock_chat_complete.call_args[0][0]
+
+
+async def test_chat_without_session_is_stateless(client, mock_chat_complete, mock_turso_batch):
+    resp = await client.post("/api/chat", json={"query": "Why Alicante?"})
+    assert resp.json()["session_id"] is None
+    assert mock_chat_complete.call_args[1]["history"] == []
+    mock_turso_batch.assert_not_called()
+
+
+async def test_session_turns_are_fed_back_into_the_prompt(client, local_turso, mock_chat_complete):
+    mock_chat_complete.side_effect = ["Alicante, for the sun.", "About 2,760 euros a month."]
+    await client.post("/api/chat", json={"query": "Where am I moving?", "session_id": "s1"})
+    resp = await client.post("/api/chat", json={"query": "And the income requirement?", "session_id": "s1"})
+    assert resp.json()["session_id"] == "s1"
+    assert mock_chat_complete.call_args[1]["history"] == [
+        {"role": "user", "content": "Where am I moving?"},
+        {"role": "assistant", "content": "Alicante, for the sun."},
+    ]
+    rows = (await local_turso.execute("SELECT turn, role FROM chat_history WHERE session_id = 's1' ORDER BY turn")).rows
+    assert [tuple(row) for row in rows] == [(1, "user"), (2, "assistant"), (3, "user"), (4, "assistant")]
+
+
+async def test_old_turns_are_folded_into_a_bounded_summary(client, local_turso, mock_chat_complete, monkeypatch):
+    monkeypatch.setattr("app.services.conversation_service.settings.chat_history_window", 2)
+    monkeypatch.setattr("app.services.conversation_service.settings.chat_summarize_every", 2)
+
+    async def fake_complete(system_prompt, user_message, history=None):
+        if "running summary" in system_prompt:
+            return f"summary of: {user_message.count('user:')} questions"
+        return f"answer to {user_message}"
+
+    mock_chat_complete.side_effect = fake_complete
+    for i in range(6):
+        await client.post("/api/chat", json={"query": f"q{i}", "session_id": "s1"})
+
+    summary, summarized, total = (await local_turso.execute(
+        "SELECT summary, summarized_turn, turn_count FROM conversations WHERE id = 's1'"
+    )).rows[0]
+    assert total == 12
+    assert summarized == 10
+    # Each fold only sends the newly expired exchange plus the previous summary.
+    fold_inputs = [c[0][1] for c in mock_chat_complete.call_args_list if "running summary" in c[0][0]]
+    assert all(text.count("user:") == 1 for text in fold_inputs)
+    assert summary.startswith("summary of")
+
+    await client.post("/api/chat", json={"query": "q6", "session_id": "s1"})
+    last = mock_chat_complete.call_args_list[-2]  # the answer call; the last one is the fold
+    assert "Summary of the earlier conversation" in last[0][0]
+    assert len(last[1]["history"]) <= 4
+
+
+async def test_odd_window_loads_whole_exchanges(local_turso, monkeypatch):
+    from app.services import conversation_service
+    monkeypatch.setattr("app.services.conversation_service.settings.chat_history_window", 3)
+    monkeypatch.setattr("app.services.conversation_service.settings.chat_summarize_every", 2)
+    for i in range(4):
+        await conversation_service.record("s1", f"q{i}", f"a{i}", [])
+
+    history = (await conversation_service.load("s1")).history
+    assert history[0] == {"role": "user", "content": "q1"}
+    assert [turn["role"] for turn in history] == ["user", "assistant"] * 3
+
+
+async def test_stream_records_the_full_answer(client, local_turso):
+    resp = await client.post("/api/chat/stream", json={"query": "Why Alicante?", "session_id": "s2"})
+    assert parse_sse(resp.text)[-1][0] == "done"
+    rows = (await local_turso.execute("SELECT role, content FROM chat_history WHERE session_id = 's2' ORDER BY turn")).rows
+    assert [tuple(row) for row in rows] == [("user", "Why Alicante?"), ("assistant", "This is a test answer.")]
+
+
+async def test_summary_failure_is_retried_later(client, local_turso, mock_chat_complete, monkeypatch):
+    monkeypatch.setattr("app.services.conversation_service.settings.chat_history_window", 0)
+    monkeypatch.setattr("app.services.conversation_service.settings.chat_summarize_every", 2)
+    mock_chat_complete.side_effect = ["answer", RuntimeError("rate limited")]
+    resp = await client.post("/api/chat", json={"query": "q0", "session_id": "s3"})
+    assert resp.status_code == 200
+    row = (await local_turso.execute("SELECT summarized_turn FROM conversations WHERE id = 's3'")).rows[0]
+    assert row[0] == 0
@@ -39,37 +39,79 @@ async def test_get_checklist_by_category(client, mock_turso):
     assert "category" in call_sql.lower()
 
 
+def updated_row(status: str):
+    return ITEM_ROW[:4] + (status,) + ITEM_ROW[5:7] + ("2024-01-02T00:00:00+00:00",)
+
+
 async def test_update_checklist_status_to_done(client, mock_turso):
-    mock_turso.side_effect = [
-        make_turso_result([ITEM_ROW]),  # SELECT
-        make_turso_result([]),          # UPDATE
-    ]
+    mock_turso.return_value = make_turso_result([updated_row("done")])  # UPDATE ... RETURNING
     resp = await client.patch("/api/checklist/item-id-1", json={"status": "done"})
     assert resp.status_code == 200
     assert resp.json()["status"] == "done"
 
 
 async def test_update_checklist_status_to_in_progress(client, mock_turso):
-    mock_turso.side_effect = [
-        make_turso_result([ITEM_ROW]),
-        make_turso_result([]),
-    ]
+    mock_turso.return_value = make_turso_result([updated_row("in_progress")])
     resp = await client.patch("/api/checklist/item-id-1", json={"status": "in_progress"})
     assert resp.status_code == 200
     assert resp.json()["status"] == "in_progress"
 
 
+async def test_update_checklist_status_is_single_round_trip(client, mock_turso):
+    mock_turso.return_value = make_turso_result([updated_row("done")])
+    await client.patch("/api/checklist/item-id-1", json={"status": "done"})
+    assert mock_turso.call_count == 1
+    call_sql, call_args = mock_turso.call_args_list[0][0]
+    assert call_sql.startswith("UPDATE checklist_items") and "RETURNING" in call_sql
+    assert call_args[0] == "done" and call_args[2] == "item-id-1"
+
+
+async def test_update_missing_checklist_item_returns_404(client, mock_turso):
+    mock_turso.return_value = make_turso_result([])
+    resp = await client.patch("/api/checklist/missing", json={"status": "done"})
+    assert resp.status_code == 404
+
+
 async def test_invalid_status_returns_422(client):
     resp = await client.patch("/api/checklist/item-id-1", json={"status": "invalid_status"})
     assert resp.status_code == 422
 
 
 async def test_delete_checklist_item_removes_from_turso(client, mock_turso):
-    mock_turso.side_effect = [
-        make_turso_result([make_turso_row("item-id-1")]),
-        make_turso_result([]),
-    ]
+    mock_turso.return_value = make_turso_result([make_turso_row("item-id-1")])  # DELETE ... RETURNING
     resp = await client.delete("/api/checklist/item-id-1")
     assert resp.status_code == 204
-    delete_call = mock_turso.call_args_list[1][0][0]
+    assert mock_turso.call_count == 1
+    delete_call = mock_turso.call_args_list[0][0][0]
     assert "DELETE FROM checklist_items" in delete_call
+
+
+async def test_delete_missing_checklist_item_returns_404(client, mock_turso):
+    mock_turso.return_value = make_turso_result([])
+    resp = await client.delete("/api/checklist/missing")
+    assert resp.status_code == 404
+
+
+async def test_get_checklist_by_category_is_paginated(client, mock_turso):
+    mock_turso.return_value = make_turso_result([ITEM_ROW, ITEM_ROW])
+    resp = await client.get("/api/checklist?category=documents&limit=1")
+    assert len(resp.json()) == 1
+    assert resp.headers["X-Next-Cursor"]
+    sql, args = mock_turso.call_args_list[0][0]
+    assert "category = ?" in sql
+    assert args == ["documents", 2]
+
+
+async def test_checklist_limit_above_max_returns_422(client):
+    resp = await client.get("/api/checklist?limit=100000")
+    assert resp.status_code == 422
+
+
+async def test_bulk_create_checklist_items_in_one_transaction(client, local_turso):
+    items = [{"title": f"Step {i}", "category": "visa"} for i in range(150)] + [{"title": "No category"}]
+    resp = await client.post("/api/checklist/bulk", json={"items": items})
+    data = resp.json()
+    assert data["created"] == 150
+    assert data["results"][-1]["status"] == "invalid"
+    rows = (await local_turso.execute("SELECT COUNT(*) FROM checklist_items")).rows
+    assert rows[0][0] == 150
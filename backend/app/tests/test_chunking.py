@@ -0,0 +1,78 @@
+import pytest
+from app.services import chunking
+from app.services.chunking import Chunker, chunk_text, chunk_pages, achunk_pages
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """One token per word keeps the budgets in these tests easy to reason about."""
+    monkeypatch.setattr(chunking, "count_tokens", lambda text: len(text.split()))
+
+
+def sentences(n: int, words: int = 5) -> list[str]:
+    return [" ".join([f"w{i}"] * (words - 1)) + "." for i in range(n)]
+
+
+async def test_short_text_is_a_single_chunk():
+    chunks = chunk_text("Alicante has 320 sunny days. It is on the coast.", max_tokens=50)
+    assert len(chunks) == 1
+    assert chunks[0].text == "Alicante has 320 sunny days. It is on the coast."
+    assert chunks[0].token_count == 10
+
+
+async def test_empty_text_has_no_chunks():
+    assert chunk_text("  \n\n  ") == []
+
+
+async def test_chunks_respect_budget_and_keep_sentences_whole():
+    text = " ".join(f"Sentence {i} has five words." for i in range(20))
+    chunks = chunk_text(text, max_tokens=12, overlap_tokens=0)
+    assert all(c.token_count <= 12 for c in chunks)
+    for chunk in chunks:
+        assert chunk.text.endswith("words.")
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+
+
+async def test_overlap_repeats_trailing_sentences():
+    text = " ".join(f"Sentence {i} has five words." for i in range(6))
+    chunks = chunk_text(text, max_tokens=10, overlap_tokens=5)
+    assert chunks[0].text == "Sentence 0 has five words. Sentence 1 has five words."
+    assert chunks[1].text.startswith("Sentence 1 has five words.")
+
+
+async def test_paragraph_boundaries_are_preserved():
+    chunks = chunk_text("First paragraph here.\n\nSecond   paragraph\nwraps lines.", max_tokens=50)
+    assert chunks[0].text == "First paragraph here.\n\nSecond paragraph wraps lines."
+
+
+async def test_overlong_sentence_is_split_into_word_runs():
+    chunks = chunk_text(" ".join(["word"] * 25), max_tokens=10, overlap_tokens=0)
+    assert [c.token_count for c in chunks] == [10, 10, 5]
+
+
+async def test_chunk_pages_records_page_range():
+    pages = ["Page one text is here.", "Page two text is here.", "Page three text is here."]
+    chunks = list(chunk_pages(pages, max_tokens=10, overlap_tokens=0))
+    assert [(c.page_start, c.page_end) for c in chunks] == [(1, 2), (3, 3)]
+    assert chunks[0].metadata() == {"chunk_index": 0, "page_start": 1, "page_end": 2}
+
+
+async def test_chunker_streams_chunks_per_page():
+    chunker = Chunker(max_tokens=10, overlap_tokens=0)
+    assert chunker.feed("One two three four five.", page=1) == []
+    completed = chunker.feed("Six seven eight nine ten eleven.", page=2)
+    assert [c.text for c in completed] == ["One two three four five."]
+    assert [c.text for c in chunker.flush()] == ["Six seven eight nine ten eleven."]
+
+
+async def test_achunk_pages_matches_sync_version():
+    pages = ["Alpha beta gamma.\n\nDelta epsilon.", "Zeta eta theta iota kappa."]
+
+    async def stream():
+        for page in pages:
+            yield page
+
+    async_chunks = [c async for c in achunk_pages(stream(), max_tokens=6, overlap_tokens=2)]
+    assert async_chunks == list(chunk_pages(pages, max_tokens=6, overlap_tokens=2))
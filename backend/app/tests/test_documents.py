@@ -27,21 +27,25 @@ def pdf_bytes():
     return make_fake_pdf_bytes()
 
 
-async def test_upload_pdf_returns_200(client, pdf_bytes):
+async def test_upload_pdf_returns_202_with_queued_job(client, pdf_bytes):
     resp = await client.post(
         "/api/documents/upload",
         files={"file": ("dnv_guide.pdf", io.BytesIO(pdf_bytes), "application/pdf")},
     )
-    assert resp.status_code == 200
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["status"] == "queued"
+    assert job["filename"] == "dnv_guide.pdf"
 
 
-async def test_upload_pdf_stores_metadata_in_turso(client, mock_turso, pdf_bytes):
+async def test_upload_pdf_stores_metadata_in_turso(client, mock_turso_batch, pdf_bytes):
     await client.post(
         "/api/documents/upload",
         files={"file": ("dnv_guide.pdf", io.BytesIO(pdf_bytes), "application/pdf")},
     )
-    call_sql = mock_turso.call_args_list[0][0][0]
-    assert "INSERT INTO documents" in call_sql
+    statements = mock_turso_batch.call_args[0][0]
+    assert "INSERT INTO documents" in statements[0][0]
+    assert "INSERT INTO document_chunks" in statements[1][0]
 
 
 async def test_upload_pdf_chunks_and_stores_embeddings_in_chromadb(client, mock_vector_store, mock_embedding, pdf_bytes):
@@ -73,11 +77,194 @@ async def test_uploaded_doc_is_queryable_via_chat(client, mock_vector_store, pdf
     assert "doc-id-1" in resp.json()["sources"]
 
 
-async def test_chunk_count_stored_in_turso(client, mock_turso, pdf_bytes):
+async def test_chunk_count_stored_in_turso(client, mock_turso_batch, pdf_bytes):
     await client.post(
         "/api/documents/upload",
         files={"file": ("dnv_guide.pdf", io.BytesIO(pdf_bytes), "application/pdf")},
     )
-    insert_args = mock_turso.call_args_list[0][0][1]
+    insert_args = mock_turso_batch.call_args[0][0][0][1]
     chunk_count = insert_args[4]
     assert chunk_count >= 1
+
+
+async def test_list_documents_is_paginated_by_upload_time(client, mock_turso):
+    mock_turso.return_value = make_turso_result([DOC_ROW, DOC_ROW])
+    resp = await client.get("/api/documents?limit=1")
+    assert resp.status_code == 200
+    assert len(resp.json()) == 1
+    assert resp.headers["X-Next-Cursor"]
+    sql = mock_turso.call_args_list[0][0][0]
+    assert "ORDER BY uploaded_at DESC, id DESC" in sql
+
+
+async def test_delete_document_is_single_round_trip(client, mock_turso, mock_turso_batch, mock_vector_store):
+    mock_turso_batch.side_effect = None
+    mock_turso_batch.return_value = [make_turso_result([make_turso_row("doc-id-1")]), make_turso_result([]), make_turso_result([])]
+    resp = await client.delete("/api/documents/doc-id-1")
+    assert resp.status_code == 204
+    mock_turso_batch.assert_called_once()
+    assert "DELETE FROM documents" in mock_turso_batch.call_args[0][0][0][0]
+    mock_turso.assert_not_called()
+    mock_vector_store["delete"].assert_called_once_with("doc-id-1")
+
+
+async def test_delete_missing_document_returns_404(client, mock_vector_store):
+    resp = await client.delete("/api/documents/missing")
+    assert resp.status_code == 404
+    mock_vector_store["delete"].assert_not_called()
+
+
+async def test_upload_pdf_chunk_metadata_includes_pages(client, mock_vector_store, pdf_bytes):
+    await client.post(
+        "/api/documents/upload",
+        files={"file": ("dnv_guide.pdf", io.BytesIO(pdf_bytes), "application/pdf")},
+    )
+    ids, documents, _, metadatas = mock_vector_store["upsert"].call_args[0]
+    assert FAKE_PDF_TEXT in documents[0]
+    assert metadatas[0]["page_start"] == 1
+    assert metadatas[0]["chunk_index"] == 0
+    assert ids[0].startswith(metadatas[0]["source_id"] + "_")
+
+
+async def test_reupload_of_same_file_skips_parsing_and_embedding(client, mock_turso, mock_embedding, mock_vector_store, pdf_bytes):
+    mock_turso.return_value = make_turso_result([DOC_ROW])  # content_hash lookup hits
+    resp = await client.post(
+        "/api/documents/upload",
+        files={"file": ("copy.pdf", io.BytesIO(pdf_bytes), "application/pdf")},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "done"
+    assert resp.json()["document_id"] == "doc-id-1"
+    assert resp.json()["filename"] == "dnv_guide.pdf"
+    assert "content_hash = ?" in mock_turso.call_args_list[0][0][0]
+    assert not any("INSERT INTO ingestion_jobs" in c[0][0] for c in mock_turso.call_args_list)
+    mock_embedding["embed_many"].assert_not_called()
+    mock_vector_store["upsert"].assert_not_called()
+
+
+def make_pdf(*pages: str) -> bytes:
+    import fitz
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+SHARED_PAGE = "Criminal background check must be apostilled."
+
+
+@pytest.fixture
+def one_chunk_per_page(monkeypatch):
+    monkeypatch.setattr("app.services.chunking.settings.chunk_max_tokens", 15)
+    monkeypatch.setattr("app.services.chunking.settings.chunk_overlap_tokens", 0)
+
+
+async def upload(client, name: str, content: bytes):
+    """Upload and return the finished job (jobs run inline under test)."""
+    resp = await client.post("/api/documents/upload", files={"file": (name, io.BytesIO(content), "application/pdf")})
+    assert resp.status_code in (200, 202)
+    job = resp.json() if resp.status_code == 200 else (await client.get(f"/api/documents/jobs/{resp.json()['id']}")).json()
+    assert job["status"] == "done"
+    return {"id": job["document_id"], "chunk_count": job["chunks_total"]}
+
+
+async def test_documents_sharing_text_each_own_their_vectors(
+    client, local_turso, one_chunk_per_page, mock_vector_store
+):
+    first_pdf = make_pdf(SHARED_PAGE)
+    first = await upload(client, "a.pdf", first_pdf)
+    second = await upload(client, "b.pdf", make_pdf(SHARED_PAGE, "Health insurance needs full coverage."))
+    assert second["chunk_count"] == 2
+
+    ids, texts, _, metadatas = mock_vector_store["upsert"].call_args_list[1][0]
+    assert texts[0] == SHARED_PAGE
+    assert all(cid.startswith(second["id"] + "_") for cid in ids)
+    assert [(m["source_id"], m["title"], m["chunk_index"]) for m in metadatas] == [
+        (second["id"], "b.pdf", 0), (second["id"], "b.pdf", 1),
+    ]
+
+    again = await upload(client, "a-again.pdf", first_pdf)
+    assert again["id"] == first["id"]
+    assert mock_vector_store["upsert"].call_count == 2
+    jobs = (await local_turso.execute("SELECT COUNT(*) FROM ingestion_jobs")).rows
+    assert jobs[0][0] == 2
+
+
+async def test_repeated_text_within_a_document_is_indexed_once(client, local_turso, one_chunk_per_page, mock_vector_store):
+    doc = await upload(client, "a.pdf", make_pdf(SHARED_PAGE, "Health insurance needs full coverage.", SHARED_PAGE))
+    assert doc["chunk_count"] == 2
+    assert len(mock_vector_store["upsert"].call_args[0][0]) == 2
+
+
+async def test_deleting_a_document_removes_only_its_vectors(
+    client, local_turso, one_chunk_per_page, mock_vector_store
+):
+    first = await upload(client, "a.pdf", make_pdf(SHARED_PAGE))
+    await upload(client, "b.pdf", make_pdf(SHARED_PAGE, "Health insurance needs full coverage."))
+
+    resp = await client.delete(f"/api/documents/{first['id']}")
+    assert resp.status_code == 204
+    mock_vector_store["delete"].assert_called_once_with(first["id"])
+    rows = (await local_turso.execute("SELECT COUNT(*) FROM document_chunks")).rows
+    assert rows[0][0] == 2
+
+
+async def test_job_reports_progress_until_done(client, local_turso, one_chunk_per_page):
+    resp = await client.post("/api/documents/upload", files={"file": ("a.pdf", io.BytesIO(make_pdf(SHARED_PAGE, "Health insurance needs full coverage.")), "application/pdf")})
+    assert resp.status_code == 202
+    job = (await client.get(f"/api/documents/jobs/{resp.json()['id']}")).json()
+    assert job["status"] == "done"
+    assert job["stage"] == "done"
+    assert job["chunks_total"] == job["chunks_embedded"] == 2
+    doc = (await local_turso.execute("SELECT chunk_count FROM documents WHERE id = ?", [job["document_id"]])).rows
+    assert doc[0][0] == 2
+
+
+async def test_failed_job_records_error_and_releases_vectors(client, local_turso, mock_embedding, mock_vector_store, pdf_bytes):
+    mock_embedding["embed_many"].side_effect = RuntimeError("rate limited")
+    resp = await client.post("/api/documents/upload", files={"file": ("a.pdf", io.BytesIO(pdf_bytes), "application/pdf")})
+    job = (await client.get(f"/api/documents/jobs/{resp.json()['id']}")).json()
+    assert job["status"] == "failed"
+    assert job["error"] == "rate limited"
+    assert job["document_id"] is None
+    mock_vector_store["delete"].assert_called_once()
+
+
+async def test_job_is_marked_failed_when_it_cannot_be_started(local_turso, inline_ingestion, monkeypatch, pdf_bytes):
+    from app.services import ingestion_jobs
+    inline_ingestion.side_effect = None
+    job, _ = await ingestion_jobs.submit("a.pdf", pdf_bytes, "hash-a")
+    update = ingestion_jobs._update
+
+    async def flaky_update(job_id, **fields):
+        if fields.get("status") == "running":
+            raise RuntimeError("database is locked")
+        await update(job_id, **fields)
+
+    monkeypatch.setattr(ingestion_jobs, "_update", flaky_update)
+    await ingestion_jobs.run_job(job.id, "a.pdf", "hash-a")
+    failed = await ingestion_jobs.get(job.id)
+    assert (failed.status, failed.error) == ("failed", "database is locked")
+    assert not ingestion_jobs._upload_path(job.id).exists()
+
+
+async def test_get_missing_job_returns_404(client):
+    resp = await client.get("/api/documents/jobs/missing")
+    assert resp.status_code == 404
+
+
+async def test_start_requeues_interrupted_jobs(local_turso, inline_ingestion, pdf_bytes):
+    from app.services import ingestion_jobs
+    job, _ = await ingestion_jobs.submit("a.pdf", pdf_bytes, "hash-a")
+    await ingestion_jobs._update(job.id, status="running", stage="embedding")
+    ingestion_jobs._upload_path(job.id).write_bytes(pdf_bytes)  # the inline run removed it
+    lost, _ = await ingestion_jobs.submit("b.pdf", pdf_bytes + b" ", "hash-b")
+    await ingestion_jobs._update(lost.id, status="queued", stage="queued")
+    inline_ingestion.reset_mock()
+
+    await ingestion_jobs.start()
+    try:
+        inline_ingestion.assert_called_once_with(job.id, "a.pdf", "hash-a")
+        assert (await ingestion_jobs.get(lost.id)).status == "failed"
+    finally:
+        await ingestion_jobs.stop()
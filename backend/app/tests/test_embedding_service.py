@@ -0,0 +1,201 @@
+import asyncio
+import math
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.services import embedding_service, embedding_cache, embedding_providers
+from app.services.embedding_service import embed, embed_many
+from .conftest import make_turso_result, make_turso_row
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_fake_client(calls: list, options: list | None = None):
+    """Fake AsyncOpenAI client whose embedding is [position of the text in the batch, len(text)]."""
+    async def create(input, model, **kwargs):
+        calls.append(list(input))
+        if options is not None:
+            options.append(kwargs)
+        data = [SimpleNamespace(index=i, embedding=[float(i), float(len(text))]) for i, text in enumerate(input)]
+        # The API does not guarantee response order — make sure we don't rely on it.
+        return SimpleNamespace(data=list(reversed(data)))
+
+    client = MagicMock()
+    client.embeddings.create = create
+    return client
+
+
+@pytest.fixture(autouse=True)
+def real_embedding_functions(monkeypatch):
+    """conftest mocks the module-level functions; embed() must reach the real embed_many."""
+    monkeypatch.setattr(embedding_service, "embed", embed)
+    monkeypatch.setattr(embedding_service, "embed_many", embed_many)
+
+
+@pytest.fixture(autouse=True)
+def clear_embedding_cache():
+    embedding_cache.clear()
+    yield
+    embedding_cache.clear()
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(embedding_providers, "get_client", lambda: make_fake_client(calls))
+    return calls
+
+
+async def test_embed_many_empty_input_makes_no_request(calls):
+    assert await embed_many([]) == []
+    assert calls == []
+
+
+async def test_embed_many_splits_by_input_count(calls, monkeypatch):
+    monkeypatch.setattr(embedding_service.settings, "embedding_batch_size", 2)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    result = await embed_many(texts)
+    assert [len(batch) for batch in calls] == [2, 2, 1]
+    assert [vec[1] for vec in result] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+async def test_embed_many_splits_by_token_budget(calls, monkeypatch):
+    monkeypatch.setattr(embedding_service, "count_tokens", lambda text: len(text))
+    monkeypatch.setattr(embedding_service.settings, "embedding_batch_tokens", 5)
+    texts = ["aaa", "bb", "cccc", "dddddddd", "e"]
+    result = await embed_many(texts)
+    assert calls == [["aaa", "bb"], ["cccc"], ["dddddddd"], ["e"]]
+    assert [vec[1] for vec in result] == [3.0, 2.0, 4.0, 8.0, 1.0]
+
+
+async def test_embed_many_respects_concurrency_limit(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def create(input, model):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[0.0]) for i in range(len(input))])
+
+    client = MagicMock()
+    client.embeddings.create = create
+    monkeypatch.setattr(embedding_providers, "get_client", lambda: client)
+    monkeypatch.setattr(embedding_service.settings, "embedding_batch_size", 1)
+    monkeypatch.setattr(embedding_service.settings, "embedding_concurrency", 3)
+    result = await embed_many([str(i) for i in range(10)])
+    assert len(result) == 10
+    assert peak == 3
+
+
+async def test_embed_many_serves_repeats_from_memory(calls):
+    first = await embed_many(["alpha", "beta"])
+    second = await embed_many(["beta", "alpha"])
+    assert len(calls) == 1
+    assert second == [first[1], first[0]]
+    assert embedding_cache.stats()["memory_hits"] == 2
+
+
+async def test_embed_many_only_sends_misses_to_provider(calls):
+    await embed("alpha")
+    await embed_many(["alpha", "gamma", "gamma"])
+    assert calls == [["alpha"], ["gamma"]]
+
+
+async def test_embed_many_uses_persistent_tier(calls, mock_turso):
+    cached = [0.5, 0.25]
+    mock_turso.return_value = make_turso_result([
+        make_turso_row(embedding_cache.text_hash("alpha"), embedding_cache._encode(cached)),
+    ])
+    result = await embed_many(["alpha"])
+    assert result == [cached]
+    assert calls == []
+    assert embedding_cache.stats()["persistent_hits"] == 1
+
+
+async def test_embed_many_persists_new_embeddings(calls, mock_turso):
+    await embed_many(["alpha"])
+    insert_sql = mock_turso.call_args_list[-1][0][0]
+    assert "INSERT OR IGNORE INTO embedding_cache" in insert_sql
+
+
+async def test_embed_many_survives_cache_db_errors(calls, mock_turso):
+    mock_turso.side_effect = RuntimeError("db down")
+    result = await embed_many(["alpha"])
+    assert len(result) == 1
+    assert embedding_cache.stats()["misses"] == 1
+
+
+async def test_stats_endpoint_reports_cache_counters(client):
+    resp = await client.get("/api/stats")
+    assert resp.status_code == 200
+    assert "hit_rate" in resp.json()["embedding_cache"]
+
+
+@pytest.fixture
+def local_provider(monkeypatch):
+    monkeypatch.setattr(embedding_providers.settings, "embedding_provider", "local")
+    monkeypatch.setattr(embedding_providers.settings, "local_embedding_dim", 64)
+    monkeypatch.setattr(embedding_providers, "get_client", MagicMock(side_effect=AssertionError("no network")))
+
+
+def cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+async def test_local_provider_embeds_without_network(local_provider):
+    first, second, unrelated = await embed_many([
+        "Digital nomad visa income requirement",
+        "income requirement for the digital nomad visa",
+        "Book a padel court in Valencia",
+    ])
+    assert len(first) == 64
+    assert cosine(first, first) == pytest.approx(1.0, abs=1e-5)
+    assert cosine(first, second) > cosine(first, unrelated)
+
+
+async def test_local_provider_is_deterministic_and_cached_under_its_own_name(local_provider):
+    vector = await embed("same text")
+    embedding_cache.clear()
+    assert await embed("same text") == vector
+    assert embedding_providers.get_provider().name == "local-hashing-64"
+
+
+async def test_local_provider_gives_text_without_words_a_unit_vector(local_provider):
+    empty, punctuation, words = await embed_many(["", "  !!! ", "Digital nomad visa"])
+    assert empty == punctuation == [1.0] + [0.0] * 63
+    assert math.isfinite(cosine(empty, words))
+
+
+async def test_local_provider_unit_vector_survives_truncation():
+    provider = embedding_providers.HashingProvider(dim=64, dimensions=16)
+    assert provider.embed_sync([" "]) == [[1.0] + [0.0] * 15]
+
+
+async def test_unknown_provider_is_rejected(monkeypatch):
+    monkeypatch.setattr(embedding_providers.settings, "embedding_provider", "bogus")
+    with pytest.raises(ValueError):
+        await embed("text")
+
+
+async def test_openai_provider_requests_reduced_dimensions(monkeypatch):
+    options = []
+    monkeypatch.setattr(embedding_providers, "get_client", lambda: make_fake_client([], options))
+    monkeypatch.setattr(embedding_providers.settings, "embedding_dimensions", 256)
+    await embed("text")
+    assert options == [{"dimensions": 256}]
+    # Shortened vectors must not be served from cache rows of the full-size model.
+    assert embedding_providers.get_provider().name == "text-embedding-3-small-256"
+
+
+async def test_local_provider_truncates_and_renormalizes(local_provider, monkeypatch):
+    text = "Digital nomad visa income requirement"
+    full = await embed(text)
+    monkeypatch.setattr(embedding_providers.settings, "embedding_dimensions", 16)
+    short = await embed(text)
+    assert len(short) == 16
+    assert cosine(short, short) == pytest.approx(1.0, abs=1e-5)
+    scale = cosine(full[:16], full[:16]) ** 0.5
+    assert short == pytest.approx([x / scale for x in full[:16]], abs=1e-6)
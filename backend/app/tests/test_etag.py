@@ -0,0 +1,108 @@
+import pytest
+from .conftest import make_turso_result, make_turso_row
+
+pytestmark = pytest.mark.asyncio
+
+NOTE_ROW = make_turso_row("note-1", "Why Alicante", "decisions", "2024-01-01T00:00:00+00:00", "2024-01-01T00:00:00+00:00")
+ITEM_ROW = make_turso_row(
+    "item-1", "Apostille", None, "documents", "pending", None,
+    "2024-01-01T00:00:00+00:00", "2024-01-01T00:00:00+00:00",
+)
+
+
+async def test_list_sets_strong_etag(client, mock_turso):
+    mock_turso.return_value = make_turso_result([NOTE_ROW])
+    resp = await client.get("/api/notes")
+    etag = resp.headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert resp.headers["Cache-Control"] == "private, no-cache"
+
+
+async def test_matching_if_none_match_returns_304_after_one_version_lookup(client, mock_turso):
+    mock_turso.return_value = make_turso_result([NOTE_ROW])
+    etag = (await client.get("/api/notes")).headers["ETag"]
+    mock_turso.reset_mock()
+
+    resp = await client.get("/api/notes", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["ETag"] == etag
+    mock_turso.assert_called_once()
+    assert "FROM table_versions WHERE name IN" in mock_turso.call_args[0][0]
+
+
+async def test_write_invalidates_etag(client, mock_turso):
+    mock_turso.return_value = make_turso_result([NOTE_ROW])
+    etag = (await client.get("/api/notes")).headers["ETag"]
+    await client.delete("/api/notes/note-1")
+
+    resp = await client.get("/api/notes", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+async def test_etag_differs_per_query_and_item(client, mock_turso):
+    mock_turso.return_value = make_turso_result([NOTE_ROW])
+    first = (await client.get("/api/notes?limit=1")).headers["ETag"]
+    second = (await client.get("/api/notes?limit=2")).headers["ETag"]
+    detail = (await client.get("/api/notes/note-1")).headers["ETag"]
+    assert len({first, second, detail}) == 3
+
+
+async def test_tables_are_versioned_independently(client, mock_turso):
+    mock_turso.return_value = make_turso_result([ITEM_ROW])
+    etag = (await client.get("/api/checklist")).headers["ETag"]
+    mock_turso.return_value = make_turso_result([make_turso_row("note-1")])
+    await client.delete("/api/notes/note-1")
+    mock_turso.return_value = make_turso_result([])
+    resp = await client.get("/api/checklist", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+async def test_checklist_update_invalidates_etag(client, mock_turso):
+    mock_turso.return_value = make_turso_result([ITEM_ROW])
+    etag = (await client.get("/api/checklist?category=documents")).headers["ETag"]
+    await client.patch("/api/checklist/item-1", json={"status": "done"})
+    resp = await client.get("/api/checklist?category=documents", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+async def test_weak_and_listed_validators_match(client, mock_turso):
+    mock_turso.return_value = make_turso_result([])
+    etag = (await client.get("/api/documents")).headers["ETag"]
+    resp = await client.get("/api/documents", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert resp.status_code == 304
+
+
+async def test_document_ingest_invalidates_list(client, mock_turso):
+    import io
+    import fitz
+    pdf = fitz.open()
+    pdf.new_page().insert_text((72, 72), "Padron registration at the town hall.")
+    etag = (await client.get("/api/documents")).headers["ETag"]
+    await client.post("/api/documents/upload", files={"file": ("a.pdf", io.BytesIO(pdf.tobytes()), "application/pdf")})
+    resp = await client.get("/api/documents", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+async def test_writes_from_other_processes_invalidate_at_once(client, local_turso, monkeypatch):
+    etag = (await client.get("/api/checklist")).headers["ETag"]
+    assert (await client.get("/api/checklist", headers={"If-None-Match": etag})).status_code == 304
+    # Straight through the client, like seed.py or another worker; no periodic refresh runs in between.
+    await local_turso.execute(
+        "INSERT INTO checklist_items (id, title, category, created_at, updated_at) VALUES ('c1', 'NIE', 'visa', 'now', 'now')"
+    )
+    resp = await client.get("/api/checklist", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert [item["id"] for item in resp.json()] == ["c1"]
+    assert (await client.get("/api/checklist", headers={"If-None-Match": resp.headers["ETag"]})).status_code == 304
+
+
+async def test_note_is_listed_even_when_embedding_fails(client, mock_turso, mock_embedding):
+    mock_turso.return_value = make_turso_result([NOTE_ROW])
+    etag = (await client.get("/api/notes")).headers["ETag"]
+    mock_embedding["embed_many"].side_effect = RuntimeError("rate limited")
+    with pytest.raises(RuntimeError):
+        await client.post("/api/notes", json={"title": "t", "content": "body"})
+    resp = await client.get("/api/notes", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
@@ -0,0 +1,64 @@
+import pytest
+from app.db.lexical_index import match_expression, upsert, delete_by_source, search
+
+pytestmark = pytest.mark.asyncio
+
+
+def meta(source_id: str, title: str) -> dict:
+    return {"source_id": source_id, "source_type": "note", "title": title, "category": "visa"}
+
+
+@pytest.fixture
+async def indexed(local_turso):
+    await upsert(
+        ids=["visa_0", "city_0", "docs_0"],
+        documents=[
+            "Applying via UGE for fast-track processing of the Digital Nomad Visa.",
+            "Alicante has more than 320 sunny days per year.",
+            "Criminal background check must be apostilled before submission.",
+        ],
+        metadatas=[meta("visa", "Visa Strategy"), meta("city", "About Alicante"), meta("docs", "Documents")],
+    )
+
+
+async def test_match_expression_quotes_terms():
+    assert match_expression('UGE "fast-track"? UGE') == '"uge" OR "fast" OR "track"'
+    assert match_expression("?!") == ""
+
+
+async def test_search_finds_exact_terms(indexed):
+    hits = await search("What does UGE mean?")
+    assert hits[0]["id"] == "visa_0"
+    assert hits[0]["metadata"]["title"] == "Visa Strategy"
+
+
+async def test_search_ignores_diacritics_and_case(indexed):
+    hits = await search("APOSTILLED")
+    assert [h["id"] for h in hits] == ["docs_0"]
+
+
+async def test_upsert_replaces_existing_chunk(indexed):
+    await upsert(["city_0"], ["Granada is inland."], [meta("city", "About Granada")])
+    assert await search("Alicante") == []
+    assert (await search("Granada"))[0]["metadata"]["title"] == "About Granada"
+
+
+async def test_delete_by_source_removes_from_index(indexed):
+    await delete_by_source("visa")
+    assert await search("UGE") == []
+
+
+async def test_search_with_no_terms_skips_query(indexed):
+    assert await search("   ") == []
+
+
+async def test_search_applies_metadata_filters(indexed):
+    await upsert(["doc_0"], ["UGE appointment checklist."], [{**meta("guide", "Guide"), "source_type": "document"}])
+    assert {h["id"] for h in await search("UGE")} == {"visa_0", "doc_0"}
+    assert [h["id"] for h in await search("UGE", filters={"source_type": ["document"]})] == ["doc_0"]
+    assert [h["id"] for h in await search("UGE", filters={"category": ["visa"], "source_id": ["visa", "city"]})] == ["visa_0"]
+
+
+async def test_search_rejects_unknown_filter_columns(indexed):
+    with pytest.raises(ValueError):
+        await search("UGE", filters={"text": ["x"]})
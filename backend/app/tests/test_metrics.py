@@ -0,0 +1,72 @@
+import pytest
+from types import SimpleNamespace
+from app import metrics
+from app.db import vector_store
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+async def test_requests_are_recorded_per_route_template(client, mock_turso):
+    await client.get("/api/notes/some-id")
+    await client.get("/api/notes/other-id")
+    assert metrics.REQUEST_DURATION.count("GET", "/api/notes/{note_id}") == 2
+    assert metrics.REQUESTS.value("GET", "/api/notes/{note_id}", "404") == 2
+    assert metrics.IN_FLIGHT.value() == 0
+
+
+async def test_unmatched_paths_share_one_label(client):
+    await client.get("/nope/1")
+    await client.get("/nope/2")
+    assert metrics.REQUESTS.value("GET", "unmatched", "404") == 2
+
+
+async def test_metrics_endpoint_renders_prometheus_text(client):
+    await client.get("/health")
+    resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"} 1' in body
+    assert 'http_requests_total{method="GET",route="/health",status="200"} 1.0' in body
+
+
+async def test_metrics_endpoint_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr("app.main.settings.metrics_enabled", False)
+    resp = await client.get("/metrics")
+    assert resp.status_code == 404
+
+
+async def test_track_times_calls_and_counts_errors():
+    async with metrics.track("turso", "execute"):
+        pass
+    with pytest.raises(RuntimeError):
+        async with metrics.track("turso", "execute"):
+            raise RuntimeError("db down")
+    assert metrics.DEPENDENCY_DURATION.count("turso", "execute") == 2
+    assert metrics.DEPENDENCY_ERRORS.value("turso", "execute") == 1
+
+
+async def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("h", "help", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+    lines = histogram.render().splitlines()
+    assert 'h_bucket{le="0.1"} 2' in lines
+    assert 'h_bucket{le="1.0"} 3' in lines
+    assert 'h_bucket{le="+Inf"} 4' in lines
+    assert "h_count 4" in lines
+
+
+async def test_vector_store_calls_are_tracked(monkeypatch):
+    backend = SimpleNamespace(query=lambda embedding, n_results, where: {"ids": [[]]})
+    monkeypatch.setattr(vector_store, "_backend", backend)
+    await vector_store._run("query", [0.0], 1, None)
+    assert metrics.DEPENDENCY_DURATION.count("chroma", "query") == 1
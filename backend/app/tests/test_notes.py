@@ -15,16 +15,17 @@ async def test_create_note_returns_201(client, mock_turso):
     assert resp.status_code == 201
 
 
-async def test_create_note_stores_metadata_in_turso(client, mock_turso):
+async def test_create_note_stores_metadata_in_turso(client, mock_turso, mock_turso_batch):
     await client.post("/api/notes", json={"title": "T", "category": "c", "content": "body"})
-    mock_turso.assert_called()
-    call_sql = mock_turso.call_args_list[0][0][0]
-    assert "INSERT INTO notes" in call_sql
+    insert, register = mock_turso_batch.call_args[0][0]
+    assert "INSERT INTO notes" in insert[0]
+    assert "INSERT INTO pending_sources" in register[0]
+    assert "DELETE FROM pending_sources" in mock_turso.call_args[0][0]
 
 
 async def test_create_note_stores_embedding_in_chromadb(client, mock_turso, mock_vector_store, mock_embedding):
     await client.post("/api/notes", json={"title": "T", "category": "c", "content": "body"})
-    mock_embedding["embed"].assert_called_once_with("body")
+    mock_embedding["embed_many"].assert_called_once_with(["body"])
     mock_vector_store["upsert"].assert_called_once()
 
 
@@ -52,25 +53,120 @@ async def test_get_note_not_found_returns_404(client, mock_turso):
 
 
 async def test_delete_note_removes_from_turso(client, mock_turso):
-    mock_turso.side_effect = [
-        make_turso_result([make_turso_row("note-id-1")]),  # SELECT check
-        make_turso_result([]),  # DELETE
-    ]
+    mock_turso.return_value = make_turso_result([make_turso_row("note-id-1")])  # DELETE ... RETURNING
     resp = await client.delete("/api/notes/note-id-1")
     assert resp.status_code == 204
-    delete_call = mock_turso.call_args_list[1][0][0]
+    assert mock_turso.call_count == 1
+    delete_call = mock_turso.call_args_list[0][0][0]
     assert "DELETE FROM notes" in delete_call
 
 
 async def test_delete_note_removes_from_chromadb(client, mock_turso, mock_vector_store):
-    mock_turso.side_effect = [
-        make_turso_result([make_turso_row("note-id-1")]),
-        make_turso_result([]),
-    ]
+    mock_turso.return_value = make_turso_result([make_turso_row("note-id-1")])
     await client.delete("/api/notes/note-id-1")
     mock_vector_store["delete"].assert_called_once_with("note-id-1")
 
 
+async def test_delete_missing_note_returns_404_and_keeps_vectors(client, mock_turso, mock_vector_store):
+    mock_turso.return_value = make_turso_result([])
+    resp = await client.delete("/api/notes/missing")
+    assert resp.status_code == 404
+    mock_vector_store["delete"].assert_not_called()
+
+
 async def test_note_missing_title_returns_422(client):
     resp = await client.post("/api/notes", json={"category": "c", "content": "body"})
     assert resp.status_code == 422
+
+
+async def test_list_notes_sets_next_cursor_when_more_rows(client, mock_turso):
+    older = make_turso_row("note-id-0", "Older", None, "2023-12-31T00:00:00+00:00", "2023-12-31T00:00:00+00:00")
+    mock_turso.return_value = make_turso_result([NOTE_ROW, older])
+    resp = await client.get("/api/notes?limit=1")
+    assert len(resp.json()) == 1
+    assert resp.headers["X-Next-Cursor"]
+    sql, args = mock_turso.call_args_list[0][0]
+    assert "ORDER BY created_at DESC, id DESC LIMIT ?" in sql
+    assert args[-1] == 2
+
+
+async def test_list_notes_follows_cursor(client, mock_turso):
+    mock_turso.return_value = make_turso_result([NOTE_ROW, NOTE_ROW])
+    first = await client.get("/api/notes?limit=1")
+    mock_turso.return_value = make_turso_result([])
+    await client.get("/api/notes", params={"limit": 1, "cursor": first.headers["X-Next-Cursor"]})
+    sql, args = mock_turso.call_args_list[-1][0]
+    assert "(created_at, id) < (?, ?)" in sql
+    assert args[:2] == [NOTE_ROW[3], NOTE_ROW[0]]
+
+
+async def test_list_notes_last_page_has_no_cursor(client, mock_turso):
+    mock_turso.return_value = make_turso_result([NOTE_ROW])
+    resp = await client.get("/api/notes?limit=5")
+    assert "X-Next-Cursor" not in resp.headers
+
+
+async def test_list_notes_invalid_cursor_returns_400(client):
+    resp = await client.get("/api/notes?cursor=not-a-cursor")
+    assert resp.status_code == 400
+
+
+async def test_long_note_is_chunked_with_chunk_ids(client, mock_vector_store, mock_embedding, monkeypatch):
+    monkeypatch.setattr("app.services.chunking.settings.chunk_max_tokens", 20)
+    monkeypatch.setattr("app.services.chunking.settings.chunk_overlap_tokens", 0)
+    content = " ".join(f"Sentence number {i} is about Alicante." for i in range(30))
+    await client.post("/api/notes", json={"title": "Long", "category": "city", "content": content})
+    texts = mock_embedding["embed_many"].call_args[0][0]
+    assert len(texts) > 1
+    kwargs = mock_vector_store["upsert"].call_args.kwargs
+    assert kwargs["ids"][1].endswith("_1")
+    assert [m["chunk_index"] for m in kwargs["metadatas"]] == list(range(len(texts)))
+
+
+async def test_bulk_create_notes_embeds_and_indexes_once(client, mock_turso, mock_turso_batch, mock_embedding, mock_vector_store):
+    items = [{"title": f"Note {i}", "category": "decisions", "content": f"Content number {i}."} for i in range(250)]
+    resp = await client.post("/api/notes/bulk", json={"items": items})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["created"] == 250
+    assert all(r["status"] == "created" for r in data["results"])
+    assert [r["index"] for r in data["results"]] == list(range(250))
+
+    mock_embedding["embed_many"].assert_called_once()
+    mock_vector_store["upsert"].assert_called_once()
+    assert len(mock_vector_store["upsert"].call_args[1]["ids"]) == 250
+    mock_turso_batch.assert_called_once()
+    statements = mock_turso_batch.call_args[0][0]
+    assert len(statements) == 3  # 200 + 50 rows, then the pending markers are released
+    assert "DELETE FROM pending_sources" in statements[-1][0]
+    mock_turso.assert_called_once()
+    assert "INSERT INTO pending_sources" in mock_turso.call_args[0][0]
+
+
+async def test_bulk_create_notes_reports_invalid_items(client):
+    resp = await client.post("/api/notes/bulk", json={"items": [
+        {"title": "Fine", "content": "ok"},
+        {"title": "No content"},
+    ]})
+    results = resp.json()["results"]
+    assert resp.json()["created"] == 1
+    assert results[0]["status"] == "created"
+    assert results[0]["item"]["title"] == "Fine"
+    assert results[1]["status"] == "invalid"
+    assert "content" in results[1]["error"]
+
+
+async def test_bulk_create_notes_failed_write_removes_vectors(client, mock_turso_batch, mock_vector_store):
+    mock_turso_batch.side_effect = RuntimeError("db down")
+    resp = await client.post("/api/notes/bulk", json={"items": [
+        {"title": "A", "content": "a"}, {"title": "B", "content": "b"},
+    ]})
+    data = resp.json()
+    assert data["created"] == 0
+    assert {r["status"] for r in data["results"]} == {"failed"}
+    assert mock_vector_store["delete"].call_count == 2
+
+
+async def test_bulk_create_notes_rejects_oversized_batches(client):
+    resp = await client.post("/api/notes/bulk", json={"items": [{"title": "x", "content": "y"}] * 501})
+    assert resp.status_code == 422
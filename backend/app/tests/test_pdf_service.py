@@ -0,0 +1,69 @@
+import fitz
+import pytest
+from app.services import pdf_service
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_pdf_bytes(page_count: int) -> bytes:
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page number {i}")
+    return doc.tobytes()
+
+
+async def test_extract_pages_returns_one_entry_per_page():
+    pages = await pdf_service.extract_pages(make_pdf_bytes(3))
+    assert len(pages) == 3
+    assert "Page number 0" in pages[0]
+
+
+async def test_extract_pages_preserves_order_across_tasks(monkeypatch):
+    monkeypatch.setattr(pdf_service.settings, "pdf_pages_per_task", 2)
+    pages = await pdf_service.extract_pages(make_pdf_bytes(7))
+    assert len(pages) == 7
+    for i, text in enumerate(pages):
+        assert f"Page number {i}" in text
+
+
+async def test_extract_text_joins_pages():
+    text = await pdf_service.extract_text(make_pdf_bytes(2))
+    assert "Page number 0" in text and "Page number 1" in text
+
+
+async def test_closing_early_cancels_pending_ranges_and_waits_for_running_ones(monkeypatch):
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    started, finished = [], []
+    running = threading.Event()
+
+    def extract_range(content, start, stop):
+        started.append(start)
+        if start == 0:
+            return 5, ["first"]
+        running.set()
+        threading.Event().wait(0.1)
+        finished.append(start)
+        raise RuntimeError("corrupt page")
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(pdf_service.settings, "pdf_pages_per_task", 1)
+    monkeypatch.setattr(pdf_service, "get_executor", lambda: executor)
+    monkeypatch.setattr(pdf_service, "_extract_range", extract_range)
+    loop = asyncio.get_running_loop()
+    reported = []
+    previous = loop.get_exception_handler()
+    loop.set_exception_handler(lambda _, context: reported.append(context))
+    try:
+        pages = pdf_service.iter_pages(b"%PDF")
+        assert await pages.__anext__() == "first"
+        await asyncio.to_thread(running.wait, 5)
+        await pages.aclose()
+        # The range that was running has finished; the rest never started.
+        assert (started, finished) == ([0, 1], [1])
+    finally:
+        loop.set_exception_handler(previous)
+        executor.shutdown(wait=True)
+    assert reported == []
@@ -0,0 +1,104 @@
+import json
+import pytest
+from app.services import document_service, reindex
+
+pytestmark = pytest.mark.asyncio
+
+PAGES = [
+    "The Digital Nomad Visa requires proof of remote income.",
+    "Applicants need private health insurance with full coverage.",
+]
+
+
+async def add_document(db, doc_id: str, pages: list[str], chunk_ids: list[str]) -> None:
+    await db.batch([
+        ("INSERT INTO documents (id, filename, file_type, uploaded_at, chunk_count, content_hash) VALUES (?, ?, 'pdf', '2024-01-01', ?, ?)",
+         [doc_id, f"{doc_id}.pdf", len(chunk_ids), f"hash-{doc_id}"]),
+        *document_service.chunk_statements(doc_id, chunk_ids),
+        *document_service.page_statements(doc_id, pages),
+    ])
+
+
+async def add_note(db, note_id: str, content: str | None) -> None:
+    await db.execute(
+        "INSERT INTO notes (id, title, category, content, created_at, updated_at) VALUES (?, ?, 'visa', ?, '2024-01-01', '2024-01-01')",
+        [note_id, f"Note {note_id}", content],
+    )
+
+
+async def test_reindex_document_rechunks_stored_pages(local_turso, mock_vector_store, monkeypatch):
+    monkeypatch.setattr(reindex.settings, "chunk_max_tokens", 12)
+    await add_document(local_turso, "doc-1", PAGES, ["chunk_old"])
+
+    assert await reindex.reindex_document("doc-1") == 2
+    ids, texts, _, metadatas = mock_vector_store["upsert"].call_args[0]
+    assert ids == [document_service.chunk_id("doc-1", text) for text in texts]
+    assert [m["page_start"] for m in metadatas] == [1, 2]
+    assert all(m["source_id"] == "doc-1" and m["title"] == "doc-1.pdf" for m in metadatas)
+    mock_vector_store["delete"].assert_called_once_with("doc-1")
+
+    rows = (await local_turso.execute("SELECT chunk_id FROM document_chunks WHERE doc_id = 'doc-1' ORDER BY position")).rows
+    assert [row[0] for row in rows] == ids
+    assert (await local_turso.execute("SELECT chunk_count FROM documents")).rows[0][0] == 2
+
+
+async def test_document_without_stored_pages_is_skipped(local_turso, mock_vector_store):
+    await add_document(local_turso, "doc-1", [], ["chunk_old"])
+    assert await reindex.reindex_document("doc-1") is None
+    mock_vector_store["upsert"].assert_not_called()
+
+
+async def test_legacy_note_is_rebuilt_from_indexed_chunks(local_turso, mock_vector_store):
+    await add_note(local_turso, "n1", None)
+    for index, text in [(1, "Second sentence here. Third one."), (0, "First sentence. Second sentence here.")]:
+        await local_turso.execute(
+            "INSERT INTO chunks (chunk_id, source_id, source_type, category, metadata, text) VALUES (?, 'n1', 'note', 'visa', ?, ?)",
+            [f"n1_{index}", json.dumps({"source_id": "n1", "chunk_index": index}), text],
+        )
+
+    assert await reindex.reindex_note("n1") == 1
+    assert mock_vector_store["upsert"].call_args.kwargs["documents"] == ["First sentence. Second sentence here. Third one."]
+    stored = (await local_turso.execute("SELECT content FROM notes WHERE id = 'n1'")).rows[0][0]
+    assert stored == "First sentence. Second sentence here. Third one."
+
+
+async def test_run_checkpoints_and_resumes_after_failures(local_turso, mock_vector_store, mock_embedding):
+    for i in range(5):
+        await add_note(local_turso, f"n{i}", f"Note body {i}.")
+    await add_document(local_turso, "doc-1", PAGES, [])
+
+    def flaky(texts):
+        if texts == ["Note body 3."]:
+            raise RuntimeError("rate limited")
+        return [[0.1] * 4 for _ in texts]
+
+    mock_embedding["embed_many"].side_effect = flaky
+
+    stats = await reindex.run(run_id="r1", batch_size=2, concurrency=2)
+    assert (stats.sources, stats.failed) == (5, 1)
+    checkpoints = (await local_turso.execute("SELECT source_id FROM reindex_checkpoints WHERE run_id = 'r1' ORDER BY source_id")).rows
+    assert [row[0] for row in checkpoints] == ["doc-1", "n0", "n1", "n2", "n4"]
+
+    mock_embedding["embed_many"].side_effect = lambda texts: [[0.1] * 4 for _ in texts]
+    mock_vector_store["upsert"].reset_mock()
+    stats = await reindex.run(run_id="r1", batch_size=2)
+    assert (stats.sources, stats.failed) == (1, 0)
+    assert mock_vector_store["upsert"].call_args.kwargs["ids"] == ["n3_0"]
+
+    stats = await reindex.run(run_id="r1", restart=True)
+    assert stats.sources == 6
+
+
+async def test_upload_stores_page_text(client, local_turso):
+    import fitz
+    pdf = fitz.open()
+    for text in PAGES:
+        pdf.new_page().insert_text((72, 72), text)
+    resp = await client.post("/api/documents/upload", files={"file": ("a.pdf", pdf.tobytes(), "application/pdf")})
+    job = (await client.get(f"/api/documents/jobs/{resp.json()['id']}")).json()
+
+    rows = (await local_turso.execute("SELECT page, text FROM document_pages WHERE doc_id = ? ORDER BY page", [job["document_id"]])).rows
+    assert [(row[0], row[1].strip()) for row in rows] == [(1, PAGES[0]), (2, PAGES[1])]
+
+    await client.delete(f"/api/documents/{job['document_id']}")
+    assert (await local_turso.execute("SELECT COUNT(*) FROM document_pages")).rows[0][0] == 0
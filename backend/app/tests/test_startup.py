@@ -0,0 +1,78 @@
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from app.services import warmup
+
+BACKEND = Path(__file__).resolve().parents[2]
+# Loaded on first use only; importing the app must not pay for them.
+HEAVY_MODULES = ["chromadb", "fitz", "numpy", "openai", "tiktoken"]
+# Generous for CI machines; the import itself takes about half a second.
+IMPORT_BUDGET_SECONDS = 3.0
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}))
+"""
+
+
+def test_importing_the_app_skips_heavy_modules_and_stays_in_budget():
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=BACKEND, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(out.splitlines()[-1])
+    assert [name for name in HEAVY_MODULES if name in result["modules"]] == []
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS
+
+
+@pytest.fixture
+async def warmup_state():
+    yield
+    await warmup.stop()
+
+
+@pytest.mark.asyncio
+async def test_ready_waits_for_warm_up(client, monkeypatch, warmup_state):
+    opened = asyncio.Event()
+
+    async def slow_backend():
+        await opened.wait()
+
+    monkeypatch.setattr(warmup.settings, "warmup_enabled", True)
+    monkeypatch.setattr(warmup.vector_store, "warm_up", slow_backend)
+    monkeypatch.setattr(warmup, "_open_clients", lambda: None)
+
+    await warmup.start()
+    resp = await client.get("/ready")
+    assert resp.status_code == 503
+
+    opened.set()
+    await warmup._task
+    resp = await client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ready"}
+
+
+@pytest.mark.asyncio
+async def test_failed_warm_up_still_reports_ready(client, monkeypatch, warmup_state):
+    async def broken():
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(warmup.settings, "warmup_enabled", True)
+    monkeypatch.setattr(warmup.vector_store, "warm_up", broken)
+    monkeypatch.setattr(warmup, "_open_clients", lambda: None)
+
+    await warmup.start()
+    await warmup._task
+    assert (await client.get("/ready")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_ready_immediately_without_warm_up(client, monkeypatch, warmup_state):
+    monkeypatch.setattr(warmup.settings, "warmup_enabled", False)
+    await warmup.start()
+    assert (await client.get("/ready")).status_code == 200
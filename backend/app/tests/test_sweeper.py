@@ -0,0 +1,114 @@
+import pytest
+from app.db import vector_store
+from app.services import sweeper
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    """A real NumPy vector index; chunks are written to it directly, bypassing the conftest mocks."""
+    monkeypatch.setattr(vector_store.settings, "vector_backend", "numpy")
+    monkeypatch.setattr(vector_store.settings, "vector_index_dir", str(tmp_path / "index"))
+    monkeypatch.setattr(vector_store, "_backend", None)
+    yield vector_store.get_backend()
+    vector_store.shutdown()
+
+
+def put(index, chunk_id: str, source_id: str) -> None:
+    index.upsert([chunk_id], ["text"], [[1.0, 0.0]], [{"source_id": source_id, "source_type": "note"}])
+
+
+async def add_note(db, note_id: str, content: str) -> None:
+    await db.execute(
+        "INSERT INTO notes (id, title, category, content, created_at, updated_at) VALUES (?, 'T', NULL, ?, 'now', 'now')",
+        [note_id, content],
+    )
+
+
+async def add_lexical_row(db, chunk_id: str, source_id: str) -> None:
+    await db.execute(
+        "INSERT INTO chunks (chunk_id, source_id, source_type, category, metadata, text) VALUES (?, ?, 'note', '', '{}', 'text')",
+        [chunk_id, source_id],
+    )
+
+
+async def test_sweep_removes_orphans_and_rebuilds_missing_notes(local_turso, index, mock_vector_store):
+    await add_note(local_turso, "kept", "Still here.")
+    await add_note(local_turso, "lost", "Never got its vectors.")
+    await add_note(local_turso, "empty", "  ")
+    put(index, "kept_0", "kept")
+    put(index, "gone_0", "gone")
+    put(index, "gone_1", "gone")
+    await add_lexical_row(local_turso, "gone_0", "gone")
+    await add_lexical_row(local_turso, "kept_0", "kept")
+
+    report = await sweeper.sweep()
+    assert (report.orphan_sources, report.orphan_vectors, report.orphan_lexical_rows) == (1, 2, 1)
+    assert (report.reindexed_notes, report.reindexed_documents, report.unrecoverable) == (1, 0, [])
+    assert report.bytes_reclaimed >= 0
+    assert index.inventory() == {"kept_0": "kept"}
+    assert [row[0] for row in (await local_turso.execute("SELECT chunk_id FROM chunks")).rows] == ["kept_0"]
+    assert mock_vector_store["upsert"].call_args.kwargs["ids"] == ["lost_0"]
+
+
+async def test_sweep_rebuilds_documents_missing_chunks(local_turso, index, mock_vector_store):
+    from .test_reindex import PAGES, add_document
+    await add_document(local_turso, "doc-1", PAGES, ["chunk_a", "chunk_b"])
+    await add_document(local_turso, "doc-2", [], ["chunk_c"])
+    put(index, "chunk_a", "doc-1")
+
+    report = await sweeper.sweep()
+    assert report.reindexed_documents == 1
+    assert report.unrecoverable == ["doc-2"]
+    assert mock_vector_store["upsert"].call_args[0][3][0]["source_id"] == "doc-1"
+
+
+async def test_sweep_leaves_orphans_while_ingestion_is_running(local_turso, index):
+    put(index, "new_0", "doc-in-flight")
+    await local_turso.execute(
+        "INSERT INTO ingestion_jobs (id, filename, status, stage, created_at, updated_at, content_hash) "
+        "VALUES ('job', 'a.pdf', 'running', 'embedding', 'now', 'now', 'h')"
+    )
+    report = await sweeper.sweep()
+    assert report.deferred
+    assert index.inventory() == {"new_0": "doc-in-flight"}
+
+
+async def test_dry_run_changes_nothing(local_turso, index, mock_vector_store):
+    await add_note(local_turso, "lost", "No vectors.")
+    put(index, "gone_0", "gone")
+    report = await sweeper.sweep(dry_run=True)
+    assert (report.orphan_vectors, report.reindexed_notes) == (1, 1)
+    assert index.inventory() == {"gone_0": "gone"}
+    mock_vector_store["upsert"].assert_not_called()
+
+
+async def test_sweep_during_bulk_create_keeps_the_new_vectors(client, local_turso, index, mock_vector_store, mock_embedding):
+    reports = []
+
+    async def upsert_then_sweep(ids, documents, embeddings, metadatas):
+        # The vectors exist but the notes rows do not yet: exactly where a sweep used to strike.
+        for chunk_id, meta in zip(ids, metadatas):
+            put(index, chunk_id, meta["source_id"])
+        await add_lexical_row(local_turso, ids[0], metadatas[0]["source_id"])
+        reports.append(await sweeper.sweep())
+
+    mock_vector_store["upsert"].side_effect = upsert_then_sweep
+    resp = await client.post("/api/notes/bulk", json={"items": [{"title": "A", "content": "Alpha."}, {"title": "B", "content": "Beta."}]})
+    assert resp.json()["created"] == 2
+
+    note_ids = {r["item"]["id"] for r in resp.json()["results"]}
+    assert (reports[0].orphan_vectors, reports[0].orphan_lexical_rows, reports[0].reindexed_notes) == (0, 0, 0)
+    assert set(index.inventory().values()) == note_ids
+    assert (await local_turso.execute("SELECT COUNT(*) FROM chunks")).rows[0][0] == 1
+    assert (await local_turso.execute("SELECT COUNT(*) FROM pending_sources")).rows[0][0] == 0
+
+
+async def test_sweep_removes_stale_pending_markers(local_turso, index):
+    put(index, "dead_0", "dead")
+    await local_turso.execute("INSERT INTO pending_sources (source_id, started_at) VALUES ('dead', '2000-01-01T00:00:00+00:00')")
+    report = await sweeper.sweep()
+    assert report.orphan_vectors == 1
+    assert index.inventory() == {}
+    assert (await local_turso.execute("SELECT COUNT(*) FROM pending_sources")).rows[0][0] == 0
@@ -1,5 +1,8 @@
+import threading
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+# Bound at import, before conftest's autouse fixture swaps the module attribute for a mock.
+from app.db.turso import batch
 
 pytestmark = pytest.mark.asyncio
 
@@ -50,3 +53,142 @@ async def test_turso_delete():
         from app.db.turso import execute
         result = await execute("DELETE FROM notes WHERE id = ?", ["id-1"])
         assert result is not None
+
+
+async def test_turso_batch_sends_all_statements_in_one_call():
+    mock_client = MagicMock()
+    mock_client.batch = AsyncMock(return_value=[MagicMock(rows=[]), MagicMock(rows=[("id-1",)])])
+    with patch("app.db.turso.get_client", return_value=mock_client):
+        results = await batch([
+            ("INSERT INTO notes (id) VALUES (?)", ["id-1"]),
+            ("SELECT id FROM notes WHERE id = ?", ["id-1"]),
+        ])
+    mock_client.batch.assert_awaited_once()
+    statements = mock_client.batch.call_args[0][0]
+    assert [s.sql for s in statements] == ["INSERT INTO notes (id) VALUES (?)", "SELECT id FROM notes WHERE id = ?"]
+    assert results[1].rows == [("id-1",)]
+
+
+async def test_turso_batch_with_no_statements_skips_round_trip():
+    mock_client = MagicMock()
+    mock_client.batch = AsyncMock()
+    with patch("app.db.turso.get_client", return_value=mock_client):
+        assert await batch([]) == []
+    mock_client.batch.assert_not_called()
+
+
+@pytest.fixture
+async def replica(local_turso, monkeypatch, tmp_path):
+    from app.db import turso
+    monkeypatch.setattr(turso.settings, "turso_replica_path", str(tmp_path / "replica.db"))
+    monkeypatch.setattr(turso.settings, "turso_replica_sync_seconds", 0)
+    await turso.start_replica()
+    yield turso
+    await turso.stop_replica()
+
+
+async def add_note_elsewhere(db, note_id: str) -> None:
+    # Straight through the client, like another process writing to the primary.
+    await db.execute(
+        "INSERT INTO notes (id, title, category, created_at, updated_at) VALUES (?, ?, 'visa', '2024-01-01', '2024-01-01')",
+        [note_id, f"Note {note_id}"],
+    )
+
+
+async def test_replica_serves_reads_until_the_next_sync(replica, local_turso, monkeypatch):
+    await add_note_elsewhere(local_turso, "n1")
+    assert (await replica.read("SELECT id FROM notes")).rows == []
+
+    await replica.sync_replica()
+    result = await replica.read("SELECT id, title FROM notes WHERE id = ?", ["n1"])
+    assert result.columns == ("id", "title")
+    assert result.rows[0]["title"] == "Note n1"
+
+    # Nothing changed since: the sync compares counts and copies nothing.
+    check = AsyncMock(wraps=replica.batch)
+    monkeypatch.setattr(replica, "batch", check)
+    await replica.sync_replica()
+    check.assert_called_once()
+    assert not any("FROM notes" in sql for sql, _ in check.call_args[0][0])
+
+
+async def test_snapshot_leaves_out_note_content(replica, local_turso):
+    await local_turso.execute(
+        "INSERT INTO notes (id, title, category, content, created_at, updated_at) VALUES ('n1', 'T', 'visa', 'long body', 'now', 'now')"
+    )
+    await replica.sync_replica()
+    assert (await replica.read("SELECT id, content FROM notes")).rows[0].astuple() == ("n1", None)
+
+
+async def test_writes_are_replayed_on_the_replica(replica, local_turso, monkeypatch):
+    snapshot = AsyncMock()
+    monkeypatch.setattr(replica, "batch", snapshot)
+    await replica.execute(
+        "INSERT INTO checklist_items (id, title, category, created_at, updated_at) VALUES ('c1', 'NIE', 'visa', 'now', 'now')"
+    )
+    await replica.execute("UPDATE checklist_items SET status = 'done' WHERE id = 'c1'")
+    # Served by the replica straight away: removing the row on the primary alone does not hide it.
+    await local_turso.execute("DELETE FROM checklist_items")
+    assert [row.astuple() for row in (await replica.read("SELECT id, status FROM checklist_items")).rows] == [("c1", "done")]
+    snapshot.assert_not_called()
+
+    # Writes to tables the replica does not hold, or that only read replicated ones, are not replayed.
+    await replica.execute("INSERT INTO chat_history (id, role, content, created_at) VALUES ('m1', 'user', 'hi', 'now')")
+    await replica.execute("DELETE FROM chunks WHERE source_id NOT IN (SELECT id FROM notes)")
+    assert replica._resync_task is None
+
+
+async def test_failed_replay_falls_back_to_the_primary_until_resynced(replica, local_turso):
+    insert = "INSERT INTO checklist_items (id, title, category, created_at, updated_at) VALUES ('c1', 'NIE', 'visa', 'now', 'now')"
+    await replica.execute(insert)
+    await local_turso.execute("DELETE FROM checklist_items")
+    # Fine on the primary, a duplicate on the replica.
+    await replica.execute(insert.replace("'NIE'", "'NIE 2'"))
+    assert (await replica.read("SELECT title FROM checklist_items")).rows[0][0] == "NIE 2"
+
+    await replica._resync_task
+    assert not replica._stale
+    assert [row[0] for row in (await replica.read("SELECT title FROM checklist_items")).rows] == ["NIE 2"]
+
+
+async def test_checklist_endpoints_read_their_own_writes(client, replica):
+    created = (await client.post("/api/checklist", json={"title": "Book NIE appointment", "category": "visa"})).json()
+    await client.patch(f"/api/checklist/{created['id']}", json={"status": "done"})
+    items = (await client.get("/api/checklist")).json()
+    assert [(item["id"], item["status"]) for item in items] == [(created["id"], "done")]
+
+
+async def test_replica_reads_run_off_the_event_loop(replica, monkeypatch):
+    threads = []
+    query = type(replica._replica).query
+
+    def recording_query(self, sql, args):
+        threads.append(threading.current_thread())
+        return query(self, sql, args)
+
+    monkeypatch.setattr(type(replica._replica), "query", recording_query)
+    await replica.read("SELECT id FROM notes")
+    assert threads and threads[0] is not threading.main_thread()
+
+
+async def test_writes_that_cannot_be_classified_mark_the_replica_stale(replica, local_turso):
+    await replica.execute(
+        "WITH new (id) AS (SELECT 'c1') "
+        "INSERT INTO checklist_items (id, title, category, created_at, updated_at) SELECT id, 'NIE', 'visa', 'now', 'now' FROM new"
+    )
+    assert replica._stale
+    await replica._resync_task
+    assert [row[0] for row in (await replica.read("SELECT id FROM checklist_items")).rows] == ["c1"]
+
+
+async def test_trigger_driven_writes_mark_the_replica_stale(replica, local_turso):
+    await local_turso.execute("CREATE TABLE imports (id TEXT)")
+    await local_turso.execute(
+        "CREATE TRIGGER imports_ai AFTER INSERT ON imports BEGIN "
+        "INSERT INTO checklist_items (id, title, category, created_at, updated_at) VALUES (new.id, 'Imported', 'visa', 'now', 'now'); END"
+    )
+    await replica.sync_replica()
+    await replica.execute("INSERT INTO imports (id) VALUES ('c1')")
+    assert replica._stale
+    await replica._resync_task
+    assert [row[0] for row in (await replica.read("SELECT id FROM checklist_items")).rows] == ["c1"]
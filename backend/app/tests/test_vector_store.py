@@ -0,0 +1,187 @@
+import asyncio
+import pytest
+from app.db import vector_store
+from app.db.vector_store import upsert_chunks, query_chunks, delete_by_source
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(params=["chroma", "numpy"])
+def local_collection(request, monkeypatch, tmp_path):
+    """Point the real vector store at a throwaway backend directory (conftest mocks the public functions)."""
+    monkeypatch.setattr(vector_store.settings, "vector_backend", request.param)
+    monkeypatch.setattr(vector_store.settings, "chroma_persist_dir", str(tmp_path / "chroma"))
+    monkeypatch.setattr(vector_store.settings, "vector_index_dir", str(tmp_path / "index"))
+    monkeypatch.setattr(vector_store, "_backend", None)
+    yield request.param
+    vector_store.shutdown()
+
+
+def meta(source_id: str) -> dict:
+    return {"source_id": source_id, "source_type": "note", "title": source_id, "category": ""}
+
+
+async def test_backend_is_cached(local_collection):
+    assert vector_store.get_backend() is vector_store.get_backend()
+    assert vector_store.get_backend().name == local_collection
+
+
+async def test_upsert_then_query_returns_nearest(local_collection):
+    await upsert_chunks(
+        ids=["a_0", "b_0"],
+        documents=["alpha", "beta"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0]],
+        metadatas=[meta("a"), meta("b")],
+    )
+    results = await query_chunks([0.9, 0.1], n_results=1)
+    assert results["documents"][0] == ["alpha"]
+    assert results["metadatas"][0][0]["source_id"] == "a"
+
+
+async def test_delete_by_source_removes_vectors(local_collection):
+    await upsert_chunks(["a_0"], ["alpha"], [[1.0, 0.0]], [meta("a")])
+    await delete_by_source("a")
+    assert vector_store.get_backend().count() == 0
+
+
+async def test_concurrent_writes_are_all_applied(local_collection):
+    await asyncio.gather(*(
+        upsert_chunks([f"n{i}_0"], [f"text {i}"], [[1.0, float(i)]], [meta(f"n{i}")])
+        for i in range(20)
+    ))
+    assert vector_store.get_backend().count() == 20
+
+
+async def test_query_distances_are_cosine(local_collection):
+    await upsert_chunks(["a", "b"], ["alpha", "beta"], [[2.0, 0.0], [0.0, 3.0]], [meta("a"), meta("b")])
+    results = await query_chunks([1.0, 0.0], n_results=2)
+    assert results["ids"][0] == ["a", "b"]
+    assert results["distances"][0] == pytest.approx([0.0, 1.0], abs=1e-5)
+
+
+async def test_query_where_filters_candidates(local_collection):
+    await upsert_chunks(
+        ["a", "b", "c"], ["alpha", "beta", "gamma"],
+        [[1.0, 0.0], [0.9, 0.1], [0.8, 0.2]],
+        [meta("a"), {**meta("b"), "source_type": "document"}, meta("c")],
+    )
+    results = await query_chunks([1.0, 0.0], n_results=3, where={"source_type": "document"})
+    assert results["ids"][0] == ["b"]
+    results = await query_chunks([1.0, 0.0], n_results=3, where={"$and": [{"source_type": "note"}, {"source_id": {"$in": ["c", "z"]}}]})
+    assert results["ids"][0] == ["c"]
+
+
+async def test_upsert_overwrites_existing_ids(local_collection):
+    await upsert_chunks(["a"], ["old"], [[1.0, 0.0]], [meta("a")])
+    await upsert_chunks(["a"], ["new"], [[0.0, 1.0]], [meta("a")])
+    results = await query_chunks([0.0, 1.0], n_results=5)
+    assert results["documents"][0] == ["new"]
+    assert vector_store.get_backend().count() == 1
+
+
+async def test_numpy_index_reopens_from_disk(tmp_path):
+    from app.db.vector_backends.numpy_index import NumpyBackend
+    index = NumpyBackend(str(tmp_path))
+    index.upsert(["a", "b", "c"], ["alpha", "beta", "gamma"], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], [meta("a"), meta("b"), meta("c")])
+    index.delete_source("b")
+    index.upsert(["c"], ["gamma"], [[1.0, 1.0]], [{**meta("c"), "title": "renamed"}])
+    index.close()
+
+    reopened = NumpyBackend(str(tmp_path))
+    assert reopened.count() == 2
+    results = reopened.query([0.0, 1.0], n_results=5)
+    assert results["ids"][0] == ["c", "a"]
+    assert results["metadatas"][0][0]["title"] == "renamed"
+
+
+async def test_numpy_index_grows_and_compacts(tmp_path, monkeypatch):
+    from app.db.vector_backends import numpy_index
+    monkeypatch.setattr(numpy_index, "_INITIAL_CAPACITY", 4)
+    monkeypatch.setattr(numpy_index, "_COMPACT_MIN_DEAD", 4)
+    index = numpy_index.NumpyBackend(str(tmp_path))
+    index.upsert([f"a{i}" for i in range(10)], ["x"] * 10, [[1.0, float(i)] for i in range(10)], [meta("a")] * 10)
+    index.upsert(["b0", "b1"], ["y", "y"], [[0.0, 1.0], [0.0, 2.0]], [meta("b")] * 2)
+    index.delete_source("a")
+    assert index.count() == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["manifest.json", "rows.1.jsonl", "vectors.1.f32"]
+    index.close()
+    assert numpy_index.NumpyBackend(str(tmp_path)).query([0.0, 1.0], n_results=5)["ids"][0] == ["b0", "b1"]
+
+
+async def test_numpy_query_scores_outside_the_lock(tmp_path, monkeypatch):
+    import threading
+    from app.db.vector_backends import numpy_index
+    monkeypatch.setattr(numpy_index, "_INITIAL_CAPACITY", 4)
+    monkeypatch.setattr(numpy_index, "_COMPACT_MIN_DEAD", 4)
+    index = numpy_index.NumpyBackend(str(tmp_path))
+    index.upsert([f"a{i}" for i in range(6)], ["x"] * 6, [[1.0, float(i)] for i in range(6)], [meta("a")] * 6)
+    index.upsert(["b0"], ["y"], [[0.0, 1.0]], [meta("b")])
+    scan = numpy_index._scan
+
+    def scan_during_compaction(*args):
+        # Deleting "a" compacts into a new generation; it must not wait for this query.
+        writer = threading.Thread(target=index.delete_source, args=("a",))
+        writer.start()
+        writer.join(timeout=5)
+        assert not writer.is_alive()
+        return scan(*args)
+
+    monkeypatch.setattr(numpy_index, "_scan", scan_during_compaction)
+    results = index.query([1.0, 0.0], n_results=2)
+    assert results["ids"][0] == ["a0", "a1"]
+    assert results["documents"][0] == ["x", "x"]
+    assert index.count() == 1
+
+
+async def test_numpy_index_rejects_dimension_change(tmp_path):
+    from app.db.vector_backends.numpy_index import NumpyBackend
+    index = NumpyBackend(str(tmp_path))
+    index.upsert(["a"], ["alpha"], [[1.0, 0.0]], [meta("a")])
+    with pytest.raises(ValueError):
+        index.upsert(["b"], ["beta"], [[1.0, 0.0, 0.0]], [meta("b")])
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+async def test_quantized_index_rescores_to_exact_results(tmp_path, dtype):
+    import numpy as np
+    from app.db.vector_backends.numpy_index import NumpyBackend
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((300, 32)).tolist()
+    ids = [f"c{i}" for i in range(300)]
+    exact = NumpyBackend(str(tmp_path / "exact"), dtype="float32")
+    quantized = NumpyBackend(str(tmp_path / dtype), dtype=dtype)
+    for index in (exact, quantized):
+        index.upsert(ids, ids, vectors, [meta("a")] * 300)
+
+    for query in rng.standard_normal((5, 32)).tolist():
+        expected, got = exact.query(query, n_results=5), quantized.query(query, n_results=5)
+        assert got["ids"] == expected["ids"]
+        assert got["distances"][0] == pytest.approx(expected["distances"][0], abs=1e-5)
+
+
+async def test_int8_index_without_rescoring_keeps_no_float32_copy(tmp_path, monkeypatch):
+    from app.db.vector_backends.numpy_index import NumpyBackend
+    monkeypatch.setattr(vector_store.settings, "vector_index_rescore", 0)
+    index = NumpyBackend(str(tmp_path), dtype="int8")
+    index.upsert(["a", "b"], ["alpha", "beta"], [[1.0, 0.0], [0.0, 1.0]], [meta("a"), meta("b")])
+    index.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["manifest.json", "rows.0.jsonl", "scales.0.f32", "vectors.0.i8"]
+
+    # The manifest, not the current setting, decides how an existing index is stored.
+    reopened = NumpyBackend(str(tmp_path), dtype="float32")
+    results = reopened.query([0.9, 0.1], n_results=2)
+    assert results["ids"][0] == ["a", "b"]
+    assert results["distances"][0][0] == pytest.approx(1 - 0.9 / (0.82 ** 0.5), abs=1e-2)
+
+
+async def test_inventory_and_delete_chunks(local_collection, mock_lexical_index, monkeypatch):
+    from app.db import lexical_index
+    monkeypatch.setattr(lexical_index, "delete_ids", mock_lexical_index["delete"])
+    await upsert_chunks(["a_0", "a_1", "b_0"], ["x", "y", "z"], [[1.0, 0.0], [0.5, 0.5], [0.0, 1.0]], [meta("a"), meta("a"), meta("b")])
+    assert await vector_store.inventory() == {"a_0": "a", "a_1": "a", "b_0": "b"}
+    await vector_store.delete_chunks(["a_1", "missing"])
+    assert await vector_store.inventory() == {"a_0": "a", "b_0": "b"}
+    mock_lexical_index["delete"].assert_called_once_with(["a_1", "missing"])
+    reclaimed = await vector_store.compact()
+    assert reclaimed is None if local_collection == "chroma" else reclaimed >= 0
+    assert (await query_chunks([0.0, 1.0], n_results=5))["ids"][0] == ["b_0", "a_0"]
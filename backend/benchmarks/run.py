@@ -0,0 +1,305 @@
+"""
+Micro-benchmarks for the ingestion and retrieval hot paths.
+
+    python benchmarks/run.py                      # run and compare with the saved baseline
+    python benchmarks/run.py --save               # run and overwrite the baseline
+    python benchmarks/run.py --quick              # smaller inputs, 1k/10k vectors only
+    python benchmarks/run.py --only chunking,pdf  # a subset of the suites
+    python benchmarks/run.py --only recall        # recall vs. size for reduced/quantized vectors
+
+Everything runs offline: embeddings come from a stubbed provider, both vector
+backends live in temporary directories and the embedding cache's Turso tier is disabled.
+Each case reports the median of several repetitions; a case regresses when its
+median exceeds the baseline's by more than --threshold (default 25%), and the
+script then exits non-zero so it can gate CI.
+
+The recall suite times the NumPy index at reduced dimensions and with float16
+and int8 storage, and reports recall@10 against exact full-size float32
+search. Its vectors are synthetic: clustered, with variance decaying along the
+dimensions the way Matryoshka-trained embeddings such as text-embedding-3
+front-load information. Treat its recall as a relative guide and confirm a
+chosen setting against real embeddings before re-indexing.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings  # noqa: E402
+
+BASELINE = Path(__file__).parent / "baseline.json"
+SUITES = ("chunking", "pdf", "embedding", "query", "recall")
+
+_WORDS = (
+    "visa residence income requirement alicante apostille insurance padron "
+    "contract remote employer spain application consulate bank statement "
+    "translation criminal record nie appointment tax beckham regime"
+).split()
+
+
+def synthetic_text(n_words: int, seed: int = 0) -> str:
+    """Paragraphs of sentences of 8–25 words, deterministic for a given seed."""
+    rng = random.Random(seed)
+    paragraphs, sentences, words = [], [], 0
+    while words < n_words:
+        length = rng.randint(8, 25)
+        sentence = " ".join(rng.choice(_WORDS) for _ in range(length))
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        words += length
+        if len(sentences) >= rng.randint(3, 7):
+            paragraphs.append(" ".join(sentences))
+            sentences = []
+    if sentences:
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def measure(fn, repeat: int) -> dict:
+    """Time `fn` `repeat` times after one warm-up call. Returns seconds."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeat": repeat}
+
+
+def bench_chunking(quick: bool) -> dict:
+    from app.services.chunking import chunk_text
+
+    results = {}
+    for n_words in (20_000, 200_000) if quick else (20_000, 200_000, 1_000_000):
+        text = synthetic_text(n_words)
+        chunks = chunk_text(text)
+        stats = measure(lambda: chunk_text(text), repeat=3 if quick else 5)
+        stats["mb_per_s"] = len(text.encode()) / 1e6 / stats["median_s"]
+        stats["chunks"] = len(chunks)
+        results[f"chunk_text/{n_words}_words"] = stats
+    return results
+
+
+def bench_pdf(quick: bool) -> dict:
+    import fitz
+    from app.services import pdf_service
+
+    pages = 20 if quick else 200
+    pdf = fitz.open()
+    for page in range(pages):
+        text = synthetic_text(400, seed=page)
+        pdf.new_page().insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=7)
+    content = pdf.tobytes()
+
+    results = {}
+    stats = measure(lambda: pdf_service._extract_range(content, 0, pages), repeat=3)
+    stats["ms_per_page"] = stats["median_s"] * 1000 / pages
+    results[f"extract/in_process/{pages}_pages"] = stats
+
+    # Includes process-pool round-trips; the warm-up call spawns the workers.
+    stats = measure(lambda: asyncio.run(pdf_service.extract_pages(content)), repeat=3)
+    stats["ms_per_page"] = stats["median_s"] * 1000 / pages
+    results[f"extract/pool/{pages}_pages"] = stats
+    pdf_service.shutdown()
+    return results
+
+
+class _StubProvider:
+    """Returns a constant vector instantly, so only our batching and caching is timed."""
+    name = "benchmark-stub"
+    max_batch_tokens = None
+
+    def __init__(self, dim: int = 384):
+        self.vector = [0.0] * dim
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self.vector] * len(texts)
+
+
+def bench_embedding(quick: bool) -> dict:
+    from app.services import embedding_cache, embedding_service
+
+    n = 2_000 if quick else 20_000
+    settings.embedding_cache_persist = False
+    settings.embedding_cache_size = n
+    embedding_service.get_provider = _StubProvider
+    texts = [f"{synthetic_text(60, seed=i)} {i}" for i in range(n)]
+
+    def cold():
+        embedding_cache.clear()
+        asyncio.run(embedding_service.embed_many(texts))
+
+    def warm():
+        asyncio.run(embedding_service.embed_many(texts))
+
+    results = {}
+    for name, fn in (("cold", cold), ("warm_cache", warm)):
+        stats = measure(fn, repeat=3)
+        stats["us_per_text"] = stats["median_s"] * 1e6 / n
+        results[f"embed_many/{name}/{n}_texts"] = stats
+    embedding_cache.clear()
+    return results
+
+
+def bench_query(quick: bool) -> dict:
+    import numpy as np
+    from app.db import vector_backends, vector_store
+
+    dim, batch = 384, 5_000
+    results = {}
+    for backend_name in ("chroma", "numpy"):
+        rng = np.random.default_rng(0)
+        for size in (1_000, 10_000) if quick else (1_000, 10_000, 100_000):
+            with tempfile.TemporaryDirectory() as path:
+                settings.chroma_persist_dir = settings.vector_index_dir = path
+                backend = vector_backends.create(backend_name)
+                for start in range(0, size, batch):
+                    vectors = rng.standard_normal((min(batch, size - start), dim)).astype(np.float32)
+                    backend.upsert(
+                        ids=[f"c{start + i}" for i in range(len(vectors))],
+                        embeddings=vectors.tolist(),
+                        documents=[f"chunk {start + i}" for i in range(len(vectors))],
+                        metadatas=[{"source_id": f"doc{(start + i) // 50}", "chunk_index": (start + i) % 50} for i in range(len(vectors))],
+                    )
+                settings.vector_backend = backend_name
+                vector_store._backend = backend
+                queries = rng.standard_normal((20, dim)).astype(np.float32).tolist()
+
+                async def run_queries():
+                    for query in queries:
+                        await vector_store.query_chunks(query, n_results=10)
+
+                stats = measure(lambda: asyncio.run(run_queries()), repeat=3)
+                stats["ms_per_query"] = stats["median_s"] * 1000 / len(queries)
+                key = f"query_chunks/{size}_vectors" if backend_name == "chroma" else f"query_chunks/{backend_name}/{size}_vectors"
+                results[key] = stats
+                vector_store.shutdown()
+    return results
+
+
+def _embedding_like(rng, n: int, centers, spread: float = 0.8):
+    """Unit vectors scattered around `centers`, with variance decaying along the dimensions."""
+    import numpy as np
+
+    dim = centers.shape[1]
+    points = centers[rng.integers(len(centers), size=n)] + spread * rng.standard_normal((n, dim))
+    points *= 1 / np.sqrt(1 + np.arange(dim) / 32)
+    return (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+
+
+def bench_recall(quick: bool) -> dict:
+    import numpy as np
+    from app.db.vector_backends.numpy_index import NumpyBackend
+    from app.services.embedding_providers import truncate
+
+    full_dim, k = 1536, 10
+    size = 5_000 if quick else 50_000
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((size // 50, full_dim))
+    corpus = _embedding_like(rng, size, centers)
+    # Queries sit near stored chunks, as a question does near the passage that answers it.
+    queries = corpus[rng.choice(size, 50, replace=False)] + 0.05 * rng.standard_normal((50, full_dim)).astype(np.float32)
+    truth = [set(np.argsort(-(corpus @ q))[:k]) for q in queries]
+    ids = [str(i) for i in range(size)]
+    metadatas = [{"source_id": f"doc{i // 50}"} for i in range(size)]
+
+    results = {}
+    settings.vector_index_rescore = 4
+    for dim in (full_dim, 512, 256):
+        vectors, reduced = truncate(corpus, dim), truncate(queries, dim)
+        for dtype in ("float32", "float16", "int8"):
+            with tempfile.TemporaryDirectory() as path:
+                settings.vector_index_rescore = 4
+                index = NumpyBackend(path, dtype=dtype)
+                for start in range(0, size, 5_000):
+                    index.upsert(ids[start:start + 5_000], ids[start:start + 5_000], vectors[start:start + 5_000], metadatas[start:start + 5_000])
+                for rescore in (0, 4) if dtype != "float32" else (0,):
+                    settings.vector_index_rescore = rescore
+
+                    def run_queries():
+                        return [index.query(q, n_results=k)["ids"][0] for q in reduced]
+
+                    found = run_queries()
+                    stats = measure(run_queries, repeat=3)
+                    stats["ms_per_query"] = stats["median_s"] * 1000 / len(reduced)
+                    stats["recall_at_10"] = sum(len(truth[i] & {int(x) for x in f}) for i, f in enumerate(found)) / (k * len(found))
+                    stats["scan_bytes_per_vector"] = dim * np.dtype(dtype).itemsize + (4 if dtype == "int8" else 0)
+                    suffix = "/rescored" if rescore else ""
+                    results[f"recall/{dim}d/{dtype}{suffix}/{size}_vectors"] = stats
+                index.close()
+    return results
+
+
+def run(suites: list[str], quick: bool) -> dict:
+    benches = {
+        "chunking": bench_chunking, "pdf": bench_pdf, "embedding": bench_embedding,
+        "query": bench_query, "recall": bench_recall,
+    }
+    results = {}
+    for suite in suites:
+        print(f"running {suite}...", file=sys.stderr)
+        results.update(benches[suite](quick))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return a message for every case whose median regressed beyond `threshold`."""
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        ratio = stats["median_s"] / before["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {before['median_s']:.4f}s -> {stats['median_s']:.4f}s ({ratio - 1:+.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--only", default=",".join(SUITES), help="comma-separated subset of: " + ", ".join(SUITES))
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    suites = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    results = run(suites, args.quick)
+    for name, stats in results.items():
+        extras = ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in stats.items() if k != "median_s")
+        print(f"{name:45s} {stats['median_s'] * 1000:10.2f} ms  {extras}")
+
+    if args.save:
+        payload = {
+            "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "quick": args.quick,
+            "results": results,
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n")
+        print(f"saved baseline to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("no baseline to compare against; run with --save first")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Reindex script — re-chunks and re-embeds every note and document from the
+text stored in Turso. Run after changing the embedding provider or
+dimensions, the chunk size or the vector backend:
+
+    python seed/reindex.py                  # start, or resume an interrupted run
+    python seed/reindex.py --restart        # redo everything for the current settings
+    python seed/reindex.py --only document --batch-size 50 --concurrency 8
+
+Documents uploaded before page text was stored are skipped; upload them again
+once. When the embedding dimension changes, point VECTOR_INDEX_DIR (or
+CHROMA_PERSIST_DIR) at an empty directory first — an index holds one dimension.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db import vector_store  # noqa: E402
+from app.db.turso import init_db  # noqa: E402
+from app.services import reindex  # noqa: E402
+
+
+async def main(args: argparse.Namespace) -> int:
+    await init_db()
+    run_id = args.run_id or reindex.default_run_id()
+    print(f"Reindex run {run_id}...")
+    try:
+        stats = await reindex.run(
+            run_id=run_id,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            source_types=tuple(args.only) if args.only else ("note", "document"),
+            restart=args.restart,
+        )
+    finally:
+        vector_store.shutdown()
+    print(f"  reindexed {stats.sources} sources ({stats.chunks} chunks), skipped {stats.skipped}, failed {stats.failed}")
+    if stats.failed:
+        print("Some sources failed; run the same command again to retry them.")
+        return 1
+    print("Reindex complete.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--run-id", help="checkpoint namespace (default: a fingerprint of the index settings)")
+    parser.add_argument("--restart", action="store_true", help="forget this run's checkpoints and start over")
+    parser.add_argument("--only", action="append", choices=["note", "document"], help="source type to reindex (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=20, help="sources per checkpoint (max 500)")
+    parser.add_argument("--concurrency", type=int, default=4, help="sources reindexed at once")
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(asyncio.run(main(parser.parse_args())))
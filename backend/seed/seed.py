@@ -77,11 +77,11 @@ async def seed_notes() -> None:
         note_id = str(uuid.uuid4())
         ts = now()
         await execute(
-            "INSERT OR IGNORE INTO notes (id, title, category, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-            [note_id, note["title"], note["category"], ts, ts],
+            "INSERT OR IGNORE INTO notes (id, title, category, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [note_id, note["title"], note["category"], note["content"], ts, ts],
         )
         embedding = await embed(note["content"])
-        upsert_chunks(
+        await upsert_chunks(
             ids=[f"{note_id}_0"],
             documents=[note["content"]],
             embeddings=[embedding],
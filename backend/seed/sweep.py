@@ -0,0 +1,53 @@
+"""
+Sweep script — reconciles Turso with the vector and lexical indexes: deletes
+chunks whose note or document no longer exists, re-embeds sources that lost
+their vectors, and compacts the indexes.
+
+    python seed/sweep.py            # repair and report
+    python seed/sweep.py --dry-run  # report only
+
+The API runs the same sweep every SWEEP_INTERVAL_MINUTES when that is set.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db import vector_store  # noqa: E402
+from app.db.turso import init_db  # noqa: E402
+from app.services import sweeper  # noqa: E402
+
+
+async def main(args: argparse.Namespace) -> int:
+    await init_db()
+    print("Sweeping indexes..." + (" (dry run)" if args.dry_run else ""))
+    try:
+        report = await sweeper.sweep(dry_run=args.dry_run)
+    finally:
+        vector_store.shutdown()
+
+    verb = "found" if args.dry_run else "removed"
+    print(f"  orphans: {report.orphan_vectors} vectors from {report.orphan_sources} sources, {report.orphan_lexical_rows} lexical rows {verb}")
+    if report.deferred:
+        print("  orphans left in place: ingestion jobs are running, sweep again later")
+    verb = "to re-embed" if args.dry_run else "re-embedded"
+    print(f"  missing: {report.reindexed_notes} notes and {report.reindexed_documents} documents {verb}")
+    if report.unrecoverable:
+        print(f"  no stored text to rebuild: {', '.join(report.unrecoverable)}")
+    if not args.dry_run:
+        if report.bytes_reclaimed is None:
+            print("  compaction: not supported by this vector backend")
+        else:
+            print(f"  compaction reclaimed {report.bytes_reclaimed / 1e6:.1f} MB")
+    print("Sweep complete.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report differences without changing anything")
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,14 @@
+import client from './client'
+
+// List endpoints return one page per request and put the next page's cursor in
+// the X-Next-Cursor header; follow it until the whole list has been read.
+export async function fetchAll(path, params) {
+  const items = []
+  let cursor
+  do {
+    const response = await client.get(path, { params: cursor ? { ...params, cursor } : params })
+    items.push(...response.data)
+    cursor = response.headers?.['x-next-cursor']
+  } while (cursor)
+  return items
+}
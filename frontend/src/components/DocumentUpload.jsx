@@ -1,11 +1,12 @@
 import { useState } from 'react'
-import client from '../api/client'
+import { useUploadDocument } from '../hooks/useDocuments'
 
 export default function DocumentUpload({ onUploaded }) {
   const [file, setFile] = useState(null)
   const [status, setStatus] = useState(null) // 'success' | 'error' | null
   const [message, setMessage] = useState('')
-  const [loading, setLoading] = useState(false)
+  const upload = useUploadDocument()
+  const loading = upload.isPending
 
   function handleFileChange(e) {
     setFile(e.target.files[0] ?? null)
@@ -22,21 +23,21 @@ export default function DocumentUpload({ onUploaded }) {
       return
     }
 
-    const formData = new FormData()
-    formData.append('file', file)
-    setLoading(true)
+    setStatus(null)
+    setMessage('')
     try {
-      const { data } = await client.post('/documents/upload', formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
-      })
+      const job = await upload.mutateAsync(file)
+      if (job.status === 'failed') {
+        setStatus('error')
+        setMessage(`${job.filename} could not be processed: ${job.error ?? 'unknown error'}`)
+        return
+      }
       setStatus('success')
-      setMessage(`${data.filename} uploaded successfully (${data.chunk_count} chunks).`)
-      onUploaded?.(data)
+      setMessage(`${job.filename} uploaded successfully (${job.chunks_total} chunks).`)
+      onUploaded?.(job)
     } catch {
       setStatus('error')
       setMessage('Upload failed. Please try again.')
-    } finally {
-      setLoading(false)
     }
   }
 
@@ -55,7 +56,7 @@ export default function DocumentUpload({ onUploaded }) {
         disabled={!file || loading}
         className="bg-indigo-600 text-white px-4 py-2 rounded-lg text-sm disabled:opacity-50"
       >
-        {loading ? 'Uploading…' : 'Upload'}
+        {loading ? 'Processing…' : 'Upload'}
       </button>
       {status === 'success' && <p className="text-green-600 text-sm">{message}</p>}
       {status === 'error' && <p className="text-red-500 text-sm">{message}</p>}
@@ -4,12 +4,14 @@ import client from '../api/client'
 export function useChat() {
   const [messages, setMessages] = useState([])
   const [loading, setLoading] = useState(false)
+  // One server-side conversation per mounted chat, so follow-ups keep their context.
+  const [sessionId] = useState(() => crypto.randomUUID())
 
   async function sendMessage(query) {
     setMessages((prev) => [...prev, { role: 'user', content: query }])
     setLoading(true)
     try {
-      const { data } = await client.post('/chat', { query })
+      const { data } = await client.post('/chat', { query, session_id: sessionId })
       setMessages((prev) => [
         ...prev,
         { role: 'assistant', content: data.answer, sources: data.sources },
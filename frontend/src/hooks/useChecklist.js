@@ -1,11 +1,11 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import client from '../api/client'
+import { fetchAll } from '../api/pagination'
 
 export function useChecklist(category) {
   return useQuery({
     queryKey: ['checklist', category],
-    queryFn: () =>
-      client.get('/checklist', { params: category ? { category } : undefined }).then((r) => r.data),
+    queryFn: () => fetchAll('/checklist', category ? { category } : undefined),
   })
 }
 
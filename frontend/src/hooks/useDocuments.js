@@ -0,0 +1,38 @@
+import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import client from '../api/client'
+import { fetchAll } from '../api/pagination'
+
+export const JOB_POLL_INTERVAL_MS = 1000
+const FINISHED = ['done', 'failed']
+
+export function useDocuments() {
+  return useQuery({
+    queryKey: ['documents'],
+    queryFn: () => fetchAll('/documents'),
+  })
+}
+
+// Uploads are ingested in the background: poll the job until it finishes and
+// resolve with the final job, whose status is 'done' or 'failed'.
+export function useUploadDocument() {
+  const qc = useQueryClient()
+  return useMutation({
+    mutationFn: async (file) => {
+      const formData = new FormData()
+      formData.append('file', file)
+      let { data: job } = await client.post('/documents/upload', formData, {
+        headers: { 'Content-Type': 'multipart/form-data' },
+      })
+      while (!FINISHED.includes(job.status)) {
+        job = (await client.get(`/documents/jobs/${job.id}`)).data
+        if (!FINISHED.includes(job.status)) {
+          await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+        }
+      }
+      return job
+    },
+    onSuccess: (job) => {
+      if (job.status === 'done') qc.invalidateQueries({ queryKey: ['documents'] })
+    },
+  })
+}
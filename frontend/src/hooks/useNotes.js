@@ -1,10 +1,11 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import client from '../api/client'
+import { fetchAll } from '../api/pagination'
 
 export function useNotes() {
   return useQuery({
     queryKey: ['notes'],
-    queryFn: () => client.get('/notes').then((r) => r.data),
+    queryFn: () => fetchAll('/notes'),
   })
 }
 
@@ -32,7 +32,12 @@ describe('Chat', () => {
     const input = screen.getByPlaceholderText(/ask/i)
     fireEvent.change(input, { target: { value: 'Why Alicante?' } })
     fireEvent.submit(input.closest('form'))
-    await waitFor(() => expect(api.default.post).toHaveBeenCalledWith('/chat', { query: 'Why Alicante?' }))
+    await waitFor(() =>
+      expect(api.default.post).toHaveBeenCalledWith('/chat', {
+        query: 'Why Alicante?',
+        session_id: expect.any(String),
+      })
+    )
   })
 
   it('test_chat_displays_assistant_response', async () => {
@@ -34,6 +34,16 @@ describe('Checklist', () => {
     api.default.patch.mockResolvedValue({ data: { ...MOCK_ITEMS[0], status: 'done' } })
   })
 
+  it('test_follows_next_cursor_until_last_page', async () => {
+    api.default.get
+      .mockResolvedValueOnce({ data: [MOCK_ITEMS[0]], headers: { 'x-next-cursor': 'page-2' } })
+      .mockResolvedValueOnce({ data: [MOCK_ITEMS[1]], headers: {} })
+    render(<Checklist />, { wrapper })
+    expect(await screen.findByText('Health insurance')).toBeInTheDocument()
+    expect(screen.getByText('Valid passport')).toBeInTheDocument()
+    expect(api.default.get).toHaveBeenLastCalledWith('/checklist', { params: { cursor: 'page-2' } })
+  })
+
   it('test_renders_checklist_with_items', async () => {
     render(<Checklist />, { wrapper })
     expect(await screen.findByText('Valid passport')).toBeInTheDocument()
@@ -1,38 +1,71 @@
 import { render, screen, fireEvent, waitFor } from '@testing-library/react'
+import { QueryClient, QueryClientProvider } from '@tanstack/react-query'
 import { describe, it, expect, vi, beforeEach } from 'vitest'
 import DocumentUpload from '../components/DocumentUpload'
 import * as api from '../api/client'
 
 vi.mock('../api/client', () => ({
   default: {
+    get: vi.fn(),
     post: vi.fn(),
   },
 }))
 
+const QUEUED_JOB = { id: 'job-1', filename: 'guide.pdf', status: 'queued', stage: 'queued', chunks_total: null }
+
+function wrapper({ children }) {
+  const qc = new QueryClient({ defaultOptions: { queries: { retry: false } } })
+  return <QueryClientProvider client={qc}>{children}</QueryClientProvider>
+}
+
+function uploadFile(name, type = 'application/pdf') {
+  const file = new File(['pdf content'], name, { type })
+  fireEvent.change(screen.getByTestId('file-input'), { target: { files: [file] } })
+  fireEvent.click(screen.getByRole('button', { name: /upload/i }))
+}
+
 describe('DocumentUpload', () => {
   beforeEach(() => {
     vi.clearAllMocks()
   })
 
   it('test_document_upload_shows_success_state', async () => {
-    api.default.post.mockResolvedValue({ data: { id: 'doc-1', filename: 'guide.pdf', chunk_count: 3 } })
-    render(<DocumentUpload />)
+    api.default.post.mockResolvedValue({ data: QUEUED_JOB })
+    api.default.get.mockResolvedValue({ data: { ...QUEUED_JOB, status: 'done', stage: 'done', chunks_total: 3 } })
+    const onUploaded = vi.fn()
+    render(<DocumentUpload onUploaded={onUploaded} />, { wrapper })
+
+    uploadFile('guide.pdf')
+
+    expect(await screen.findByText(/uploaded successfully \(3 chunks\)/i)).toBeInTheDocument()
+    expect(api.default.get).toHaveBeenCalledWith('/documents/jobs/job-1')
+    await waitFor(() => expect(onUploaded).toHaveBeenCalledWith(expect.objectContaining({ status: 'done' })))
+  })
 
-    const file = new File(['pdf content'], 'guide.pdf', { type: 'application/pdf' })
-    const input = screen.getByTestId('file-input')
-    fireEvent.change(input, { target: { files: [file] } })
-    fireEvent.click(screen.getByRole('button', { name: /upload/i }))
+  it('test_document_upload_skips_polling_for_known_file', async () => {
+    api.default.post.mockResolvedValue({ data: { ...QUEUED_JOB, status: 'done', stage: 'done', chunks_total: 3 } })
+    render(<DocumentUpload />, { wrapper })
+
+    uploadFile('guide.pdf')
 
     expect(await screen.findByText(/uploaded successfully/i)).toBeInTheDocument()
+    expect(api.default.get).not.toHaveBeenCalled()
+  })
+
+  it('test_document_upload_shows_failed_job', async () => {
+    api.default.post.mockResolvedValue({ data: QUEUED_JOB })
+    api.default.get.mockResolvedValue({ data: { ...QUEUED_JOB, status: 'failed', error: 'rate limited' } })
+    render(<DocumentUpload />, { wrapper })
+
+    uploadFile('guide.pdf')
+
+    expect(await screen.findByText(/could not be processed: rate limited/i)).toBeInTheDocument()
   })
 
   it('test_document_upload_shows_error_on_non_pdf', async () => {
-    render(<DocumentUpload />)
+    render(<DocumentUpload />, { wrapper })
 
-    const file = new File(['plain text'], 'notes.txt', { type: 'text/plain' })
-    const input = screen.getByTestId('file-input')
-    fireEvent.change(input, { target: { files: [file] } })
-    fireEvent.click(screen.getByRole('button', { name: /upload/i }))
+    uploadFile('notes.txt', 'text/plain')
 
     expect(await screen.findByText(/only pdf/i)).toBeInTheDocument()
   })